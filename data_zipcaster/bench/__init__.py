@@ -0,0 +1,22 @@
+from data_zipcaster.bench.load import (
+    AccountResult,
+    AccountSpec,
+    LoadReport,
+    StageRecorder,
+    StageReport,
+    prepare_account,
+    run_load_test,
+)
+from data_zipcaster.bench.server import (
+    BaseStandIn,
+    FixtureStore,
+    ServerStats,
+    StandInServer,
+)
+from data_zipcaster.bench.splashcat import SplashcatStandIn, SplashcatStats
+from data_zipcaster.bench.synthetic import (
+    BattleFactory,
+    SyntheticGroup,
+    iter_details,
+    write_dump,
+)
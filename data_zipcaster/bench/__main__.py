@@ -0,0 +1,391 @@
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+import rich
+import rich_click as click
+from rich.table import Table
+
+from data_zipcaster.bench.load import (
+    PERCENTILES,
+    LoadReport,
+    available_modes,
+    prepare_account,
+    run_load_test,
+)
+from data_zipcaster.bench.server import FixtureStore, StandInServer
+from data_zipcaster.bench.splashcat import SplashcatStandIn
+from data_zipcaster.bench.synthetic import FLAGS, write_dump
+
+click.rich_click.USE_RICH_MARKUP = True
+
+
+@click.group()
+def bench() -> None:
+    """Tools to benchmark Data Zipcaster offline."""
+
+
+@bench.command()
+@click.option(
+    "--raw-dir",
+    type=click.Path(exists=True, file_okay=False),
+    multiple=True,
+    required=True,
+    help=(
+        "A directory of raw data saved with --save-raw to serve. Can be "
+        "specified multiple times."
+    ),
+)
+@click.option("--host", default="127.0.0.1", help="The host to listen on.")
+@click.option(
+    "--port",
+    type=click.IntRange(min=0),
+    default=8000,
+    help="The port to listen on. If 0, a free port is picked.",
+)
+@click.option(
+    "--latency",
+    type=click.FloatRange(min=0),
+    default=0.0,
+    help="The time to wait before answering each request, in seconds.",
+)
+@click.option(
+    "--jitter",
+    type=click.FloatRange(min=0),
+    default=0.0,
+    help="The most the latency may randomly vary by either way, in seconds.",
+)
+@click.option(
+    "--error-rate",
+    type=click.FloatRange(min=0, max=1),
+    default=0.0,
+    help="The fraction of queries that fail with a 503.",
+)
+@click.option(
+    "--token-lifetime",
+    type=click.FloatRange(min=0, min_open=True),
+    default=None,
+    help=(
+        "How long the bullet tokens handed out stay valid, in seconds. If not "
+        "specified, every bullet token is accepted."
+    ),
+)
+@click.option(
+    "--seed", type=int, default=None, help="The seed of the random delays."
+)
+def serve(
+    raw_dir: tuple[str, ...],
+    host: str,
+    port: int,
+    latency: float,
+    jitter: float,
+    error_rate: float,
+    token_lifetime: float | None,
+    seed: int | None,
+) -> None:
+    """Serves recorded raw data as a local stand-in for SplatNet 3. Point the
+    splatnet importer at it with --standin-url.
+    """
+    fixtures = FixtureStore.from_dumps(raw_dir)
+    server = StandInServer(
+        fixtures,
+        host=host,
+        port=port,
+        latency=latency,
+        jitter=jitter,
+        error_rate=error_rate,
+        token_lifetime=token_lifetime,
+        seed=seed,
+    )
+    click.echo(
+        f"Serving {len(fixtures.overviews)} overviews and "
+        f"{len(fixtures.details)} battles at {server.url}. Press Ctrl+C to "
+        "stop."
+    )
+    with server:
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            pass
+    click.echo(f"Stopped. Stats: {server.stats}")
+
+
+def print_report(report: LoadReport) -> None:
+    """Prints the report of a load test as a table.
+
+    Args:
+        report (LoadReport): The report.
+    """
+    table = Table(
+        title=f"{report['accounts']} accounts, latency in milliseconds"
+    )
+    for column in ("Stage", "Calls", "Errors", "Errors %", "Calls/s"):
+        table.add_column(column, justify="right")
+    for pct in PERCENTILES:
+        table.add_column(f"p{pct}", justify="right")
+    table.add_column("max", justify="right")
+    for stage in report["stages"]:
+        table.add_row(
+            stage["stage"],
+            str(stage["count"]),
+            str(stage["errors"]),
+            f"{stage['error_rate']:.1%}",
+            f"{stage['throughput']:.1f}",
+            *[f"{stage['percentiles'][pct] * 1000:.1f}" for pct in PERCENTILES],
+            f"{stage['max'] * 1000:.1f}",
+        )
+    rich.print(table)
+    rich.print(
+        f"Wall time: {report['wall_time']:.2f}s. Peak RSS: "
+        f"{report['peak_rss'] / 2**20:.1f} MiB per account, "
+        f"{report['server_rss'] / 2**20:.1f} MiB for the stand-ins."
+    )
+    for error in report["account_errors"]:
+        rich.print(f"[bold red]{error}[/]")
+
+
+@bench.command()
+@click.option(
+    "--raw-dir",
+    type=click.Path(exists=True, file_okay=False),
+    multiple=True,
+    required=True,
+    help=(
+        "A directory of raw data saved with --save-raw for every account to "
+        "import. Can be specified multiple times."
+    ),
+)
+@click.option(
+    "--accounts",
+    type=click.IntRange(min=1),
+    default=10,
+    help="The number of accounts to simulate at once.",
+)
+@click.option(
+    "--runs",
+    type=click.IntRange(min=1),
+    default=1,
+    help=(
+        "How many times each account imports, one after another, as it would "
+        "in monitor mode."
+    ),
+)
+@click.option(
+    "--mode-workers",
+    type=click.IntRange(min=1),
+    default=1,
+    help="The --mode-workers of every account.",
+)
+@click.option(
+    "--max-concurrency",
+    type=click.IntRange(min=1),
+    default=1,
+    help="The --max-concurrency of every account.",
+)
+@click.option(
+    "--rate-limit",
+    type=click.FloatRange(min=0),
+    default=0.0,
+    help=(
+        "The requests per second each account may send to each stand-in. "
+        "If 0, requests are not limited."
+    ),
+)
+@click.option(
+    "--latency",
+    type=click.FloatRange(min=0),
+    default=0.0,
+    help="The time the SplatNet 3 stand-in waits before answering, in seconds.",
+)
+@click.option(
+    "--splashcat-latency",
+    type=click.FloatRange(min=0),
+    default=0.0,
+    help="The time the Splashcat stand-in waits before answering, in seconds.",
+)
+@click.option(
+    "--jitter",
+    type=click.FloatRange(min=0),
+    default=0.0,
+    help="The most the latency of both stand-ins may vary by, in seconds.",
+)
+@click.option(
+    "--error-rate",
+    type=click.FloatRange(min=0, max=1),
+    default=0.0,
+    help="The fraction of queries the SplatNet 3 stand-in fails with a 503.",
+)
+@click.option(
+    "--splashcat-error-rate",
+    type=click.FloatRange(min=0, max=1),
+    default=0.0,
+    help="The fraction of requests the Splashcat stand-in fails with a 503.",
+)
+@click.option(
+    "--seed", type=int, default=None, help="The seed of the random delays."
+)
+@click.option(
+    "--work-dir",
+    type=click.Path(file_okay=False),
+    default=None,
+    help=(
+        "The directory to keep the config files and ledgers of the accounts "
+        "in. If not specified, a temporary directory is used and removed "
+        "afterwards."
+    ),
+)
+@click.option(
+    "--output",
+    type=click.Path(dir_okay=False, writable=True),
+    default=None,
+    help="Also save the report to this path as JSON.",
+)
+def load(
+    raw_dir: tuple[str, ...],
+    accounts: int,
+    runs: int,
+    mode_workers: int,
+    max_concurrency: int,
+    rate_limit: float,
+    latency: float,
+    splashcat_latency: float,
+    jitter: float,
+    error_rate: float,
+    splashcat_error_rate: float,
+    seed: int | None,
+    work_dir: str | None,
+    output: str | None,
+) -> None:
+    """Runs many simulated accounts at once against local stand-ins for
+    SplatNet 3 and Splashcat, and reports the throughput, latency, errors and
+    memory use of each stage of the import and export.
+    """
+    fixtures = FixtureStore.from_dumps(raw_dir)
+    modes = available_modes(fixtures)
+    if len(modes) == 0:
+        raise click.ClickException(
+            "The raw data does not hold the overview of any mode that can be "
+            "imported."
+        )
+    directory = work_dir or tempfile.mkdtemp(prefix="zipcaster-load-")
+    splatnet = StandInServer(
+        fixtures,
+        latency=latency,
+        jitter=jitter,
+        error_rate=error_rate,
+        seed=seed,
+    )
+    splashcat = SplashcatStandIn(
+        latency=splashcat_latency,
+        jitter=jitter,
+        error_rate=splashcat_error_rate,
+        seed=seed,
+    )
+    try:
+        with splatnet, splashcat:
+            specs = [
+                prepare_account(
+                    directory,
+                    account,
+                    splatnet.url,
+                    splashcat.url,
+                    modes,
+                    runs=runs,
+                    rate_limit=rate_limit,
+                    extra_args=[
+                        "--mode-workers",
+                        str(mode_workers),
+                        "--max-concurrency",
+                        str(max_concurrency),
+                        "--pool-size",
+                        str(mode_workers * max_concurrency),
+                    ],
+                )
+                for account in range(accounts)
+            ]
+            click.echo(
+                f"Running {accounts} accounts against "
+                f"{len(fixtures.details)} battles in {', '.join(modes)}..."
+            )
+            report = run_load_test(specs)
+    finally:
+        if work_dir is None:
+            shutil.rmtree(directory, ignore_errors=True)
+
+    print_report(report)
+    click.echo(f"SplatNet 3 stand-in: {splatnet.stats}")
+    click.echo(f"Splashcat stand-in: {splashcat.stats}")
+    if output is not None:
+        with open(output, "w") as f:
+            json.dump(
+                {
+                    **report,
+                    "splatnet": splatnet.stats,
+                    "splashcat": splashcat.stats,
+                },
+                f,
+                indent=4,
+            )
+
+
+@bench.command()
+@click.option(
+    "--out",
+    type=click.Path(file_okay=False),
+    required=True,
+    help=(
+        "The directory to save the raw data in, laid out as --save-raw lays "
+        "it out."
+    ),
+)
+@click.option(
+    "--battles",
+    type=click.IntRange(min=1),
+    default=1000,
+    help="The number of battles to generate for each mode.",
+)
+@click.option(
+    "--mode",
+    "modes",
+    type=click.Choice(FLAGS),
+    multiple=True,
+    help=(
+        "A mode to generate battles for. Can be specified multiple times. If "
+        "not specified, every mode is generated."
+    ),
+)
+@click.option(
+    "--seed",
+    type=int,
+    default=0,
+    help="The seed of the battles. The same seed always makes the same data.",
+)
+@click.option(
+    "--splatfest",
+    is_flag=True,
+    help="Also generate Splatfest and Tricolor battles among Turf War ones.",
+)
+def generate(
+    out: str,
+    battles: int,
+    modes: tuple[str, ...],
+    seed: int,
+    splatfest: bool,
+) -> None:
+    """Generates made up battles that are valid SplatNet 3 responses, and
+    saves them as raw data that the serve and load commands accept.
+    """
+    time_str = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime())
+    for flag in modes or FLAGS:
+        path = os.path.join(out, time_str, flag)
+        count = write_dump(
+            path, flag, battles, seed=seed, splatfest=splatfest
+        )
+        click.echo(f"Saved {count} {flag} battles to {path}.")
+
+
+if __name__ == "__main__":
+    bench()
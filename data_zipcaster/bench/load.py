@@ -0,0 +1,485 @@
+import configparser
+import functools
+import math
+import multiprocessing
+import os
+import queue
+import resource
+import sys
+import threading
+import time
+import traceback
+from multiprocessing.queues import Queue
+from multiprocessing.synchronize import Barrier
+from typing import Any, Callable, Sequence, TypedDict
+
+import rich_click as click
+from splatnet3_scraper.scraper.query_map import QueryMap
+
+from data_zipcaster.bench.server import FixtureStore
+from data_zipcaster.cli import constants as consts
+from data_zipcaster.cli.exporters.splashcat.plugin import SplashcatExporter
+from data_zipcaster.cli.importers.splatnet.handler import SharedQueryHandler
+from data_zipcaster.cli.importers.splatnet.plugin import SplatNetImporter
+from data_zipcaster.cli.main import EXPORTERS, IMPORTERS, cli
+
+# The stages whose latency is measured in every simulated account. ``run`` is
+# a whole import and export, ``query`` a single query to SplatNet 3,
+# ``convert`` the validation and conversion of a single battle when pipelined,
+# ``batch`` those of every battle of a mode at once otherwise, and ``export``
+# the upload of a single battle to Splashcat.
+STAGES = ("run", "query", "convert", "batch", "export")
+PERCENTILES = (50, 90, 99)
+# How long an account waits for the others to be ready before giving up.
+START_TIMEOUT = 120.0
+
+
+class AccountSpec(TypedDict):
+    """How to run a single simulated account.
+
+    Fields:
+        - account (int): The number of the account.
+        - directory (str): The directory holding the account's config file,
+            ledger and token cache. The account runs from this directory.
+        - args (list[str]): The arguments to run the command line with.
+        - runs (int): How many times to run the import, one after another.
+    """
+
+    account: int
+    directory: str
+    args: list[str]
+    runs: int
+
+
+class AccountResult(TypedDict):
+    """The measurements taken by a single simulated account.
+
+    Fields:
+        - account (int): The number of the account.
+        - samples (dict[str, list[float]]): The latency of every call made in
+            each stage, in seconds, including the calls that failed.
+        - errors (dict[str, int]): The number of calls that failed in each
+            stage.
+        - started (float): When the first run started, as a UNIX timestamp.
+        - finished (float): When the last run finished, as a UNIX timestamp.
+        - peak_rss (int): The peak resident memory of the account, in bytes.
+        - error (str | None): The error that stopped the account, if any.
+    """
+
+    account: int
+    samples: dict[str, list[float]]
+    errors: dict[str, int]
+    started: float
+    finished: float
+    peak_rss: int
+    error: str | None
+
+
+class StageReport(TypedDict):
+    """The combined measurements of a stage across every account.
+
+    Fields:
+        - stage (str): The name of the stage.
+        - count (int): The number of calls, including the failed ones.
+        - errors (int): The number of calls that failed.
+        - error_rate (float): The fraction of calls that failed.
+        - throughput (float): The successful calls per second, across every
+            account.
+        - percentiles (dict[int, float]): The latency at each percentile in
+            ``PERCENTILES``, in seconds.
+        - max (float): The slowest call, in seconds.
+    """
+
+    stage: str
+    count: int
+    errors: int
+    error_rate: float
+    throughput: float
+    percentiles: dict[int, float]
+    max: float
+
+
+class LoadReport(TypedDict):
+    """The result of a load test.
+
+    Fields:
+        - accounts (int): The number of simulated accounts.
+        - failed_accounts (int): The accounts that stopped with an error.
+        - wall_time (float): The time from the first run starting to the last
+            one finishing, in seconds.
+        - stages (list[StageReport]): The measurements of every stage.
+        - peak_rss (int): The peak resident memory of the largest account,
+            in bytes.
+        - server_rss (int): The peak resident memory of the process running
+            the stand-ins, in bytes.
+        - account_errors (list[str]): The errors that stopped accounts.
+    """
+
+    accounts: int
+    failed_accounts: int
+    wall_time: float
+    stages: list[StageReport]
+    peak_rss: int
+    server_rss: int
+    account_errors: list[str]
+
+
+def peak_rss() -> int:
+    """Gets the peak resident memory of the current process.
+
+    Returns:
+        int: The peak resident memory, in bytes.
+    """
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports the peak in kilobytes, macOS in bytes.
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def percentile(samples: Sequence[float], pct: float) -> float:
+    """Gets a percentile of some samples with the nearest-rank method.
+
+    Args:
+        samples (Sequence[float]): The samples, sorted in ascending order.
+        pct (float): The percentile, between 0 and 100.
+
+    Returns:
+        float: The sample at the percentile, or 0.0 if there are no samples.
+    """
+    if len(samples) == 0:
+        return 0.0
+    rank = max(math.ceil(pct / 100 * len(samples)), 1)
+    return samples[rank - 1]
+
+
+def available_modes(fixtures: FixtureStore) -> list[str]:
+    """Gets the modes the fixtures hold an overview for. Salmon Run is left
+    out since the ``splatnet`` importer does not support it yet.
+
+    Args:
+        fixtures (FixtureStore): The fixtures.
+
+    Returns:
+        list[str]: The flags of the modes.
+    """
+    return [
+        flag
+        for flag in consts.FLAG_LIST
+        if flag != "salmon" and QueryMap.get(flag) in fixtures.overviews
+    ]
+
+
+class StageRecorder:
+    def __init__(self) -> None:
+        """Records the latency of the calls made in each stage. Calls may be
+        recorded from any number of threads at once.
+        """
+        self.lock = threading.Lock()
+        self.samples: dict[str, list[float]] = {stage: [] for stage in STAGES}
+        self.errors: dict[str, int] = {stage: 0 for stage in STAGES}
+
+    def record(self, stage: str, duration: float, failed: bool) -> None:
+        """Records a single call.
+
+        Args:
+            stage (str): The stage the call belongs to.
+            duration (float): How long the call took, in seconds.
+            failed (bool): Whether the call raised an exception.
+        """
+        with self.lock:
+            self.samples[stage].append(duration)
+            if failed:
+                self.errors[stage] += 1
+
+    def timed(self, stage: str, fxn: Callable[..., Any]) -> Callable[..., Any]:
+        """Wraps a function so that every call to it is recorded.
+
+        Args:
+            stage (str): The stage the calls belong to.
+            fxn (Callable[..., Any]): The function to wrap.
+
+        Returns:
+            Callable[..., Any]: The wrapped function.
+        """
+
+        @functools.wraps(fxn)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                result = fxn(*args, **kwargs)
+            except BaseException:
+                self.record(stage, time.perf_counter() - start, True)
+                raise
+            self.record(stage, time.perf_counter() - start, False)
+            return result
+
+        return wrapper
+
+    def instrument(self, owner: type, attribute: str, stage: str) -> None:
+        """Replaces a method of a class with one whose calls are recorded.
+        This is only meant for the processes of simulated accounts, which
+        exit once the load test is over.
+
+        Args:
+            owner (type): The class.
+            attribute (str): The name of the method.
+            stage (str): The stage the calls belong to.
+        """
+        setattr(owner, attribute, self.timed(stage, getattr(owner, attribute)))
+
+
+def build_command() -> click.Group:
+    """Builds the command line the same way ``data_zipcaster`` does.
+
+    Returns:
+        click.Group: The command line, with every importer added.
+    """
+    for importer in IMPORTERS:
+        cli.add_command(importer.build_command(EXPORTERS))
+    return cli
+
+
+def instrument_stages(recorder: StageRecorder) -> None:
+    """Records the calls made in each stage of the import and export.
+
+    Args:
+        recorder (StageRecorder): The recorder to record the calls with.
+    """
+    recorder.instrument(SharedQueryHandler, "query", "query")
+    recorder.instrument(SplatNetImporter, "convert_vs_data", "convert")
+    recorder.instrument(SplatNetImporter, "convert_vs_batch", "batch")
+    recorder.instrument(SplashcatExporter, "upload_match", "export")
+
+
+def run_account(spec: AccountSpec, start: Barrier) -> AccountResult:
+    """Runs a single simulated account. This is run in a process of its own,
+    so the account's memory use can be measured on its own, and nothing the
+    importer or exporter keep for the life of the process is shared between
+    accounts.
+
+    Every account waits for the others to be ready before starting, so the
+    time taken to start the processes does not count towards the results.
+
+    Args:
+        spec (AccountSpec): How to run the account.
+        start (Barrier): The barrier every account waits on before starting.
+
+    Returns:
+        AccountResult: The measurements taken by the account.
+    """
+    recorder = StageRecorder()
+    error: str | None = None
+    started = finished = time.time()
+    try:
+        os.chdir(spec["directory"])
+        instrument_stages(recorder)
+        command = build_command()
+    except Exception:
+        start.abort()
+        error = traceback.format_exc(limit=1)
+    else:
+        try:
+            start.wait(START_TIMEOUT)
+        except threading.BrokenBarrierError:
+            error = "Another account failed to start."
+
+    if error is None:
+        started = time.time()
+        run = recorder.timed(
+            "run",
+            functools.partial(
+                command.main, args=spec["args"], standalone_mode=False
+            ),
+        )
+        for _ in range(spec["runs"]):
+            try:
+                run()
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"
+                break
+        finished = time.time()
+
+    return AccountResult(
+        account=spec["account"],
+        samples=recorder.samples,
+        errors=recorder.errors,
+        started=started,
+        finished=finished,
+        peak_rss=peak_rss(),
+        error=error,
+    )
+
+
+def account_main(spec: AccountSpec, start: Barrier, results: Queue) -> None:
+    """The entry point of the process of a simulated account.
+
+    Args:
+        spec (AccountSpec): How to run the account.
+        start (Barrier): The barrier every account waits on before starting.
+        results (Queue): The queue to put the measurements on.
+    """
+    results.put(run_account(spec, start))
+
+
+def prepare_account(
+    directory: str,
+    account: int,
+    splatnet_url: str,
+    splashcat_url: str,
+    modes: Sequence[str],
+    runs: int = 1,
+    rate_limit: float = 0.0,
+    extra_args: Sequence[str] = (),
+) -> AccountSpec:
+    """Sets up the directory of a simulated account and its config file.
+
+    Args:
+        directory (str): The directory to create the account's directory in.
+        account (int): The number of the account.
+        splatnet_url (str): The URL of the SplatNet 3 stand-in.
+        splashcat_url (str): The URL of the Splashcat stand-in.
+        modes (Sequence[str]): The flags of the modes to import.
+        runs (int): How many times to run the import. Defaults to 1.
+        rate_limit (float): The requests per second the account may send to
+            each stand-in. 0 disables the limit. Defaults to 0.0.
+        extra_args (Sequence[str]): More options for the ``splatnet``
+            importer. Defaults to ().
+
+    Returns:
+        AccountSpec: How to run the account.
+    """
+    account_dir = os.path.join(directory, f"account-{account}")
+    os.makedirs(account_dir, exist_ok=True)
+    config_path = os.path.join(account_dir, "config.ini")
+    config = configparser.ConfigParser()
+    config["splatnet"] = {}
+    config["splashcat"] = {
+        "api_key": f"account-{account}",
+        "api_url": splashcat_url,
+        "rate_limit": f"{rate_limit:g}",
+    }
+    with open(config_path, "w") as f:
+        config.write(f)
+
+    args = [
+        "splatnet",
+        "--silent",
+        "--standin-url",
+        splatnet_url,
+        "--config",
+        config_path,
+        "--rate-limit",
+        f"{rate_limit:g}",
+        "-e",
+        "splashcat",
+        *[f"--{flag}" for flag in modes],
+        *extra_args,
+    ]
+    return AccountSpec(
+        account=account, directory=account_dir, args=args, runs=runs
+    )
+
+
+def summarize(results: Sequence[AccountResult]) -> LoadReport:
+    """Combines the measurements of every account into a report.
+
+    Args:
+        results (Sequence[AccountResult]): The measurements of every account.
+
+    Returns:
+        LoadReport: The report.
+    """
+    ran = [result for result in results if result["samples"]["run"]]
+    started = [result["started"] for result in ran]
+    finished = [result["finished"] for result in ran]
+    wall_time = max(finished, default=0.0) - min(started, default=0.0)
+    wall_time = max(wall_time, 0.0)
+
+    stages: list[StageReport] = []
+    for stage in STAGES:
+        samples = sorted(
+            sample for result in results for sample in result["samples"][stage]
+        )
+        errors = sum(result["errors"][stage] for result in results)
+        count = len(samples)
+        stages.append(
+            StageReport(
+                stage=stage,
+                count=count,
+                errors=errors,
+                error_rate=errors / count if count else 0.0,
+                throughput=(count - errors) / wall_time if wall_time else 0.0,
+                percentiles={
+                    pct: percentile(samples, pct) for pct in PERCENTILES
+                },
+                max=samples[-1] if samples else 0.0,
+            )
+        )
+
+    account_errors = [
+        f"Account {result['account']}: {result['error']}"
+        for result in results
+        if result["error"] is not None
+    ]
+    return LoadReport(
+        accounts=len(results),
+        failed_accounts=len(account_errors),
+        wall_time=wall_time,
+        stages=stages,
+        peak_rss=max((result["peak_rss"] for result in results), default=0),
+        server_rss=peak_rss(),
+        account_errors=account_errors,
+    )
+
+
+def run_load_test(specs: Sequence[AccountSpec]) -> LoadReport:
+    """Runs every simulated account at once, each in a process of its own.
+
+    The stand-ins the accounts talk to must already be running, and are best
+    run in this process so they are not measured as part of any account.
+
+    Args:
+        specs (Sequence[AccountSpec]): How to run each account.
+
+    Returns:
+        LoadReport: The combined measurements of every account.
+    """
+    # Forking would copy the stand-ins and their threads into every account,
+    # and count their memory as the account's own.
+    mp = multiprocessing.get_context("spawn")
+    start = mp.Barrier(len(specs))
+    results: Queue = mp.Queue()
+    processes = [
+        mp.Process(target=account_main, args=(spec, start, results))
+        for spec in specs
+    ]
+    for process in processes:
+        process.start()
+    # Every account puts its result on the queue, so the results are read
+    # before joining to keep a full queue from blocking the accounts.
+    collected: dict[int, AccountResult] = {}
+    while len(collected) < len(specs):
+        try:
+            result = results.get(timeout=1.0)
+        except queue.Empty:
+            # An account killed outright, such as by running out of memory,
+            # never puts its result on the queue.
+            if any(process.is_alive() for process in processes):
+                continue
+            break
+        collected[result["account"]] = result
+    for process in processes:
+        process.join()
+
+    for spec, process in zip(specs, processes):
+        if spec["account"] in collected:
+            continue
+        collected[spec["account"]] = AccountResult(
+            account=spec["account"],
+            samples={stage: [] for stage in STAGES},
+            errors={stage: 0 for stage in STAGES},
+            started=0.0,
+            finished=0.0,
+            peak_rss=0,
+            error=f"The process exited with code {process.exitcode}.",
+        )
+    return summarize([collected[account] for account in sorted(collected)])
@@ -0,0 +1,412 @@
+import json
+import os
+import random
+import secrets
+import threading
+import time
+from http.cookies import SimpleCookie
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Iterable, TypedDict, cast
+
+from splatnet3_scraper.scraper.query_map import QueryMap
+from typing_extensions import Self
+
+from data_zipcaster.cli import constants as consts
+from data_zipcaster.cli.importers.replay.dumps import find_dumps
+from data_zipcaster.cli.importers.splatnet.fetch import (
+    DETAIL_QUERY,
+    DETAIL_VARIABLE,
+)
+from data_zipcaster.cli.importers.splatnet.handler import (
+    STANDIN_BULLET_TOKEN_PATH,
+    STANDIN_GRAPHQL_PATH,
+)
+from data_zipcaster.raw import (
+    encode_json,
+    iter_dump_details,
+    load_dump_overview,
+)
+
+HOME_RESPONSE = encode_json({"data": {"currentPlayer": {"name": "Stand-in"}}})
+# The status code of the errors the stand-in injects.
+INJECTED_ERROR_STATUS = 503
+
+
+class ServerStats(TypedDict):
+    """The counts of the requests a stand-in server has answered.
+
+    Fields:
+        - requests (int): Every request, including the failed ones.
+        - queries (int): GraphQL queries that were answered with data.
+        - injected_errors (int): Requests failed on purpose.
+        - unauthorized (int): Queries made with a missing or expired bullet
+            token.
+        - token_refreshes (int): Bullet tokens handed out.
+        - unknown (int): Queries for data the fixtures do not have.
+    """
+
+    requests: int
+    queries: int
+    injected_errors: int
+    unauthorized: int
+    token_refreshes: int
+    unknown: int
+
+
+def graphql_error(message: str) -> bytes:
+    """Builds a GraphQL response that only holds an error.
+
+    Args:
+        message (str): The error message.
+
+    Returns:
+        bytes: The body of the response.
+    """
+    return encode_json({"errors": [{"message": message}]})
+
+
+class FixtureStore:
+    def __init__(self) -> None:
+        """The recorded responses a stand-in server answers queries with.
+
+        Every response is held already encoded, wrapped in ``data`` just as
+        SplatNet 3 sends it, so answering a query does not cost the server
+        any JSON encoding.
+        """
+        self.overviews: dict[str, bytes] = {}
+        self.details: dict[str, bytes] = {}
+
+    @classmethod
+    def from_dumps(cls, paths: Iterable[str]) -> "FixtureStore":
+        """Loads the fixtures from raw data saved with ``--save-raw``.
+
+        Args:
+            paths (Iterable[str]): The directories to search for dumps. See
+                ``find_dumps`` for the directories that are accepted.
+
+        Returns:
+            FixtureStore: The fixtures. When several dumps hold the same
+                mode, the overview of the last one is used.
+        """
+        store = cls()
+        for dump_path in find_dumps(paths):
+            flag = os.path.basename(dump_path)
+            if flag not in consts.FLAG_LIST:
+                continue
+            store.add_overview(flag, load_dump_overview(dump_path))
+            for detail in iter_dump_details(dump_path):
+                store.add_detail(detail)
+        return store
+
+    def add_overview(self, flag: str, overview: dict) -> None:
+        """Adds the overview of a mode.
+
+        Args:
+            flag (str): The flag of the mode.
+            overview (dict): The data of the overview response.
+        """
+        self.overviews[QueryMap.get(flag)] = encode_json({"data": overview})
+
+    def add_detail(self, detail: dict) -> None:
+        """Adds the detailed response of a battle.
+
+        Args:
+            detail (dict): The data of the detailed response.
+        """
+        battle_id = detail["vsHistoryDetail"]["id"]
+        self.details[battle_id] = encode_json({"data": detail})
+
+    def respond(self, query_name: str, variables: dict) -> bytes | None:
+        """Gets the response to a query.
+
+        Args:
+            query_name (str): The name of the query.
+            variables (dict): The variables of the query.
+
+        Returns:
+            bytes | None: The body of the response, or None if the fixtures do
+                not have it.
+        """
+        if query_name == QueryMap.HOME:
+            return HOME_RESPONSE
+        if query_name == DETAIL_QUERY:
+            return self.details.get(variables.get(DETAIL_VARIABLE, ""), None)
+        return self.overviews.get(query_name, None)
+
+
+class StandInRequestHandler(BaseHTTPRequestHandler):
+    server: "StandInHTTPServer"
+    # Keep connections open, so connection pooling behaves as it does against
+    # SplatNet 3.
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self) -> None:
+        length = int(self.headers.get("Content-Length", 0))
+        body = self.rfile.read(length)
+        cookies = SimpleCookie(self.headers.get("Cookie", ""))
+        standin = cast(StandInServer, self.server.standin)
+        status, payload = standin.handle(
+            self.path,
+            self.headers.get("Authorization", ""),
+            cookies["_gtoken"].value if "_gtoken" in cookies else None,
+            body,
+        )
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format: str, *args) -> None:
+        # Logging every request would dominate the time spent serving it.
+        pass
+
+
+class StandInHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(
+        self,
+        address: tuple[str, int],
+        standin: "BaseStandIn",
+        handler: type[BaseHTTPRequestHandler],
+    ) -> None:
+        super().__init__(address, handler)
+        self.standin = standin
+
+
+class BaseStandIn:
+    # The request handler that passes each request on to the stand-in.
+    handler: type[BaseHTTPRequestHandler] = StandInRequestHandler
+    stats: Any
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        error_rate: float = 0.0,
+        seed: int | None = None,
+    ) -> None:
+        """The parts shared by every stand-in server: the socket, the
+        background thread serving it, the request counts, and the latency and
+        errors added on purpose.
+
+        Args:
+            host (str): The host to listen on. Defaults to "127.0.0.1".
+            port (int): The port to listen on. If 0, a free port is picked.
+                Defaults to 0.
+            latency (float): The time to wait before answering each request,
+                in seconds. Defaults to 0.0.
+            jitter (float): The most the latency may randomly vary by either
+                way, in seconds. Defaults to 0.0.
+            error_rate (float): The fraction of requests that fail with a 503,
+                between 0 and 1. Defaults to 0.0.
+            seed (int | None): The seed of the random latency and errors.
+                Defaults to None.
+        """
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.httpd = StandInHTTPServer((host, port), self, self.handler)
+        self.thread: threading.Thread | None = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def count(self, key: str) -> None:
+        """Adds one to a count in the stats.
+
+        Args:
+            key (str): The name of the count.
+        """
+        with self.lock:
+            self.stats[key] += 1
+
+    def wait(self) -> None:
+        """Waits for the latency of a request, jitter included."""
+        with self.lock:
+            delay = self.latency + self.random.uniform(
+                -self.jitter, self.jitter
+            )
+        if delay > 0:
+            time.sleep(delay)
+
+    def should_fail(self) -> bool:
+        """Decides whether to fail a request on purpose.
+
+        Returns:
+            bool: True if the request should fail.
+        """
+        with self.lock:
+            return self.random.random() < self.error_rate
+
+    def start(self) -> Self:
+        """Starts serving on a background thread.
+
+        Returns:
+            Self: The server itself.
+        """
+        self.thread = threading.Thread(
+            target=self.httpd.serve_forever, daemon=True
+        )
+        self.thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Stops serving and closes the socket."""
+        if self.thread is not None:
+            self.httpd.shutdown()
+            self.thread.join()
+            self.thread = None
+        self.httpd.server_close()
+
+    def __enter__(self) -> Self:
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.stop()
+
+
+class StandInServer(BaseStandIn):
+    def __init__(
+        self,
+        fixtures: FixtureStore,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        error_rate: float = 0.0,
+        token_lifetime: float | None = None,
+        seed: int | None = None,
+    ) -> None:
+        """A local stand-in for SplatNet 3 that answers the queries the
+        ``splatnet`` importer makes from recorded fixtures.
+
+        Queries are posted to ``/api/graphql`` by name, and bullet tokens are
+        handed out by ``/api/bullet_tokens`` for any gtoken, the same way the
+        importer talks to it with ``--standin-url``. Every request can be
+        slowed down and failed on purpose, and bullet tokens can be made to
+        expire, so that the importer's concurrency, retries and token refresh
+        can be measured without touching Nintendo's servers.
+
+        Args:
+            fixtures (FixtureStore): The responses to answer queries with.
+            host (str): The host to listen on. Defaults to "127.0.0.1".
+            port (int): The port to listen on. If 0, a free port is picked.
+                Defaults to 0.
+            latency (float): The time to wait before answering each request,
+                in seconds. Defaults to 0.0.
+            jitter (float): The most the latency may randomly vary by either
+                way, in seconds. Defaults to 0.0.
+            error_rate (float): The fraction of queries that fail with a 503,
+                between 0 and 1. Defaults to 0.0.
+            token_lifetime (float | None): How long the bullet tokens handed
+                out stay valid, in seconds. Queries made with any other token,
+                or with an expired one, fail with a 401. If None, every bullet
+                token is accepted. Defaults to None.
+            seed (int | None): The seed of the random latency and errors.
+                Defaults to None.
+        """
+        super().__init__(
+            host=host,
+            port=port,
+            latency=latency,
+            jitter=jitter,
+            error_rate=error_rate,
+            seed=seed,
+        )
+        self.fixtures = fixtures
+        self.token_lifetime = token_lifetime
+        self.tokens: dict[str, float] = {}
+        self.stats = ServerStats(
+            requests=0,
+            queries=0,
+            injected_errors=0,
+            unauthorized=0,
+            token_refreshes=0,
+            unknown=0,
+        )
+
+    def issue_token(self) -> str:
+        """Hands out a new bullet token.
+
+        Returns:
+            str: The bullet token.
+        """
+        token = secrets.token_urlsafe(32)
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = {
+                key: expiry
+                for key, expiry in self.tokens.items()
+                if expiry > now
+            }
+            self.tokens[token] = now + (self.token_lifetime or 0.0)
+        self.count("token_refreshes")
+        return token
+
+    def is_authorized(self, authorization: str) -> bool:
+        """Checks the bullet token a query was made with.
+
+        Args:
+            authorization (str): The ``Authorization`` header of the query.
+
+        Returns:
+            bool: True if the token is valid.
+        """
+        if self.token_lifetime is None:
+            return True
+        token = authorization.removeprefix("Bearer ")
+        with self.lock:
+            expiry = self.tokens.get(token, None)
+        return expiry is not None and expiry > time.monotonic()
+
+    def handle(
+        self,
+        path: str,
+        authorization: str,
+        gtoken: str | None,
+        body: bytes,
+    ) -> tuple[int, bytes]:
+        """Answers a single request.
+
+        Args:
+            path (str): The path the request was made to.
+            authorization (str): The ``Authorization`` header of the request.
+            gtoken (str | None): The ``_gtoken`` cookie of the request.
+            body (bytes): The body of the request.
+
+        Returns:
+            tuple[int, bytes]: The status code and the body of the response.
+        """
+        self.count("requests")
+        self.wait()
+        if path == STANDIN_BULLET_TOKEN_PATH:
+            if gtoken is None:
+                return 401, b"{}"
+            return 201, encode_json({"bulletToken": self.issue_token()})
+        if path != STANDIN_GRAPHQL_PATH:
+            return 404, b"{}"
+        if self.should_fail():
+            self.count("injected_errors")
+            return INJECTED_ERROR_STATUS, b"{}"
+        if not self.is_authorized(authorization):
+            self.count("unauthorized")
+            return 401, b"{}"
+
+        request = json.loads(body)
+        query_name = request.get("query", "")
+        response = self.fixtures.respond(
+            query_name, request.get("variables", {}) or {}
+        )
+        if response is None:
+            self.count("unknown")
+            return 200, graphql_error(f"No fixture for {query_name}.")
+        self.count("queries")
+        return 200, response
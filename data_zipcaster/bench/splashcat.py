@@ -0,0 +1,190 @@
+from http.server import BaseHTTPRequestHandler
+from typing import TypedDict, cast
+
+import msgpack
+
+from data_zipcaster.bench.server import (
+    INJECTED_ERROR_STATUS,
+    BaseStandIn,
+    StandInHTTPServer,
+)
+from data_zipcaster.cli.exporters.splashcat.plugin import Endpoints
+from data_zipcaster.raw import encode_json
+
+
+class SplashcatStats(TypedDict):
+    """The counts of the requests a Splashcat stand-in has answered.
+
+    Fields:
+        - requests (int): Every request, including the failed ones.
+        - uploads (int): Battles that were accepted.
+        - duplicates (int): Battles uploaded again by the same account.
+        - recent (int): Requests for the battles an account has uploaded.
+        - injected_errors (int): Requests failed on purpose.
+        - unauthorized (int): Requests made without an API key.
+        - invalid (int): Uploads whose body could not be read.
+    """
+
+    requests: int
+    uploads: int
+    duplicates: int
+    recent: int
+    injected_errors: int
+    unauthorized: int
+    invalid: int
+
+
+class SplashcatRequestHandler(BaseHTTPRequestHandler):
+    server: StandInHTTPServer
+    # Keep connections open, so the exporter's connection pool is exercised.
+    protocol_version = "HTTP/1.1"
+
+    def respond(self, method: str) -> None:
+        length = int(self.headers.get("Content-Length", 0))
+        body = self.rfile.read(length)
+        standin = cast(SplashcatStandIn, self.server.standin)
+        status, payload = standin.handle(
+            method,
+            self.path,
+            self.headers.get("Authorization", ""),
+            body,
+        )
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_GET(self) -> None:
+        self.respond("GET")
+
+    def do_POST(self) -> None:
+        self.respond("POST")
+
+    def log_message(self, format: str, *args) -> None:
+        # Logging every request would dominate the time spent serving it.
+        pass
+
+
+class SplashcatStandIn(BaseStandIn):
+    handler = SplashcatRequestHandler
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        error_rate: float = 0.0,
+        seed: int | None = None,
+    ) -> None:
+        """A local stand-in for Splashcat that accepts the uploads of the
+        ``splashcat`` exporter.
+
+        Each API key is treated as its own account. The battles uploaded with
+        a key are remembered, and are listed back by the recent battles
+        endpoint, so the exporter skips them on later runs just as it would
+        against Splashcat. Point the exporter at it with the ``api_url`` key
+        of its config section.
+
+        Args:
+            host (str): The host to listen on. Defaults to "127.0.0.1".
+            port (int): The port to listen on. If 0, a free port is picked.
+                Defaults to 0.
+            latency (float): The time to wait before answering each request,
+                in seconds. Defaults to 0.0.
+            jitter (float): The most the latency may randomly vary by either
+                way, in seconds. Defaults to 0.0.
+            error_rate (float): The fraction of requests that fail with a 503,
+                between 0 and 1. Defaults to 0.0.
+            seed (int | None): The seed of the random latency and errors.
+                Defaults to None.
+        """
+        super().__init__(
+            host=host,
+            port=port,
+            latency=latency,
+            jitter=jitter,
+            error_rate=error_rate,
+            seed=seed,
+        )
+        self.battles: dict[str, set[str]] = {}
+        self.stats = SplashcatStats(
+            requests=0,
+            uploads=0,
+            duplicates=0,
+            recent=0,
+            injected_errors=0,
+            unauthorized=0,
+            invalid=0,
+        )
+
+    def upload(self, api_key: str, body: bytes) -> tuple[int, bytes]:
+        """Accepts the upload of a single battle.
+
+        Args:
+            api_key (str): The API key the battle was uploaded with.
+            body (bytes): The msgpack encoded body of the upload.
+
+        Returns:
+            tuple[int, bytes]: The status code and the body of the response.
+        """
+        try:
+            battle_id = msgpack.unpackb(body)["battle"]["splatnetId"]
+        except (ValueError, KeyError, TypeError):
+            self.count("invalid")
+            return 400, b'{"error": "invalid battle"}'
+
+        with self.lock:
+            uploaded = self.battles.setdefault(api_key, set())
+            duplicate = battle_id in uploaded
+            uploaded.add(battle_id)
+        self.count("duplicates" if duplicate else "uploads")
+        return 200, b'{"status": "ok"}'
+
+    def recent(self, api_key: str) -> tuple[int, bytes]:
+        """Lists the battles uploaded with an API key.
+
+        Args:
+            api_key (str): The API key.
+
+        Returns:
+            tuple[int, bytes]: The status code and the body of the response.
+        """
+        with self.lock:
+            battle_ids = sorted(self.battles.get(api_key, ()))
+        self.count("recent")
+        return 200, encode_json({"battle_ids": battle_ids})
+
+    def handle(
+        self, method: str, path: str, authorization: str, body: bytes
+    ) -> tuple[int, bytes]:
+        """Answers a single request.
+
+        Args:
+            method (str): The HTTP method of the request.
+            path (str): The path the request was made to.
+            authorization (str): The ``Authorization`` header of the request.
+            body (bytes): The body of the request.
+
+        Returns:
+            tuple[int, bytes]: The status code and the body of the response.
+        """
+        self.count("requests")
+        self.wait()
+        route = (method, path)
+        if route not in (
+            ("GET", Endpoints.recent_battles),
+            ("POST", Endpoints.upload_battle),
+        ):
+            return 404, b"{}"
+        if self.should_fail():
+            self.count("injected_errors")
+            return INJECTED_ERROR_STATUS, b"{}"
+        api_key = authorization.removeprefix("Bearer ")
+        if not api_key:
+            self.count("unauthorized")
+            return 401, b"{}"
+        if method == "GET":
+            return self.recent(api_key)
+        return self.upload(api_key, body)
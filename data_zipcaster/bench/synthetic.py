@@ -0,0 +1,1086 @@
+import datetime as dt
+import functools
+import hashlib
+import itertools
+import random
+import string
+import uuid
+from typing import Iterable, Iterator, TypedDict, get_args
+
+from data_zipcaster.assets import GEAR_HASHES
+from data_zipcaster.constants import MODES, RANKS, Mode
+from data_zipcaster.models import main, splatnet
+from data_zipcaster.raw import RawDumpWriter
+from data_zipcaster.utils import base64_encode
+from data_zipcaster.views.splashcat.conversions import ABILITY_MAP
+
+# The modes the generator can produce battles for, by importer flag. Salmon
+# Run is left out since it is not a vs mode.
+FLAGS = ("turf", "anarchy", "xbattle", "challenge", "private")
+HISTORY_KEYS = {
+    "turf": "regularBattleHistories",
+    "anarchy": "bankaraBattleHistories",
+    "xbattle": "xBattleHistories",
+    "challenge": "eventBattleHistories",
+    "private": "privateBattleHistories",
+}
+# SplatNet 3 only lists the most recent battles of each mode in an overview.
+OVERVIEW_LIMIT = 50
+DEFAULT_NEWEST = dt.datetime(2023, 6, 1, 12, 0, 0)
+IMAGE_URL = "https://api.lp1.av5ja.srv.nintendo.net/resources/prod/v2"
+PLAYED_TIME_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
+ID_TIME_FORMAT = "%Y%m%dT%H%M%S"
+
+VS_MODE_NAMES = {
+    MODES.TURF_WAR["_id"]: "REGULAR",
+    MODES.ANARCHY_SERIES["_id"]: "BANKARA",
+    MODES.ANARCHY_OPEN["_id"]: "BANKARA",
+    MODES.X_BATTLE["_id"]: "X_MATCH",
+    MODES.LEAGUE_BATTLE["_id"]: "LEAGUE",
+    MODES.PRIVATE_BATTLE["_id"]: "PRIVATE",
+    MODES.SPLATFEST["_id"]: "FEST",
+    MODES.SPLATFEST_PRO["_id"]: "FEST",
+    MODES.SPLATFEST_TRICOLOR["_id"]: "FEST",
+}
+RULES: dict[splatnet.RuleType, tuple[int, str]] = {
+    "TURF_WAR": (0, "Turf War"),
+    "AREA": (1, "Splat Zones"),
+    "LOFT": (2, "Tower Control"),
+    "GOAL": (3, "Rainmaker"),
+    "CLAM": (4, "Clam Blitz"),
+    "TRICOLOR": (5, "Tricolor Turf War"),
+}
+RANKED_RULES: tuple[splatnet.RuleType, ...] = ("AREA", "LOFT", "GOAL", "CLAM")
+STAGES = (
+    (1, "Scorch Gorge"),
+    (2, "Eeltail Alley"),
+    (3, "Hagglefish Market"),
+    (4, "Undertow Spillway"),
+    (5, "Um'ami Ruins"),
+    (6, "Mincemeat Metalworks"),
+    (7, "Brinewater Springs"),
+    (8, "Barnacle & Dime"),
+    (9, "Flounder Heights"),
+    (10, "Hammerhead Bridge"),
+    (11, "Museum d'Alfonsino"),
+    (12, "Mahi-Mahi Resort"),
+    (13, "Inkblot Art Academy"),
+    (14, "Sturgeon Shipyard"),
+    (15, "MakoMart"),
+    (16, "Wahoo World"),
+)
+# Weapon ID, name, sub weapon ID and name, special weapon ID and name.
+WEAPONS = (
+    (0, "Sploosh-o-matic", (7, "Curling Bomb"), (11, "Ultra Stamp")),
+    (10, "Splattershot Jr.", (0, "Splat Bomb"), (4, "Big Bubbler")),
+    (40, "Splattershot", (1, "Suction Bomb"), (1, "Trizooka")),
+    (50, ".52 Gal", (5, "Splash Wall"), (6, "Killer Wail 5.1")),
+    (200, "Luna Blaster", (0, "Splat Bomb"), (5, "Zipcaster")),
+    (1000, "Carbon Roller", (8, "Autobomb"), (5, "Zipcaster")),
+    (1010, "Splat Roller", (7, "Curling Bomb"), (4, "Big Bubbler")),
+    (2010, "Splat Charger", (0, "Splat Bomb"), (8, "Ink Vac")),
+    (3000, "Slosher", (0, "Splat Bomb"), (3, "Triple Inkstrike")),
+    (4000, "Mini Splatling", (2, "Burst Bomb"), (11, "Ultra Stamp")),
+    (5000, "Dapple Dualies", (10, "Squid Beakon"), (12, "Tacticooler")),
+    (6000, "Splat Brella", (4, "Sprinkler"), (3, "Triple Inkstrike")),
+    (7010, "Tri-Stringer", (13, "Toxic Mist"), (6, "Killer Wail 5.1")),
+    (8000, "Splatana Stamper", (2, "Burst Bomb"), (5, "Zipcaster")),
+)
+BRANDS = (
+    (0, "Squidforce"),
+    (1, "Zink"),
+    (2, "Krak-On"),
+    (3, "Rockenberg"),
+    (4, "Zekko"),
+    (5, "Forge"),
+    (6, "Firefin"),
+    (7, "Skalop"),
+    (10, "Tentatek"),
+    (11, "Takoroka"),
+)
+GEAR_NAMES = {
+    "HeadGear": ("White Headband", "Squash Headband", "Studio Headphones"),
+    "ClothingGear": ("Basic Tee", "Squidmark Sweatshirt", "Hero Jacket"),
+    "ShoesGear": ("Cream Basics", "Blue Lo-Tops", "Red Hi-Horses"),
+}
+MAIN_ONLY_ABILITIES = {
+    "HeadGear": ("opening_gambit", "last_ditch_effort", "tenacity", "comeback"),
+    "ClothingGear": (
+        "ninja_squid",
+        "haunt",
+        "thermal_ink",
+        "respawn_punisher",
+        "ability_doubler",
+    ),
+    "ShoesGear": ("stealth_jump", "object_shredder", "drop_roller"),
+}
+STACKABLE_ABILITIES = tuple(
+    ability
+    for ability in get_args(main.StackableAbilityType)
+    if ability is not None
+)
+ABILITY_HASHES = {ability: key for key, ability in GEAR_HASHES.items()}
+AWARDS = (
+    "#1 Splatter",
+    "#1 Turf Inker",
+    "#1 Super Jump Spot",
+    "#1 Ink Consumer",
+    "#1 Score Booster",
+    "#1 Clam Carrier",
+    "Most Splatted",
+)
+FEST_TEAMS = ("Shiver", "Frye", "Big Man")
+FEST_UNIFORMS = ("Power Uniform", "Speed Uniform", "Defense Uniform")
+LEAGUE_EVENTS = (
+    ("SpecialRush", "Too Many Trizookas!"),
+    ("MonthlyLeague", "Monthly Challenge"),
+    ("NewSeasonCup", "Grab Your Gear!"),
+)
+NAME_CHARS = string.ascii_letters + string.digits
+
+
+class SyntheticGroup(TypedDict):
+    """One history group of a synthetic overview, with the detailed responses
+    of its battles.
+
+    Fields:
+        - group (dict): The group, as it appears in the ``historyGroups`` of
+            an overview response.
+        - details (list[dict]): The data of the detailed response of every
+            battle in the group, newest first, each holding its
+            ``vsHistoryDetail``.
+    """
+
+    group: dict
+    details: list[dict]
+
+
+@functools.lru_cache(maxsize=None)
+def image(kind: str, key: str) -> dict:
+    """Builds an image in the shape SplatNet 3 uses, under a made up hash.
+
+    Args:
+        kind (str): The kind of image, used as the directory of the URL.
+        key (str): What the image is of, hashed into the file name.
+
+    Returns:
+        dict: The image, holding its ``url``.
+    """
+    digest = hashlib.sha256(f"{kind}:{key}".encode("utf-8")).hexdigest()
+    return {"url": f"{IMAGE_URL}/{kind}/{digest}_0.png"}
+
+
+@functools.lru_cache(maxsize=None)
+def gear_power(ability: str | None) -> dict:
+    """Builds a gear ability whose image resolves in ``GEAR_HASHES``.
+
+    Args:
+        ability (str | None): The ability, or None for an empty slot.
+
+    Returns:
+        dict: The gear power.
+    """
+    name = ABILITY_MAP.get(str(ability), "Unknown")
+    url = f"{IMAGE_URL}/skill_img/{ABILITY_HASHES[ability]}_0.png"
+    return {"name": name, "image": {"url": url}}
+
+
+@functools.lru_cache(maxsize=None)
+def weapon(index: int) -> dict:
+    """Builds a weapon of ``WEAPONS`` with its sub and special.
+
+    Args:
+        index (int): The position of the weapon in ``WEAPONS``.
+
+    Returns:
+        dict: The weapon, as it appears in a player of a detailed response.
+    """
+    weapon_id, name, (sub_id, sub_name), (special_id, special_name) = WEAPONS[
+        index
+    ]
+    special_image = image("special_img", special_name)["url"]
+    return {
+        "name": name,
+        "image": image("weapon_illust", name),
+        "specialWeapon": {
+            "maskingImage": {
+                "width": 1024,
+                "height": 1024,
+                "maskImageUrl": special_image,
+                "overlayImageUrl": special_image,
+            },
+            "id": base64_encode(f"SpecialWeapon-{special_id}"),
+            "name": special_name,
+            "image": image("special_img", special_name),
+        },
+        "id": base64_encode(f"Weapon-{weapon_id}"),
+        "image3d": image("weapon_illust_3d", name),
+        "image2d": image("weapon_illust_2d", name),
+        "image3dThumbnail": image("weapon_illust_3d_thumb", name),
+        "image2dThumbnail": image("weapon_illust_2d_thumb", name),
+        "subWeapon": {
+            "name": sub_name,
+            "image": image("sub_img", sub_name),
+            "id": base64_encode(f"SubWeapon-{sub_id}"),
+        },
+    }
+
+
+@functools.lru_cache(maxsize=None)
+def brand(index: int) -> dict:
+    """Builds a brand of ``BRANDS``.
+
+    Args:
+        index (int): The position of the brand in ``BRANDS``.
+
+    Returns:
+        dict: The brand.
+    """
+    brand_id, name = BRANDS[index]
+    usual = STACKABLE_ABILITIES[index % len(STACKABLE_ABILITIES)]
+    return {
+        "name": name,
+        "image": image("brand_img", name),
+        "id": base64_encode(f"Brand-{brand_id}"),
+        "usualGearPower": {
+            **gear_power(usual),
+            "desc": f"Makes {ABILITY_MAP[usual]} more likely to appear.",
+            "isEmptySlot": False,
+        },
+    }
+
+
+@functools.lru_cache(maxsize=None)
+def stage(index: int) -> dict:
+    """Builds a stage of ``STAGES``.
+
+    Args:
+        index (int): The position of the stage in ``STAGES``.
+
+    Returns:
+        dict: The stage.
+    """
+    stage_id, name = STAGES[index]
+    return {
+        "name": name,
+        "image": image("stage_img", name),
+        "id": base64_encode(f"VsStage-{stage_id}"),
+    }
+
+
+@functools.lru_cache(maxsize=None)
+def vs_rule(rule: splatnet.RuleType) -> dict:
+    """Builds a rule.
+
+    Args:
+        rule (splatnet.RuleType): The rule.
+
+    Returns:
+        dict: The rule.
+    """
+    rule_id, name = RULES[rule]
+    return {
+        "name": name,
+        "id": base64_encode(f"VsRule-{rule_id}"),
+        "rule": rule,
+    }
+
+
+@functools.lru_cache(maxsize=None)
+def vs_mode(mode_id: int) -> dict:
+    """Builds a mode.
+
+    Args:
+        mode_id (int): The ID of the mode, as in ``constants.MODES``.
+
+    Returns:
+        dict: The mode.
+    """
+    return {
+        "mode": VS_MODE_NAMES[mode_id],
+        "id": base64_encode(f"VsMode-{mode_id}"),
+    }
+
+
+class BattleFactory:
+    def __init__(
+        self,
+        flag: str,
+        seed: int | str | None = None,
+        newest: dt.datetime = DEFAULT_NEWEST,
+        splatfest: bool = False,
+    ) -> None:
+        """Makes up the battles of a single account in a single mode.
+
+        The battles are generated newest first, one history group at a time,
+        going back in time from ``newest``. Every payload is shaped exactly
+        like the responses of SplatNet 3, ``__typename`` keys included, and
+        holds every field the SplatNet models require. IDs are base64 encoded
+        just as SplatNet 3 encodes them, and the images of gear abilities
+        resolve in ``GEAR_HASHES``.
+
+        The same seed always produces the same battles. To keep generation
+        cheap, payloads share the parts that never change between battles,
+        such as weapons and stages, so they must not be modified in place.
+
+        Args:
+            flag (str): The importer flag of the mode, one of ``FLAGS``.
+            seed (int | str | None): The seed of the battles. Defaults to
+                None, which picks a random seed.
+            newest (dt.datetime): When the newest battle ends, in UTC.
+                Defaults to ``DEFAULT_NEWEST``.
+            splatfest (bool): Whether to also generate Splatfest battles,
+                including Tricolor battles, among the Turf War battles.
+                Defaults to False.
+
+        Raises:
+            ValueError: If the flag is not one of ``FLAGS``.
+        """
+        if flag not in FLAGS:
+            raise ValueError(f"Cannot generate battles for {flag!r}.")
+        self.flag = flag
+        self.random = random.Random(f"{seed}:{flag}")
+        self.cursor = newest
+        self.splatfest = splatfest
+        self.npln_id = self.make_npln_id()
+        self.name = self.make_name()
+        self.name_id = f"{self.random.randint(1000, 9999)}"
+        self.weapon_index = self.random.randrange(len(WEAPONS))
+        self.rank = self.random.choice(RANKS)
+        self.s_plus = self.random.randint(0, 50)
+        self.x_power = self.random.uniform(1500.0, 3000.0)
+
+    def make_npln_id(self) -> str:
+        return "u-" + "".join(
+            self.random.choices(string.ascii_lowercase + string.digits, k=20)
+        )
+
+    def make_name(self) -> str:
+        return "".join(self.random.choices(NAME_CHARS, k=8))
+
+    def udemae(self) -> str:
+        """Gets the rank of the account in the form SplatNet 3 writes it.
+
+        Returns:
+            str: The rank, such as ``A-`` or ``S+12``.
+        """
+        if self.rank == "S+":
+            return f"S+{self.s_plus}"
+        return self.rank
+
+    def gear(self, kind: str) -> dict:
+        """Makes up a piece of gear.
+
+        Args:
+            kind (str): The ``__isGear`` of the gear, such as ``HeadGear``.
+
+        Returns:
+            dict: The gear.
+        """
+        rng = self.random
+        if rng.random() < 0.3:
+            primary = rng.choice(MAIN_ONLY_ABILITIES[kind])
+        else:
+            primary = rng.choice(STACKABLE_ABILITIES)
+        additional: list[str | None] = [
+            rng.choice(STACKABLE_ABILITIES) if rng.random() < 0.9 else None
+            for _ in range(rng.randint(1, 3))
+        ]
+        name = rng.choice(GEAR_NAMES[kind])
+        return {
+            "name": name,
+            "thumbnailImage": image("gear_thumb", name),
+            "__isGear": kind,
+            "primaryGearPower": gear_power(primary),
+            "additionalGearPowers": [
+                gear_power(ability) for ability in additional
+            ],
+            "originalImage": image("gear_img", name),
+            "brand": brand(rng.randrange(len(BRANDS))),
+        }
+
+    def nameplate(self) -> dict:
+        rng = self.random
+        badges: list[dict | None] = []
+        for _ in range(3):
+            if rng.random() < 0.4:
+                badges.append(None)
+                continue
+            badge_id = rng.randint(1, 5000)
+            badges.append(
+                {
+                    "image": image("badge_img", str(badge_id)),
+                    "id": base64_encode(f"Badge-{badge_id}"),
+                }
+            )
+        background_id = rng.randint(1, 1000)
+        return {
+            "badges": badges,
+            "background": {
+                "textColor": {
+                    "a": 1.0,
+                    "b": rng.random(),
+                    "g": rng.random(),
+                    "r": rng.random(),
+                },
+                "image": image("npl_img", str(background_id)),
+                "id": base64_encode(f"NameplateBackground-{background_id}"),
+            },
+        }
+
+    def player(
+        self,
+        battle_key: str,
+        me: bool,
+        rule: splatnet.RuleType,
+        splatfest: bool,
+        disconnected: bool = False,
+    ) -> dict:
+        """Makes up a player of a team.
+
+        Args:
+            battle_key (str): The part of the battle ID after the account,
+                shared by the IDs of every player in the battle.
+            me (bool): Whether the player is the account itself.
+            rule (splatnet.RuleType): The rule of the battle.
+            splatfest (bool): Whether the battle is a Splatfest battle.
+            disconnected (bool): Whether the player disconnected, in which
+                case they have no result. Defaults to False.
+
+        Returns:
+            dict: The player.
+        """
+        rng = self.random
+        npln_id = self.npln_id if me else self.make_npln_id()
+        kill = rng.randint(0, 20)
+        result = None
+        if not disconnected:
+            result = {
+                "kill": kill,
+                "death": rng.randint(0, 15),
+                "assist": rng.randint(0, min(kill, 8)),
+                "special": rng.randint(0, 8),
+                "noroshiTry": (
+                    rng.randint(0, 3) if rule == "TRICOLOR" else None
+                ),
+            }
+        dragon = None
+        if splatfest:
+            dragon = rng.choices(
+                ("NONE", "DRAGON", "DOUBLE_DRAGON"), weights=(90, 8, 2)
+            )[0]
+        return {
+            "__isPlayer": "VsPlayer",
+            "byname": "Fresh Inkling",
+            "name": self.name if me else self.make_name(),
+            "nameId": self.name_id if me else f"{rng.randint(1000, 9999)}",
+            "nameplate": self.nameplate(),
+            "id": base64_encode(
+                f"VsPlayer-{self.npln_id}:{battle_key}:{npln_id}"
+            ),
+            "headGear": self.gear("HeadGear"),
+            "clothingGear": self.gear("ClothingGear"),
+            "shoesGear": self.gear("ShoesGear"),
+            "paint": rng.randint(0, 1800),
+            "isMyself": me,
+            "weapon": weapon(
+                self.weapon_index if me else rng.randrange(len(WEAPONS))
+            ),
+            "species": rng.choice(("INKLING", "OCTOLING")),
+            "result": result,
+            "crown": rng.random() < 0.02,
+            "festDragonCert": dragon,
+        }
+
+    def team_results(
+        self,
+        rule: splatnet.RuleType,
+        sizes: list[int],
+        winner: int,
+    ) -> tuple[list[dict], splatnet.KnockoutType | None]:
+        """Makes up the results of every team in a battle.
+
+        Args:
+            rule (splatnet.RuleType): The rule of the battle.
+            sizes (list[int]): The number of players of every team.
+            winner (int): The position of the team that won.
+
+        Returns:
+            tuple[list[dict], splatnet.KnockoutType | None]: The result of
+                every team, and the knockout from the first team's point of
+                view, which is None for turf battles.
+        """
+        rng = self.random
+        if rule in ("TURF_WAR", "TRICOLOR"):
+            weights = [rng.uniform(0.2, 1.0) for _ in sizes]
+            weights[winner] = max(weights) + rng.uniform(0.01, 0.5)
+            total = sum(weights)
+            return [
+                {
+                    "paintRatio": weight / total,
+                    "score": None,
+                    "noroshi": (
+                        rng.randint(0, 5)
+                        if rule == "TRICOLOR" and idx > 0
+                        else None
+                    ),
+                }
+                for idx, weight in enumerate(weights)
+            ], None
+
+        if rng.random() < 0.25:
+            scores = [100, rng.randint(0, 99)]
+            knockout: splatnet.KnockoutType = "WIN" if winner == 0 else "LOSE"
+        else:
+            high = rng.randint(1, 99)
+            scores = [high, rng.randint(0, high - 1)]
+            knockout = "NEITHER"
+        if winner != 0:
+            scores.reverse()
+        return [
+            {"paintRatio": None, "score": score, "noroshi": None}
+            for score in scores
+        ], knockout
+
+    def battle(
+        self,
+        mode: Mode,
+        rule: splatnet.RuleType,
+        win: bool,
+        played: dt.datetime,
+        duration: int,
+    ) -> tuple[dict, dict]:
+        """Makes up a single battle.
+
+        Args:
+            mode (Mode): The mode of the battle, from ``constants.MODES``.
+            rule (splatnet.RuleType): The rule of the battle.
+            win (bool): Whether the account won.
+            played (dt.datetime): When the battle started, in UTC.
+            duration (int): How long the battle lasted, in seconds.
+
+        Returns:
+            tuple[dict, dict]: The node of the battle in the overview, and the
+                data of its detailed response. The mode specific parts of
+                both are left to the caller.
+        """
+        rng = self.random
+        splatfest = "splatfest" in mode["properties"]
+        battle_key = "RECENT:{}_{}".format(
+            played.strftime(ID_TIME_FORMAT),
+            uuid.UUID(int=rng.getrandbits(128)),
+        )
+        battle_id = base64_encode(
+            f"VsHistoryDetail-{self.npln_id}:{battle_key}"
+        )
+
+        # The account's team comes first. In Tricolor battles, the defending
+        # team has four players and each attacking team has two.
+        if rule == "TRICOLOR":
+            roles = ["DEFENSE", "ATTACK1", "ATTACK2"]
+            if rng.random() < 0.5:
+                roles[0], roles[1] = roles[1], roles[0]
+            sizes = [4 if role == "DEFENSE" else 2 for role in roles]
+            winner = 0 if win else rng.randint(1, 2)
+        else:
+            roles = []
+            sizes = [4, 4]
+            winner = 0 if win else 1
+        results, knockout = self.team_results(rule, sizes, winner)
+        fest_teams = rng.sample(FEST_TEAMS, k=len(sizes))
+
+        # Every so often another player disconnects. When it is a teammate
+        # in a battle that does not count towards a series, the loss is
+        # exempted.
+        judgement: splatnet.ResultType = "WIN" if win else "LOSE"
+        disconnected: tuple[int, int] | None = None
+        if rng.random() < 0.01:
+            team_idx = rng.randrange(len(sizes))
+            first = 1 if team_idx == 0 else 0
+            disconnected = (
+                team_idx,
+                rng.randint(first, sizes[team_idx] - 1),
+            )
+            if (
+                team_idx == 0
+                and not win
+                and mode in (MODES.TURF_WAR, MODES.ANARCHY_OPEN)
+            ):
+                judgement = "EXEMPTED_LOSE"
+
+        teams: list[dict] = []
+        for team_idx, size in enumerate(sizes):
+            players = [
+                self.player(
+                    battle_key,
+                    me=(team_idx == 0 and idx == 0),
+                    rule=rule,
+                    splatfest=splatfest,
+                    disconnected=disconnected == (team_idx, idx),
+                )
+                for idx in range(size)
+            ]
+            rng.shuffle(players)
+            teams.append(
+                {
+                    "color": {
+                        "a": 1.0,
+                        "b": rng.random(),
+                        "g": rng.random(),
+                        "r": rng.random(),
+                    },
+                    "result": results[team_idx],
+                    "tricolorRole": roles[team_idx] if roles else None,
+                    "festTeamName": (
+                        fest_teams[team_idx] if splatfest else None
+                    ),
+                    "festUniformBonusRate": (
+                        rng.choice((None, 0.02, 0.05)) if splatfest else None
+                    ),
+                    "festUniformName": (
+                        rng.choice(FEST_UNIFORMS) if splatfest else None
+                    ),
+                    "festStreakWinCount": (
+                        rng.randint(0, 10) if splatfest else None
+                    ),
+                    "judgement": "WIN" if team_idx == winner else "LOSE",
+                    "players": players,
+                    "order": team_idx + 1,
+                }
+            )
+
+        me = next(
+            player for player in teams[0]["players"] if player["isMyself"]
+        )
+        stage_data = stage(rng.randrange(len(STAGES)))
+        detail = {
+            "__typename": "VsHistoryDetail",
+            "id": battle_id,
+            "vsRule": vs_rule(rule),
+            "vsMode": vs_mode(mode["_id"]),
+            "player": {
+                key: me[key]
+                for key in splatnet.PlayerRoot.model_fields
+                if key != "isPlayer"
+            }
+            | {"__isPlayer": "VsPlayer"},
+            "judgement": judgement,
+            "myTeam": teams[0],
+            "vsStage": stage_data,
+            "festMatch": None,
+            "knockout": knockout,
+            "otherTeams": teams[1:],
+            "bankaraMatch": None,
+            "leagueMatch": None,
+            "xMatch": None,
+            "duration": duration,
+            "playedTime": played.strftime(PLAYED_TIME_FORMAT),
+            "awards": [
+                {"name": name, "rank": rng.choice(("GOLD", "SILVER"))}
+                for name in rng.sample(AWARDS, k=rng.randint(1, 3))
+            ],
+            "nextHistoryDetail": None,
+            "previousHistoryDetail": None,
+        }
+        if splatfest:
+            pro = mode == MODES.SPLATFEST_PRO
+            detail["festMatch"] = {
+                "dragonMatchType": rng.choices(
+                    ("NORMAL", "DECUPLE", "DRAGON", "DOUBLE_DRAGON"),
+                    weights=(85, 10, 4, 1),
+                )[0],
+                "contribution": rng.randint(0, 50),
+                "jewel": rng.randint(0, 10),
+                "myFestPower": rng.uniform(1000, 2500) if pro else None,
+            }
+
+        node = {
+            "__typename": "VsHistoryDetail",
+            "id": battle_id,
+            "vsMode": detail["vsMode"],
+            "vsRule": detail["vsRule"],
+            "vsStage": stage_data,
+            "judgement": judgement,
+            "player": {
+                "weapon": {
+                    key: me["weapon"][key] for key in ("name", "image", "id")
+                },
+                "id": me["id"],
+                "festGrade": "Fanatic" if splatfest else None,
+            },
+            "knockout": knockout,
+            "myTeam": {
+                "result": {
+                    "paintPoint": me["paint"],
+                    "score": results[0]["score"],
+                }
+            },
+            "nextHistoryDetail": None,
+            "previousHistoryDetail": None,
+            "udemae": None,
+            "bankaraMatch": None,
+            "playedTime": detail["playedTime"],
+        }
+        return node, detail
+
+    def group_battles(
+        self,
+        mode: Mode,
+        rules: list[splatnet.RuleType],
+        wins: list[bool],
+    ) -> SyntheticGroup:
+        """Makes up the battles of a history group, ending at the cursor, and
+        moves the cursor back past them.
+
+        Args:
+            mode (Mode): The mode of the battles.
+            rules (list[splatnet.RuleType]): The rule of every battle, oldest
+                first.
+            wins (list[bool]): Whether the account won every battle, oldest
+                first.
+
+        Returns:
+            SyntheticGroup: The group, holding only its battles.
+        """
+        rng = self.random
+        battles: list[tuple[dict, dict]] = []
+        end = self.cursor
+        for rule, win in zip(reversed(rules), reversed(wins)):
+            if rule in ("TURF_WAR", "TRICOLOR"):
+                duration = 180
+            else:
+                duration = rng.randint(60, 300)
+            played = end - dt.timedelta(seconds=duration)
+            battles.append(self.battle(mode, rule, win, played, duration))
+            end = played - dt.timedelta(seconds=rng.randint(20, 300))
+        self.cursor = end - dt.timedelta(minutes=rng.randint(10, 60 * 24))
+        return SyntheticGroup(
+            group={"historyDetails": {"nodes": [node for node, _ in battles]}},
+            details=[{"vsHistoryDetail": detail} for _, detail in battles],
+        )
+
+    def series_results(
+        self, max_wins: int, max_losses: int, limit: int
+    ) -> list[bool]:
+        """Plays out a series until it is won, lost, or ``limit`` battles
+        have been played.
+
+        Args:
+            max_wins (int): The wins that end the series.
+            max_losses (int): The losses that end the series.
+            limit (int): The most battles to play.
+
+        Returns:
+            list[bool]: Whether every battle was won, oldest first.
+        """
+        wins: list[bool] = []
+        while (
+            len(wins) < limit
+            and wins.count(True) < max_wins
+            and wins.count(False) < max_losses
+        ):
+            wins.append(self.random.random() < 0.5)
+        return wins
+
+    def turf_group(self, limit: int) -> SyntheticGroup:
+        rng = self.random
+        mode = MODES.TURF_WAR
+        if self.splatfest and rng.random() < 0.5:
+            mode = rng.choice(
+                (
+                    MODES.SPLATFEST,
+                    MODES.SPLATFEST_PRO,
+                    MODES.SPLATFEST_TRICOLOR,
+                )
+            )
+        count = min(rng.randint(1, 10), limit)
+        rules: list[splatnet.RuleType] = []
+        for _ in range(count):
+            tricolor = mode == MODES.SPLATFEST_TRICOLOR and rng.random() < 0.5
+            rules.append("TRICOLOR" if tricolor else "TURF_WAR")
+        wins = [rng.random() < 0.5 for _ in range(count)]
+        return self.group_battles(mode, rules, wins)
+
+    def private_group(self, limit: int) -> SyntheticGroup:
+        rng = self.random
+        count = min(rng.randint(1, 10), limit)
+        rule = rng.choice(("TURF_WAR", *RANKED_RULES))
+        wins = [rng.random() < 0.5 for _ in range(count)]
+        return self.group_battles(MODES.PRIVATE_BATTLE, [rule] * count, wins)
+
+    def anarchy_group(self, limit: int, newest: bool) -> SyntheticGroup:
+        """Makes up either an Anarchy Series or a group of Anarchy Open
+        battles.
+
+        Args:
+            limit (int): The most battles the group may hold.
+            newest (bool): Whether this is the newest group, the only one
+                whose series may still be in progress.
+
+        Returns:
+            SyntheticGroup: The group.
+        """
+        rng = self.random
+        udemae = self.udemae()
+        if rng.random() < 0.5:
+            count = min(rng.randint(1, 10), limit)
+            rules = [rng.choice(RANKED_RULES) for _ in range(count)]
+            wins = [rng.random() < 0.5 for _ in range(count)]
+            group = self.group_battles(MODES.ANARCHY_OPEN, rules, wins)
+            group["group"]["bankaraMatchChallenge"] = None
+            for node, detail in zip(
+                group["group"]["historyDetails"]["nodes"], group["details"]
+            ):
+                points = rng.randint(1, 12)
+                if node["judgement"] != "WIN":
+                    points = -points
+                power = {"power": rng.uniform(1000, 2500)}
+                node["udemae"] = udemae
+                node["bankaraMatch"] = {"earnedUdemaePoint": points}
+                detail["vsHistoryDetail"]["bankaraMatch"] = {
+                    "earnedUdemaePoint": points,
+                    "mode": "OPEN",
+                    "bankaraPower": power if rng.random() < 0.5 else None,
+                }
+            return group
+
+        limit = min(limit, rng.randint(1, 7) if newest else 7)
+        wins = self.series_results(5, 3, limit)
+        rules = [rng.choice(RANKED_RULES)] * len(wins)
+        group = self.group_battles(MODES.ANARCHY_SERIES, rules, wins)
+        win_count = wins.count(True)
+        lose_count = wins.count(False)
+        over = win_count == 5 or lose_count == 3
+        is_promo = rng.random() < 0.2
+        group["group"]["bankaraMatchChallenge"] = {
+            "winCount": win_count,
+            "loseCount": lose_count,
+            "maxWinCount": 5,
+            "maxLoseCount": 3,
+            "state": (
+                ("SUCCEEDED" if win_count == 5 else "FAILED")
+                if over
+                else "INPROGRESS"
+            ),
+            "isPromo": is_promo,
+            "isUdemaeUp": is_promo and win_count == 5,
+            "udemaeAfter": udemae if over else None,
+            "earnedUdemaePoint": (
+                rng.randint(-20, 40) if over and not is_promo else None
+            ),
+        }
+        for node, detail in zip(
+            group["group"]["historyDetails"]["nodes"], group["details"]
+        ):
+            node["udemae"] = udemae
+            node["bankaraMatch"] = {"earnedUdemaePoint": None}
+            detail["vsHistoryDetail"]["bankaraMatch"] = {
+                "earnedUdemaePoint": None,
+                "mode": "CHALLENGE",
+                "bankaraPower": None,
+            }
+        return group
+
+    def x_group(self, limit: int, newest: bool) -> SyntheticGroup:
+        """Makes up the battles of an X Battle series.
+
+        Args:
+            limit (int): The most battles the group may hold.
+            newest (bool): Whether this is the newest group, the only one
+                whose series may still be in progress.
+
+        Returns:
+            SyntheticGroup: The group.
+        """
+        rng = self.random
+        limit = min(limit, rng.randint(1, 5) if newest else 5)
+        wins = self.series_results(3, 3, limit)
+        rule = rng.choice(RANKED_RULES)
+        group = self.group_battles(MODES.X_BATTLE, [rule] * len(wins), wins)
+        win_count = wins.count(True)
+        lose_count = wins.count(False)
+        over = win_count == 3 or lose_count == 3
+        power_after = self.x_power + rng.uniform(-50, 50)
+        group["group"]["xMatchMeasurement"] = {
+            "state": "COMPLETED" if over else "INPROGRESS",
+            "xPowerAfter": power_after if over else None,
+            "isInitial": False,
+            "winCount": win_count,
+            "loseCount": lose_count,
+            "maxInitialBattleCount": 5,
+            "maxWinCount": 3,
+            "maxLoseCount": 3,
+            "vsRule": vs_rule(rule),
+        }
+        for detail in group["details"]:
+            detail["vsHistoryDetail"]["xMatch"] = {
+                "lastXPower": self.x_power
+            }
+        if over:
+            self.x_power = power_after
+        return group
+
+    def challenge_group(self, limit: int) -> SyntheticGroup:
+        rng = self.random
+        count = min(rng.randint(1, 5), limit)
+        rule = rng.choice(RANKED_RULES)
+        key, name = rng.choice(LEAGUE_EVENTS)
+        event = {
+            "name": name,
+            "id": base64_encode(f"LeagueMatchEvent-{key}"),
+        }
+        power = rng.uniform(1000, 2500)
+        wins = [rng.random() < 0.5 for _ in range(count)]
+        group = self.group_battles(
+            MODES.LEAGUE_BATTLE, [rule] * count, wins
+        )
+        group["group"]["leagueMatchHistoryGroup"] = {
+            "leagueMatchEvent": event,
+            "vsRule": vs_rule(rule),
+            "teamComposition": rng.choice(("SOLO", "TEAM")),
+            "myLeaguePower": power,
+        }
+        for detail in group["details"]:
+            detail["vsHistoryDetail"]["leagueMatch"] = {
+                "leagueMatchEvent": event,
+                "myLeaguePower": power,
+            }
+        return group
+
+    def group(self, limit: int, newest: bool = False) -> SyntheticGroup:
+        """Makes up the next history group, going back in time.
+
+        Args:
+            limit (int): The most battles the group may hold.
+            newest (bool): Whether this is the newest group. Defaults to
+                False.
+
+        Returns:
+            SyntheticGroup: The group.
+        """
+        if self.flag == "anarchy":
+            return self.anarchy_group(limit, newest)
+        if self.flag == "xbattle":
+            return self.x_group(limit, newest)
+        if self.flag == "challenge":
+            return self.challenge_group(limit)
+        if self.flag == "private":
+            return self.private_group(limit)
+        return self.turf_group(limit)
+
+    def groups(self, count: int) -> Iterator[SyntheticGroup]:
+        """Makes up history groups, newest first, until they hold ``count``
+        battles. Groups are made one at a time as they are consumed, so any
+        number of battles can be generated without holding them in memory.
+
+        Args:
+            count (int): The number of battles.
+
+        Yields:
+            SyntheticGroup: Each group.
+        """
+        remaining = count
+        newest = True
+        while remaining > 0:
+            group = self.group(remaining, newest=newest)
+            remaining -= len(group["details"])
+            newest = False
+            yield group
+
+    def summary(self) -> dict:
+        rng = self.random
+        summary: dict = {
+            "assistAverage": rng.uniform(1, 4),
+            "deathAverage": rng.uniform(3, 8),
+            "killAverage": rng.uniform(3, 10),
+            "perUnitTimeMinute": 5,
+            "specialAverage": rng.uniform(1, 4),
+            "win": rng.randint(0, 5000),
+            "lose": rng.randint(0, 5000),
+        }
+        if self.flag == "xbattle":
+            for key in ("xPowerAr", "xPowerCl", "xPowerGl", "xPowerLf"):
+                summary[key] = {"lastXPower": rng.uniform(1500, 3000)}
+        return summary
+
+    def overview(self, groups: Iterable[SyntheticGroup]) -> dict:
+        """Builds the overview response that lists some groups.
+
+        Args:
+            groups (Iterable[SyntheticGroup]): The groups, newest first.
+
+        Returns:
+            dict: The data of the overview response.
+        """
+        return {
+            HISTORY_KEYS[self.flag]: {
+                "summary": self.summary(),
+                "historyGroups": {
+                    "nodes": [group["group"] for group in groups]
+                },
+            }
+        }
+
+
+def iter_details(
+    flag: str,
+    count: int,
+    seed: int | str | None = None,
+    splatfest: bool = False,
+) -> Iterator[dict]:
+    """Generates the detailed responses of battles in a mode, newest first.
+
+    Args:
+        flag (str): The importer flag of the mode, one of ``FLAGS``.
+        count (int): The number of battles.
+        seed (int | str | None): The seed of the battles. Defaults to None.
+        splatfest (bool): Whether to include Splatfest battles among the Turf
+            War battles. Defaults to False.
+
+    Yields:
+        dict: The data of the detailed response of each battle.
+    """
+    factory = BattleFactory(flag, seed=seed, splatfest=splatfest)
+    for group in factory.groups(count):
+        yield from group["details"]
+
+
+def write_dump(
+    path: str,
+    flag: str,
+    count: int,
+    seed: int | str | None = None,
+    splatfest: bool = False,
+) -> int:
+    """Generates the battles of a mode and saves them as a raw dump, just as
+    ``--save-raw`` saves the responses of SplatNet 3. The overview only lists
+    the newest groups, up to ``OVERVIEW_LIMIT`` battles, as SplatNet 3 does,
+    while every battle is saved to the detailed stream.
+
+    Args:
+        path (str): The dump directory, named after the flag of the mode.
+        flag (str): The importer flag of the mode, one of ``FLAGS``.
+        count (int): The number of battles.
+        seed (int | str | None): The seed of the battles. Defaults to None.
+        splatfest (bool): Whether to include Splatfest battles among the Turf
+            War battles. Defaults to False.
+
+    Returns:
+        int: The number of battles saved.
+    """
+    factory = BattleFactory(flag, seed=seed, splatfest=splatfest)
+    groups = factory.groups(count)
+    listed: list[SyntheticGroup] = []
+    battles = 0
+    for group in groups:
+        listed.append(group)
+        battles += len(group["details"])
+        if battles >= OVERVIEW_LIMIT:
+            break
+
+    with RawDumpWriter(path) as writer:
+        writer.write_overview(factory.overview(listed))
+        for group in itertools.chain(listed, groups):
+            for detail in group["details"]:
+                writer.write_detail(detail)
+        return writer.count
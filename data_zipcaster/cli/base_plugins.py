@@ -10,6 +10,7 @@ from rich.progress import Progress
 from typing_extensions import NotRequired, TypedDict
 
 from data_zipcaster.cli import styles as s
+from data_zipcaster.cli.ledger import LEDGER_FILENAME, BattleLedger
 from data_zipcaster.cli.utils import ProgressBar, handle_exception
 from data_zipcaster.models import main
 
@@ -26,6 +27,7 @@ OptionType: TypeAlias = (  # noqa: ECE001
     | click.Path
     | click.FloatRange
     | click.IntRange
+    | click.DateTime
 )
 
 
@@ -105,7 +107,45 @@ class BasePlugin(ABC):
             key (str): The key to set.
             value (Any): The value to set.
         """
-        click.get_current_context().obj[key] = value
+        click.get_current_context().ensure_object(dict)[key] = value
+
+    def get_ledger(self) -> BattleLedger:
+        """Gets the battle ledger, opening it on first use. The ledger lives
+        next to the config file and is shared through the context by the
+        importer and all exporters. With ``--no-ledger``, the ledger is kept
+        in memory instead, so nothing is read from or written to the file and
+        every battle is fetched and exported again on the next run.
+
+        Returns:
+            BattleLedger: The battle ledger.
+        """
+        ledger = self.get_from_context("ledger")
+        if ledger is not None:
+            return cast(BattleLedger, ledger)
+
+        ctx = click.get_current_context()
+        if ctx.params.get("no_ledger", False):
+            ledger_path = ":memory:"
+            self.vprint("Keeping the battle ledger in memory.", level=3)
+        else:
+            config_path = ctx.params.get("config") or "config.ini"
+            config_dir = os.path.dirname(os.path.abspath(config_path))
+            ledger_path = os.path.join(config_dir, LEDGER_FILENAME)
+            self.vprint(
+                f"Opening battle ledger at {s.EMPHASIZE}{ledger_path}[/].",
+                level=3,
+            )
+        ledger = BattleLedger(ledger_path)
+        self.set_to_context("ledger", ledger)
+        return ledger
+
+    def close_ledger(self) -> None:
+        """Closes the battle ledger, if it was opened."""
+        ledger = self.get_from_context("ledger")
+        if ledger is None:
+            return
+        cast(BattleLedger, ledger).close()
+        self.set_to_context("ledger", None)
 
     def read_config(self) -> None:
         """Reads the config file and saves it to the context. This will save the
@@ -201,6 +241,7 @@ class BasePlugin(ABC):
                 f"Saved config file to {s.OPTION_COLOR}{config_path}[/].",
                 level=3,
             )
+        self.set_to_context("config_changed", False)
 
 
 class BaseExporter(BasePlugin):
@@ -214,6 +255,11 @@ class BaseExporter(BasePlugin):
         help: str
         required: bool
 
+    # Exporters that record each battle in the ledger themselves as soon as it
+    # has been exported should set this to True, so that battles that failed
+    # to export are not recorded by ``run``.
+    records_exports: bool = False
+
     @abstractmethod
     def get_config_keys(self) -> list[ConfigKeys]:
         """A list of keys that will be read from the config file. This is used
@@ -289,6 +335,10 @@ class BaseExporter(BasePlugin):
         """
         self.assert_valid_config()
         self.do_run(data)
+        if not self.records_exports:
+            self.get_ledger().record_export(
+                [battle.id for battle in data], self.name
+            )
 
 
 class BaseImporter(BasePlugin):
@@ -318,6 +368,8 @@ class BaseImporter(BasePlugin):
         nargs: NotRequired[int]
         envvar: NotRequired[str]
 
+    monitoring: bool = False
+
     @property
     def include_monitoring(self) -> bool:
         """Whether or not to include the monitoring option. This is used to
@@ -461,6 +513,18 @@ class BaseImporter(BasePlugin):
             help="Increase verbosity level.",
         )(out_func)
 
+        # Add the no-ledger flag
+        out_func = click.option(
+            "--no-ledger",
+            is_flag=True,
+            help=(
+                "Do not use the battle ledger. Battles that were already "
+                "fetched or exported are fetched and exported again, and "
+                "nothing is recorded for later runs."
+            ),
+            default=False,
+        )(out_func)
+
         # Add the no-dialog flag
         out_func = click.option(
             "--silent",
@@ -477,7 +541,8 @@ class BaseImporter(BasePlugin):
     def run(self, ctx: click.Context, *, verbose: int = 0, **kwargs) -> None:
         """A wrapper around the sub_run function. If the monitor option is
         enabled, this will run the sub_run function in a loop. Otherwise, it
-        will run the sub_run function once.
+        will run the sub_run function once. The battle ledger is closed once
+        the runs are over.
 
         Args:
             ctx (click.Context): The click context.
@@ -485,16 +550,34 @@ class BaseImporter(BasePlugin):
             **kwargs: The keyword arguments passed to the command. This will
                 include the options specified by the user.
         """
-        if self.include_monitoring and (
+        self.monitoring = self.include_monitoring and (
             ctx.params["monitor"]
             or ctx.get_parameter_source("monitor_interval").name != "DEFAULT"
-        ):
-            while True:
+        )
+        try:
+            if self.monitoring:
+                while True:
+                    self.sub_run(ctx, verbose=verbose, **kwargs)
+                    self.monitor_wait(ctx.params["monitor_interval"])
+
+            else:
                 self.sub_run(ctx, verbose=verbose, **kwargs)
-                self.monitor_wait(ctx.params["monitor_interval"])
+        finally:
+            self.close_ledger()
 
-        else:
-            self.sub_run(ctx, verbose=verbose, **kwargs)
+    def allows_no_exporters(self, ctx: click.Context) -> bool:
+        """Whether the importer may run without any exporters. By default,
+        running without an exporter is an error since the imported data would
+        go nowhere. Importers that produce output of their own should override
+        this.
+
+        Args:
+            ctx (click.Context): The click context.
+
+        Returns:
+            bool: Whether the importer may run without any exporters.
+        """
+        return False
 
     def monitor_wait(self, interval: int) -> None:
         """Wait for the specified interval. This will display a progress bar
@@ -533,29 +616,19 @@ class BaseImporter(BasePlugin):
             if exporter.name in exporters_string
         ]
 
-        splatnet_save_raw = (
-            self.name == "splatnet"
-            and ctx.get_parameter_source("save_raw").name != "DEFAULT"
-        )
-
-        if len(exporters) == 0:
-            if not splatnet_save_raw:
-                raise click.ClickException(
-                    "No exporters were specified. Please specify at least one "
-                    + "exporter with the -e/--exporter flag. Available "
-                    + "exporters are: "
-                    + ", ".join([exporter.name for exporter in self.exporters])
-                )
-            else:
-                self.vprint(
-                    f"No exporters were specified, but the {s.OPTION_COLOR}"
-                    "--save-raw[/] option was specified. This will save the "
-                    "raw data to the given path.",
-                    level=1,
-                )
+        if len(exporters) == 0 and not self.allows_no_exporters(ctx):
+            raise click.ClickException(
+                "No exporters were specified. Please specify at least one "
+                + "exporter with the -e/--exporter flag. Available "
+                + "exporters are: "
+                + ", ".join([exporter.name for exporter in self.exporters])
+            )
 
         self.read_config()
         self.set_options(kwargs)
+        self.set_to_context(
+            "exporters", [exporter.name for exporter in exporters]
+        )
 
         for exporter in exporters:
             self.vprint(
@@ -566,6 +639,9 @@ class BaseImporter(BasePlugin):
             exporter.assert_valid_config()
 
         internal_data = self.do_run(**kwargs)
+        self.get_ledger().record_import(
+            [battle.id for battle in internal_data], self.name
+        )
 
         for exporter in exporters:
             exporter.run(internal_data)
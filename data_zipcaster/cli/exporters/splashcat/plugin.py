@@ -1,28 +1,44 @@
-from typing import cast
-
 import msgpack
 import requests
+import rich_click as click
 
 from data_zipcaster import __version__
 from data_zipcaster.cli.base_plugins import BaseExporter
-from data_zipcaster.cli.utils import ProgressBar
+from data_zipcaster.cli.throttle import (
+    RETRYABLE_STATUS_CODES,
+    TRANSIENT_EXCEPTIONS,
+    CircuitOpenError,
+    RetryableError,
+    get_limiter,
+)
+from data_zipcaster.cli.utils import ProgressBar, mount_connection_pool
 from data_zipcaster.models import main
-from data_zipcaster.utils import base64_encode
 from data_zipcaster.views.splashcat import generate_view
 
 
 class Endpoints:
-    recent_battles = "https://splashcat.ink/battles/api/recent/"
-    upload_battle = "https://splashcat.ink/battles/api/upload/"
+    recent_battles = "/battles/api/recent/"
+    upload_battle = "/battles/api/upload/"
+
+
+DEFAULT_API_URL = "https://splashcat.ink"
+DEFAULT_POOL_SIZE = 10
+DEFAULT_RATE_LIMIT = 2.0
 
 
 class SplashcatExporter(BaseExporter):
+    records_exports = True
+
     def __init__(self) -> None:
         super().__init__()
         self.silent: bool = False
         self.api_key: str = ""
+        self.api_url: str = DEFAULT_API_URL
+        self.pool_size: int = DEFAULT_POOL_SIZE
+        self.rate_limit: float = DEFAULT_RATE_LIMIT
         self.headers: dict = {}
         self.session: requests.Session | None = None
+        self.session_key: tuple[str, int] | None = None
 
     @property
     def name(self) -> str:
@@ -43,14 +59,50 @@ class SplashcatExporter(BaseExporter):
                 type_=str,
                 required=True,
             ),
+            BaseExporter.ConfigKeys(
+                key_name="pool_size",
+                help=(
+                    "The maximum number of connections to Splashcat to keep "
+                    "open and reuse between uploads. Defaults to "
+                    f"{DEFAULT_POOL_SIZE}."
+                ),
+                type_=str,
+                required=False,
+            ),
+            BaseExporter.ConfigKeys(
+                key_name="rate_limit",
+                help=(
+                    "The maximum number of requests to send to Splashcat per "
+                    "second. Uploads that fail because Splashcat is "
+                    "overloaded are retried with backoff. Set to 0 to disable "
+                    f"the limit. Defaults to {DEFAULT_RATE_LIMIT:g}."
+                ),
+                type_=str,
+                required=False,
+            ),
+            BaseExporter.ConfigKeys(
+                key_name="api_url",
+                help=(
+                    "The URL of the Splashcat server to upload to, such as a "
+                    "local stand-in used for benchmarking. Defaults to "
+                    f"{DEFAULT_API_URL}."
+                ),
+                type_=str,
+                required=False,
+            ),
         ]
         return keys
 
     def do_run(self, data: list[main.VsExtract]) -> None:
         self.set_values_from_config()
 
-        self.session = self.start_session()
-        self.headers = self.build_headers()
+        # The session is kept between runs so that its connections are reused
+        # on every polling tick, and is only replaced if the config changes.
+        session_key = (self.api_key, self.pool_size)
+        if self.session is None or self.session_key != session_key:
+            self.session = self.start_session()
+            self.headers = self.build_headers()
+            self.session_key = session_key
 
         self.vprint("Getting existing battle IDs...", level=1)
         existing_ids = self.get_existing_battle_ids()
@@ -60,10 +112,55 @@ class SplashcatExporter(BaseExporter):
 
     def set_values_from_config(self) -> None:
         self.api_key = self.get_from_config(self.name, "api_key")
+        api_url = self.get_from_config(self.name, "api_url")
+        self.api_url = (api_url or DEFAULT_API_URL).rstrip("/")
+        self.pool_size = int(
+            self.get_number_from_config("pool_size", int, DEFAULT_POOL_SIZE, 1)
+        )
+        self.rate_limit = self.get_number_from_config(
+            "rate_limit", float, DEFAULT_RATE_LIMIT, 0
+        )
+
+    def get_number_from_config(
+        self,
+        key: str,
+        type_: type[int] | type[float],
+        default: float,
+        minimum: float,
+    ) -> float:
+        value = self.get_from_config(self.name, key)
+        if value is None:
+            return default
+        try:
+            number = type_(value)
+        except ValueError:
+            raise click.ClickException(
+                f"The {key} for {self.name} must be a number, got {value!r}."
+            )
+        if number < minimum:
+            raise click.ClickException(
+                f"The {key} for {self.name} must be at least {minimum}."
+            )
+        return number
 
     def start_session(self) -> requests.Session:
         self.vprint("Starting session...", level=3)
-        return requests.Session()
+        session = requests.Session()
+        if self.session is not None:
+            self.session.close()
+        mount_connection_pool(session, self.pool_size)
+        return session
+
+    def endpoint(self, path: str) -> str:
+        """Gets the full URL of a Splashcat endpoint.
+
+        Args:
+            path (str): The path of the endpoint, from ``Endpoints``.
+
+        Returns:
+            str: The URL of the endpoint on the configured server.
+        """
+        return self.api_url + path
 
     def build_headers(self) -> dict:
         self.vprint("Building headers...", level=2)
@@ -76,22 +173,43 @@ class SplashcatExporter(BaseExporter):
     def process_data(
         self, data: list[main.VsExtract], existing_ids: list[str]
     ) -> list[dict]:
+        failed = 0
         with ProgressBar("Processing data...") as progress_callback:
             max_val = len(data)
-            progress_callback(0, max_val)
-            if self.get_from_context("imported") is None:
-                self.set_to_context("imported", [])
+            if progress_callback is not None:
+                progress_callback(0, max_val)
+            ledger = self.get_ledger()
 
             for idx, battle in enumerate(data):
                 body = self.process_battle(battle)
-                self.upload_match(body, existing_ids)
-                imported = cast(list[str], self.get_from_context("imported"))
-                if battle.id not in imported:
-                    imported.append(base64_encode(battle.id))
+                try:
+                    self.upload_match(body, existing_ids)
+                except CircuitOpenError:
+                    raise click.ClickException(
+                        "Splashcat keeps failing to accept uploads, so the "
+                        "remaining battles were not uploaded. They will be "
+                        "uploaded on the next run."
+                    )
+                except (ValueError, *TRANSIENT_EXCEPTIONS) as e:
+                    # Battles that failed to upload are left out of the
+                    # ledger, so they are uploaded again on the next run.
+                    self.vprint(f"Failed to upload battle: {e}", level=2)
+                    failed += 1
+                else:
+                    # Record each upload as it happens so that a failure part
+                    # way through does not cause the earlier battles to be
+                    # re-sent.
+                    ledger.record_export([battle.id], self.name)
 
                 if progress_callback is not None:
                     progress_callback(idx + 1, max_val)
 
+        if failed > 0:
+            self.warn(
+                f"Failed to upload {failed} of {len(data)} battles to "
+                "Splashcat. They will be uploaded on the next run."
+            )
+
     def process_battle(self, battle: main.VsExtract) -> dict:
         return {
             "battle": generate_view(battle),
@@ -111,21 +229,58 @@ class SplashcatExporter(BaseExporter):
             return
 
         msg = msgpack.packb(body)
+        limiter = get_limiter(
+            self.endpoint(Endpoints.upload_battle), self.rate_limit
+        )
+        response = limiter.call(self.post_match, msg)
+        if response.status_code != 200:
+            raise ValueError(f"Error uploading match: {response.text}")
+
+    def post_match(self, msg: bytes) -> requests.Response:
+        assert self.session is not None
         response = self.session.post(
-            Endpoints.upload_battle,
+            self.endpoint(Endpoints.upload_battle),
             data=msg,
             headers=self.headers,
         )
-        if response.status_code != 200:
-            raise ValueError(f"Error uploading match: {response.text}")
+        if response.status_code in RETRYABLE_STATUS_CODES:
+            raise RetryableError(
+                f"Splashcat returned status code {response.status_code}."
+            )
+        return response
 
-    def get_existing_battle_ids(self) -> list[str]:
-        self.vprint("Getting existing battle IDs...", level=2)
+    def get_recent(self, url: str) -> requests.Response:
         assert self.session is not None
-        return self.session.get(
-            Endpoints.recent_battles,
+        response = self.session.get(
+            url,
             headers={
                 "Content-Type": "application/json",
                 "Authorization": f"Bearer {self.api_key}",
             },
-        ).json()["battle_ids"]
+        )
+        if response.status_code in RETRYABLE_STATUS_CODES:
+            raise RetryableError(
+                f"Splashcat returned status code {response.status_code}."
+            )
+        return response
+
+    def get_existing_battle_ids(self) -> list[str]:
+        self.vprint("Getting existing battle IDs...", level=2)
+        url = self.endpoint(Endpoints.recent_battles)
+        limiter = get_limiter(url, self.rate_limit)
+        try:
+            response = limiter.call(self.get_recent, url)
+        except (CircuitOpenError, *TRANSIENT_EXCEPTIONS) as e:
+            # Battles in the ledger are still skipped, so only battles the
+            # ledger does not know about may be sent again.
+            self.warn(
+                f"Failed to get the existing battle IDs from Splashcat: {e} "
+                "Uploading every battle not in the ledger."
+            )
+            return []
+        if response.status_code != 200:
+            raise click.ClickException(
+                "Failed to get the existing battle IDs from Splashcat: "
+                f"{response.text}"
+            )
+        return response.json()["battle_ids"]
@@ -0,0 +1,297 @@
+import itertools
+import os
+from typing import Iterable, TypedDict, cast
+
+from data_zipcaster.cli import constants as consts
+from data_zipcaster.models import main, splatnet
+from data_zipcaster.raw import (
+    RawArchive,
+    RecordLocation,
+    is_dump,
+    iter_dump_detail_records,
+    read_dump_overview,
+    read_record_bytes,
+    snapshot_sort_key,
+)
+from data_zipcaster.transforms import splatnet_to_main as transforms
+
+
+class ArchiveRun(TypedDict):
+    """The battles to replay from a single run of a single mode in an archive.
+
+    Fields:
+        - root (str): The path to the archive directory.
+        - run (str): The time string of the run.
+        - mode (str): The flag of the mode.
+        - overview (RecordLocation): Where the overview response is stored.
+        - details (list[RecordLocation]): Where the detailed responses are
+            stored.
+    """
+
+    root: str
+    run: str
+    mode: str
+    overview: RecordLocation
+    details: list[RecordLocation]
+
+
+class Replayed(TypedDict):
+    """The battles converted from a single mode dump or archive run.
+
+    Fields:
+        - battles (list[main.VsExtract]): The converted battles.
+        - skipped (int): The number of battles that failed to validate and
+            were left out.
+    """
+
+    battles: list[main.VsExtract]
+    skipped: int
+
+
+def find_dumps(paths: Iterable[str]) -> list[str]:
+    """Finds every mode dump under the given directories.
+
+    A mode dump is a directory written by ``--save-raw`` that holds the
+    overview and detailed responses of one mode, named after the mode's flag.
+    Each path may be a mode dump itself, or any directory above one, such as
+    the timestamped directory of a single import or the ``--save-raw`` root.
+    Dumps cut short by an interrupted import are found as well, and replay
+    every battle that was fully written.
+
+    Args:
+        paths (Iterable[str]): The directories to search.
+
+    Returns:
+        list[str]: The paths of the mode dumps, sorted and without duplicates.
+    """
+    dumps: set[str] = set()
+    for path in paths:
+        for root, _, _ in os.walk(path):
+            if is_dump(root):
+                dumps.add(os.path.abspath(root))
+    return sorted(dumps)
+
+
+def convert_metadata(
+    overview: bytes | dict, flag: str
+) -> dict[str, main.AnarchyMetadata | main.XMetadata]:
+    """Converts the metadata in the overview of a mode dump.
+
+    Args:
+        overview (bytes | dict): The overview response, either as saved or
+            as its decoded data.
+        flag (str): The flag of the mode the dump belongs to.
+
+    Returns:
+        dict[str, main.AnarchyMetadata | main.XMetadata]: The converted
+            metadata, keyed by battle ID. This will be empty for modes that do
+            not have any metadata.
+    """
+    if flag not in ("anarchy", "xbattle"):
+        return {}
+    if isinstance(overview, bytes):
+        raw_metadata = splatnet.generate_metadata_json(overview, flag)
+    else:
+        raw_metadata = splatnet.generate_metadata(overview, flag)
+    assert isinstance(
+        raw_metadata, (splatnet.AnarchyMetadata, splatnet.XMetadata)
+    )
+    return transforms.convert_metadata(raw_metadata)
+
+
+def convert_details(
+    details: Iterable[bytes | dict],
+    metadata: dict[str, main.AnarchyMetadata | main.XMetadata],
+    strict: bool = False,
+) -> Replayed:
+    """Converts the saved detailed responses of a mode. They are read and
+    validated ``BATCH_SIZE`` at a time, straight from JSON when still in
+    their saved encoding, so only one chunk of responses is held at once.
+    Responses that fail to validate are left out and counted, rather than
+    failing the rest.
+
+    Args:
+        details (Iterable[bytes | dict]): The detailed responses, either as
+            saved or as their decoded data.
+        metadata (dict[str, main.AnarchyMetadata | main.XMetadata]): The
+            metadata of the mode, keyed by battle ID.
+        strict (bool): Whether to validate the battles against the full
+            SplatNet 3 models. Defaults to False.
+
+    Returns:
+        Replayed: The converted battles and the number left out.
+    """
+    out = Replayed(battles=[], skipped=0)
+    records = iter(details)
+    while chunk := list(itertools.islice(records, splatnet.BATCH_SIZE)):
+        if isinstance(chunk[0], bytes):
+            batch = splatnet.generate_vs_details_json(
+                cast(list[bytes], chunk), strict=strict
+            )
+        else:
+            batch = splatnet.generate_vs_details(
+                cast(list[dict], chunk), strict=strict
+            )
+        out["battles"].extend(
+            transforms.append_metadata(
+                transforms.convert_vs_data(vs_detail), metadata
+            )
+            for vs_detail in batch["details"]
+            if vs_detail is not None
+        )
+        out["skipped"] += len(batch["errors"])
+    return out
+
+
+def replay_dump(dump_path: str, strict: bool = False) -> Replayed:
+    """Converts every battle in a mode dump, without any network access.
+
+    This is the same conversion the SplatNet 3 importer does on freshly
+    fetched data. It only takes plain arguments and returns picklable models,
+    so it can be run in a worker process.
+
+    Args:
+        dump_path (str): The path to the mode dump.
+        strict (bool): Whether to validate every battle against the full
+            SplatNet 3 models. Defaults to False.
+
+    Raises:
+        ValueError: If the dump is not named after a known mode.
+
+    Returns:
+        Replayed: The converted battles and the number that failed to
+            validate.
+    """
+    flag = os.path.basename(dump_path)
+    if flag not in consts.FLAG_LIST:
+        raise ValueError(f"Unknown mode {flag!r} for dump {dump_path}.")
+
+    metadata = convert_metadata(read_dump_overview(dump_path), flag)
+    return convert_details(
+        iter_dump_detail_records(dump_path), metadata, strict
+    )
+
+
+def plan_archive(
+    root: str, battle_ids: list[str] | None = None
+) -> list[ArchiveRun]:
+    """Plans which run to replay each battle in an archive from.
+
+    Every battle is replayed once, from the latest run that saw it. The
+    overview of a later run holds the most up to date state of the series the
+    battle belongs to, which the metadata depends on. The plan is worked out
+    from the index alone, and points at the exact records to read, so no
+    response is decompressed until it is replayed.
+
+    Args:
+        root (str): The path to the archive directory.
+        battle_ids (list[str] | None): The decoded IDs of the battles to
+            replay. If None, every battle in the archive is replayed. Defaults
+            to None.
+
+    Returns:
+        list[ArchiveRun]: The runs to replay, each with only the battles that
+            are replayed from it.
+    """
+    archive = RawArchive(root)
+    try:
+        plan: dict[tuple[str, str], ArchiveRun] = {}
+        for run, mode, overview, digest in archive.latest_runs(battle_ids):
+            location = archive.locate(digest)
+            if location is None:
+                continue
+            if (run, mode) not in plan:
+                overview_location = archive.locate(overview)
+                if overview_location is None:
+                    continue
+                plan[(run, mode)] = ArchiveRun(
+                    root=root,
+                    run=run,
+                    mode=mode,
+                    overview=overview_location,
+                    details=[],
+                )
+            plan[(run, mode)]["details"].append(location)
+    finally:
+        archive.close()
+    return list(plan.values())
+
+
+def replay_archive_run(run: ArchiveRun, strict: bool = False) -> Replayed:
+    """Converts the battles of a single run in an archive, without any network
+    access. Like ``replay_dump``, this can be run in a worker process.
+
+    Args:
+        run (ArchiveRun): The run to replay.
+        strict (bool): Whether to validate every battle against the full
+            SplatNet 3 models. Defaults to False.
+
+    Raises:
+        ValueError: If the run is not for a known mode.
+
+    Returns:
+        Replayed: The converted battles and the number that failed to
+            validate.
+    """
+    flag = run["mode"]
+    if flag not in consts.FLAG_LIST:
+        raise ValueError(f"Unknown mode {flag!r} for run {run['run']}.")
+
+    overview = read_record_bytes(run["root"], run["overview"])
+    metadata = convert_metadata(overview, flag)
+    details = (
+        read_record_bytes(run["root"], location) for location in run["details"]
+    )
+    return convert_details(details, metadata, strict)
+
+
+def replay_source(source: str | ArchiveRun, strict: bool = False) -> Replayed:
+    """Converts the battles of either a mode dump or a run in an archive.
+
+    Args:
+        source (str | ArchiveRun): The path to a mode dump, or a run in an
+            archive.
+        strict (bool): Whether to validate every battle against the full
+            SplatNet 3 models. Defaults to False.
+
+    Returns:
+        Replayed: The converted battles and the number that failed to
+            validate.
+    """
+    if isinstance(source, str):
+        return replay_dump(source, strict)
+    return replay_archive_run(source, strict)
+
+
+def describe_source(source: str | ArchiveRun) -> str:
+    """Describes a mode dump or a run in an archive for the user.
+
+    Args:
+        source (str | ArchiveRun): The path to a mode dump, or a run in an
+            archive.
+
+    Returns:
+        str: The description.
+    """
+    if isinstance(source, str):
+        return source
+    return f"{source['root']} ({source['run']}, {source['mode']})"
+
+
+def source_order_key(source: str | ArchiveRun) -> tuple[str, str]:
+    """Gets the key that orders mode dumps and archive runs from oldest to
+    newest.
+
+    Dumps live in a directory named after the time of the import, and archive
+    runs are named after it, so the time is compared first.
+
+    Args:
+        source (str | ArchiveRun): The path to a mode dump, or a run in an
+            archive.
+
+    Returns:
+        tuple[str, str]: The sort key.
+    """
+    if isinstance(source, str):
+        return snapshot_sort_key(source)
+    return source["run"], describe_source(source)
@@ -0,0 +1,409 @@
+import os
+import shutil
+from concurrent.futures import Future, ProcessPoolExecutor, as_completed
+from typing import cast
+
+import rich_click as click
+from rich.markup import escape
+
+from data_zipcaster.cli import constants as consts
+from data_zipcaster.cli import styles as s
+from data_zipcaster.cli.base_plugins import BaseImporter
+from data_zipcaster.cli.importers.replay.dumps import (
+    ArchiveRun,
+    Replayed,
+    describe_source,
+    find_dumps,
+    plan_archive,
+    replay_source,
+    source_order_key,
+)
+from data_zipcaster.cli.utils import ProgressBar
+from data_zipcaster.models import main
+from data_zipcaster.raw import consolidate_dumps
+from data_zipcaster.utils import base64_decode
+
+DECODED_ID_PREFIX = "VsHistoryDetail-"
+
+
+def describe_error(error: Exception) -> str:
+    """Describes why a source failed to replay, for the user.
+
+    Args:
+        error (Exception): The exception the source failed with.
+
+    Returns:
+        str: The type and message of the exception, on a single line.
+    """
+    lines = str(error).strip().splitlines()
+    if len(lines) == 0:
+        return type(error).__name__
+    return f"{type(error).__name__}: {lines[0]}"
+
+
+class ReplayImporter(BaseImporter):
+    def __init__(self) -> None:
+        super().__init__()
+        self.raw_dirs: tuple[str, ...] = ()
+        self.archives: tuple[str, ...] = ()
+        self.workers: int = 1
+        self.battle_ids: list[str] | None = None
+        self.consolidate_path: str | None = None
+        self.strict: bool = False
+
+    @property
+    def name(self) -> str:
+        return "replay"
+
+    @property
+    def help(self) -> str:
+        return (
+            "Imports data from raw data previously saved by the "
+            f"{s.COMMAND_COLOR}splatnet[/] importer with "
+            f"{s.OPTION_COLOR}--save-raw[/] or {s.OPTION_COLOR}--archive[/], "
+            "without connecting to SplatNet 3.\n\n"
+            "This can be used to export old data again, for example after "
+            "a fix to the conversion, or to backfill an archive of battles "
+            "that are no longer available on SplatNet 3."
+        )
+
+    def get_options(self) -> list[BaseImporter.Options]:
+        options = [
+            BaseImporter.Options(
+                option_name_1="--raw-dir",
+                type_=click.Path(exists=True, file_okay=False),
+                multiple=True,
+                help=(
+                    "A directory of raw data saved with "
+                    f"{s.OPTION_COLOR}--save-raw[/]. This can be the "
+                    f"{s.OPTION_COLOR}--save-raw[/] directory itself, the "
+                    "directory of a single import, or the directory of a "
+                    "single mode. Can be specified multiple times."
+                ),
+            ),
+            BaseImporter.Options(
+                option_name_1="--archive",
+                type_=click.Path(exists=True, file_okay=False),
+                multiple=True,
+                help=(
+                    "A raw archive written with "
+                    f"{s.OPTION_COLOR}--archive[/]. Each battle in the "
+                    "archive is replayed once, from the latest run that saw "
+                    "it. Can be specified multiple times."
+                ),
+            ),
+            BaseImporter.Options(
+                option_name_1="--battle-id",
+                type_=str,
+                multiple=True,
+                help=(
+                    "Only replay the battle with this ID from the archives, "
+                    "either as returned by SplatNet 3 or decoded. The battle "
+                    "is looked up in the index, so only its own records are "
+                    f"read. Requires {s.OPTION_COLOR}--archive[/]. Can be "
+                    "specified multiple times."
+                ),
+            ),
+            BaseImporter.Options(
+                option_name_1="--consolidate",
+                type_=click.Path(file_okay=False),
+                help=(
+                    "Consolidate the raw data from "
+                    f"{s.OPTION_COLOR}--raw-dir[/] into a single dump per "
+                    "mode in this directory before replaying it. Battles "
+                    "saved by several imports are kept once, and each series "
+                    "keeps its most complete state, such as the rank or X "
+                    "Power after the series, which imports made while the "
+                    "series was still going do not have. The consolidated "
+                    f"data can be replayed later with {s.OPTION_COLOR}"
+                    "--raw-dir[/]."
+                ),
+            ),
+            BaseImporter.Options(
+                option_name_1="--strict",
+                is_flag=True,
+                help=(
+                    "Validate every field of each battle against the full "
+                    "SplatNet 3 schema, rather than only the fields that are "
+                    "converted. This is slower, but catches changes to the "
+                    "parts of the schema that are otherwise ignored."
+                ),
+                default=False,
+            ),
+            BaseImporter.Options(
+                option_name_1="--workers",
+                type_=click.IntRange(min=1),
+                help=(
+                    "The number of processes to convert the raw data with. If "
+                    "not specified, the default is the number of CPUs."
+                ),
+                default=os.cpu_count() or 1,
+            ),
+            BaseImporter.Options(
+                option_name_1="--config",
+                type_=click.Path(exists=False, dir_okay=False),
+                help=(
+                    "Path to the config file. If not specified, the default "
+                    f"path is {s.EMPHASIZE}config.ini[/] in the current "
+                    "directory."
+                ),
+                default=os.path.join(os.getcwd(), "config.ini"),
+            ),
+        ]
+        return options
+
+    def do_run(self, **kwargs) -> list[main.VsExtract]:
+        """Runs the importer, converting every battle in the raw data.
+
+        Args:
+            **kwargs: The kwargs passed to the run function.
+
+        Raises:
+            ClickException: If no raw data was specified.
+
+        Returns:
+            list[main.VsExtract]: The imported data, sorted by start time and
+                without duplicates.
+        """
+        self.parse_kwargs(kwargs)
+        sources: list[str | ArchiveRun] = []
+        dumps = find_dumps(self.raw_dirs)
+        if self.consolidate_path is not None:
+            dumps = self.consolidate(dumps, self.consolidate_path)
+        sources.extend(dumps)
+        for archive in self.archives:
+            sources.extend(plan_archive(archive, self.battle_ids))
+        self.vprint(
+            f"Found {s.EMPHASIZE}{len(sources)}[/] sets of raw data.",
+            level=1,
+        )
+        battles = self.replay_sources(sources)
+        return self.deduplicate(battles)
+
+    def parse_kwargs(self, kwargs: dict) -> None:
+        raw_dirs = kwargs.get("raw_dir", None) or ()
+        archives = kwargs.get("archive", None) or ()
+        workers = kwargs.get("workers", 1)
+        battle_ids = kwargs.get("battle_id", None) or ()
+        consolidate_path = kwargs.get("consolidate", None)
+        strict = kwargs.get("strict", False)
+
+        if len(raw_dirs) == 0 and len(archives) == 0:
+            raise click.ClickException(
+                "No raw data was specified. Please specify at least one "
+                "directory with the --raw-dir option or one archive with the "
+                "--archive option."
+            )
+        if len(battle_ids) > 0 and (len(raw_dirs) > 0 or len(archives) == 0):
+            raise click.ClickException(
+                "The --battle-id option can only be used with --archive, and "
+                "not with --raw-dir."
+            )
+        if consolidate_path is not None and len(raw_dirs) == 0:
+            raise click.ClickException(
+                "The --consolidate option requires at least one --raw-dir."
+            )
+
+        self.raw_dirs = cast(tuple[str, ...], raw_dirs)
+        self.archives = cast(tuple[str, ...], archives)
+        self.workers = cast(int, workers)
+        self.battle_ids = (
+            [self.decode_battle_id(battle_id) for battle_id in battle_ids]
+            if len(battle_ids) > 0
+            else None
+        )
+        self.consolidate_path = cast(str | None, consolidate_path)
+        self.strict = cast(bool, strict)
+
+    def allows_no_exporters(self, ctx: click.Context) -> bool:
+        """Allows running without exporters if the raw data is being
+        consolidated.
+
+        Args:
+            ctx (click.Context): The click context.
+
+        Returns:
+            bool: Whether the ``--consolidate`` option was specified.
+        """
+        if ctx.get_parameter_source("consolidate").name == "DEFAULT":
+            return False
+        self.vprint(
+            f"No exporters were specified, but the {s.OPTION_COLOR}"
+            "--consolidate[/] option was specified. This will save the "
+            "consolidated raw data to the given path.",
+            level=1,
+        )
+        return True
+
+    def consolidate(self, dumps: list[str], out_path: str) -> list[str]:
+        """Consolidates the dumps of each mode into a single dump.
+
+        Each consolidated dump is written next to its final path first, and
+        only replaces an earlier consolidated dump once it is complete, so an
+        earlier consolidated dump can itself be one of the inputs.
+
+        Args:
+            dumps (list[str]): The paths of the mode dumps.
+            out_path (str): The path to the directory to write the
+                consolidated dumps to.
+
+        Returns:
+            list[str]: The paths of the consolidated dumps.
+        """
+        by_mode: dict[str, list[str]] = {}
+        for dump in dumps:
+            by_mode.setdefault(os.path.basename(dump), []).append(dump)
+
+        out: list[str] = []
+        for flag, mode_dumps in sorted(by_mode.items()):
+            if flag not in consts.FLAG_LIST:
+                self.warn(
+                    f"Skipping {s.EMPHASIZE}{len(mode_dumps)}[/] dumps of the "
+                    f"unknown mode {s.EMPHASIZE}{flag}[/]."
+                )
+                continue
+            dump_path = os.path.abspath(os.path.join(out_path, flag))
+            tmp_path = dump_path + ".tmp"
+            shutil.rmtree(tmp_path, ignore_errors=True)
+            count = consolidate_dumps(mode_dumps, tmp_path)
+            if count == 0:
+                continue
+            shutil.rmtree(dump_path, ignore_errors=True)
+            os.replace(tmp_path, dump_path)
+            self.vprint(
+                f"Consolidated {s.EMPHASIZE}{len(mode_dumps)}[/] dumps of "
+                f"{s.EMPHASIZE}{flag}[/] into {s.EMPHASIZE}{count}[/] "
+                "battles.",
+                level=1,
+            )
+            out.append(dump_path)
+        return out
+
+    @staticmethod
+    def decode_battle_id(battle_id: str) -> str:
+        """Decodes a battle ID given by the user, if it is not decoded already.
+
+        Args:
+            battle_id (str): The battle ID, either as returned by SplatNet 3 or
+                decoded.
+
+        Raises:
+            ClickException: If the battle ID is not valid.
+
+        Returns:
+            str: The decoded battle ID.
+        """
+        if battle_id.startswith(DECODED_ID_PREFIX):
+            return battle_id
+        try:
+            decoded = base64_decode(battle_id)
+        except ValueError:
+            decoded = ""
+        if not decoded.startswith(DECODED_ID_PREFIX):
+            raise click.ClickException(f"Invalid battle ID: {battle_id}")
+        return decoded
+
+    def replay_sources(
+        self, sources: list[str | ArchiveRun]
+    ) -> list[tuple[tuple[str, str], main.VsExtract]]:
+        """Converts the battles in every mode dump and archive run.
+
+        The sources are converted in a pool of worker processes, since the
+        conversion is CPU bound. A source that fails to convert is skipped with
+        a warning rather than stopping the whole import, as are the battles of
+        a source that fail to validate.
+
+        Args:
+            sources (list[str | ArchiveRun]): The paths of the mode dumps and
+                the archive runs.
+
+        Returns:
+            list[tuple[tuple[str, str], main.VsExtract]]: The converted
+                battles, each with the ``source_order_key`` of the source it
+                came from, in no particular order.
+        """
+        out: list[tuple[tuple[str, str], main.VsExtract]] = []
+        failed: dict[str, str] = {}
+        skipped: dict[str, int] = {}
+
+        def collect(replayed: Replayed, source: str | ArchiveRun) -> None:
+            key = source_order_key(source)
+            out.extend((key, battle) for battle in replayed["battles"])
+            if replayed["skipped"] > 0:
+                skipped[describe_source(source)] = replayed["skipped"]
+
+        with ProgressBar("Replaying raw data...") as progress_callback:
+            total = len(sources)
+            if progress_callback is not None:
+                progress_callback(0, total)
+            if self.workers == 1 or total <= 1:
+                for idx, source in enumerate(sources):
+                    try:
+                        collect(replay_source(source, self.strict), source)
+                    except Exception as e:
+                        failed[describe_source(source)] = describe_error(e)
+                    if progress_callback is not None:
+                        progress_callback(idx + 1, total)
+            else:
+                with ProcessPoolExecutor(max_workers=self.workers) as executor:
+                    futures: dict[Future[Replayed], str | ArchiveRun] = {
+                        executor.submit(
+                            replay_source, source, self.strict
+                        ): source
+                        for source in sources
+                    }
+                    for done, future in enumerate(
+                        as_completed(futures), start=1
+                    ):
+                        try:
+                            collect(future.result(), futures[future])
+                        except Exception as e:
+                            source = describe_source(futures[future])
+                            failed[source] = describe_error(e)
+                        if progress_callback is not None:
+                            progress_callback(done, total)
+
+        for source, error in sorted(failed.items()):
+            self.warn(
+                f"Failed to replay the raw data in {s.EMPHASIZE}{source}[/], "
+                f"skipping it. {escape(error)}"
+            )
+        for source, count in sorted(skipped.items()):
+            self.warn(
+                f"Skipped {count} battles in {s.EMPHASIZE}{source}[/] that "
+                "could not be validated."
+            )
+        return out
+
+    def deduplicate(
+        self, battles: list[tuple[tuple[str, str], main.VsExtract]]
+    ) -> list[main.VsExtract]:
+        """Removes battles that appear in more than one dump.
+
+        Consecutive imports overlap, so the same battle is usually saved in
+        several dumps. The copy from the latest dump is kept, as with
+        ``plan_archive`` and ``consolidate_dumps``, since its overview holds
+        the most up to date state of the battle's series. This does not depend
+        on the order the sources finished converting in.
+
+        Args:
+            battles (list[tuple[tuple[str, str], main.VsExtract]]): The
+                converted battles, each with the ``source_order_key`` of the
+                source it came from.
+
+        Returns:
+            list[main.VsExtract]: The unique battles, sorted by start time.
+        """
+        unique: dict[str, tuple[tuple[str, str], main.VsExtract]] = {}
+        for key, battle in battles:
+            current = unique.get(battle.id, None)
+            if current is None or key > current[0]:
+                unique[battle.id] = (key, battle)
+        self.vprint(
+            f"Replayed {s.EMPHASIZE}{len(unique)}[/] unique battles.",
+            level=1,
+        )
+        return sorted(
+            (battle for _, battle in unique.values()),
+            key=lambda battle: (battle.start_time, battle.id),
+        )
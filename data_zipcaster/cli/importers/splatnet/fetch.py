@@ -0,0 +1,285 @@
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from typing import Callable, Collection, Iterator, TypedDict, cast
+
+from splatnet3_scraper.query import QueryResponse
+from splatnet3_scraper.scraper.query_map import QueryMap
+
+from data_zipcaster.cli.importers.splatnet.filters import OverviewFilter
+from data_zipcaster.cli.importers.splatnet.handler import SharedQueryHandler
+
+DETAIL_QUERY = QueryMap.VS_DETAIL
+DETAIL_VARIABLE = "vsResultId"
+
+
+class HighWaterMark(TypedDict):
+    """The newest battle seen in a mode, used to only fetch newer battles.
+
+    Fields:
+        - battle_id (str): The base64 encoded ID of the battle.
+        - played_time (str | None): The ``playedTime`` of the battle, if the
+            overview included it.
+    """
+
+    battle_id: str
+    played_time: str | None
+
+
+class PendingMark(TypedDict):
+    """A high-water mark that is only trusted once the battles fetched along
+    with it have been handled.
+
+    Fields:
+        - mark (HighWaterMark): The newest battle in the overview.
+        - battle_ids (list[str]): The base64 encoded IDs of the battles that
+            were fetched from the overview.
+    """
+
+    mark: HighWaterMark
+    battle_ids: list[str]
+
+
+def settle_mark(
+    pending: PendingMark, known_ids: Collection[str] | None
+) -> HighWaterMark | None:
+    """Decides if a pending high-water mark can be moved to.
+
+    The walk stops at the mark, so moving it past a battle that was fetched
+    but never handled, such as one that failed to convert or to export, would
+    skip that battle for good. The mark is only moved once every battle
+    fetched along with it is known to the ledger.
+
+    Args:
+        pending (PendingMark): The pending mark.
+        known_ids (Collection[str] | None): The base64 encoded IDs of the
+            battles that have been handled. If None, nothing is tracked and
+            the mark is always moved to.
+
+    Returns:
+        HighWaterMark | None: The mark to move to, or None if the mark should
+            stay where it was.
+    """
+    if known_ids is None:
+        return pending["mark"]
+    known = set(known_ids)
+    if all(battle_id in known for battle_id in pending["battle_ids"]):
+        return pending["mark"]
+    return None
+
+
+def iter_overview_nodes(overview: QueryResponse) -> Iterator[dict]:
+    """Iterates over the battle nodes of an overview response.
+
+    The overview is made up of history groups, each holding the battles of one
+    series or session, newest first. This flattens them into a single stream of
+    battle nodes, still newest first.
+
+    Args:
+        overview (QueryResponse): The overview response of a mode.
+
+    Yields:
+        dict: The raw node of each battle in the overview.
+    """
+    data = cast(dict, overview.data)
+    # Top level key depends on the game mode, but there is only one.
+    top_level_key = next(iter(data))
+    for group in data[top_level_key]["historyGroups"]["nodes"]:
+        yield from group["historyDetails"]["nodes"]
+
+
+def newest_mark(overview: QueryResponse) -> HighWaterMark | None:
+    """Gets the high-water mark of an overview, its newest battle.
+
+    Args:
+        overview (QueryResponse): The overview response of a mode.
+
+    Returns:
+        HighWaterMark | None: The mark of the newest battle, or None if the
+            overview has no battles.
+    """
+    node = next(iter_overview_nodes(overview), None)
+    if node is None:
+        return None
+    return HighWaterMark(
+        battle_id=node["id"], played_time=node.get("playedTime", None)
+    )
+
+
+def is_past_mark(node: dict, mark: HighWaterMark) -> bool:
+    """Checks if a battle node is not newer than a high-water mark.
+
+    Args:
+        node (dict): The raw node of the battle in the overview.
+        mark (HighWaterMark): The high-water mark.
+
+    Returns:
+        bool: True if the battle is the mark itself or was played no later
+            than it, False otherwise.
+    """
+    if node["id"] == mark["battle_id"]:
+        return True
+    played_time = node.get("playedTime", None)
+    if played_time is None or mark["played_time"] is None:
+        return False
+    # Both are ISO 8601 strings in UTC, so they compare chronologically.
+    return played_time <= mark["played_time"]
+
+
+def collect_battle_ids(
+    overview: QueryResponse,
+    limit: int | None = None,
+    existing_ids: Collection[str] | None = None,
+    mark: HighWaterMark | None = None,
+    overview_filter: OverviewFilter | None = None,
+) -> list[str]:
+    """Collects the IDs of the battles whose details should be fetched.
+
+    Mirrors the selection done by ``SplatNet_Scraper.get_matches``: battles
+    are walked newest first, the limit counts every battle walked, and any
+    battle already in ``existing_ids`` is skipped. If a high-water mark is
+    given, the walk stops at the first battle that is not newer than it. If a
+    filter is given, battles that do not match it are skipped, and the walk
+    stops at the first battle played before its ``since`` time.
+
+    Args:
+        overview (QueryResponse): The overview response of a mode.
+        limit (int | None): The maximum number of battles to walk. If None or
+            -1, every battle in the overview is walked. Defaults to None.
+        existing_ids (Collection[str] | None): The base64 encoded IDs of the
+            battles that have already been imported. Defaults to None.
+        mark (HighWaterMark | None): The newest battle seen so far in this
+            mode. Defaults to None.
+        overview_filter (OverviewFilter | None): The filter battles must match
+            to be fetched. Defaults to None.
+
+    Returns:
+        list[str]: The base64 encoded IDs of the battles to fetch, newest first.
+    """
+    _limit = -1 if limit is None else limit
+    existing = set(existing_ids) if existing_ids is not None else set()
+    out: list[str] = []
+    for idx, node in enumerate(iter_overview_nodes(overview)):
+        if idx == _limit:
+            break
+        if mark is not None and is_past_mark(node, mark):
+            break
+        if overview_filter is not None:
+            if overview_filter.is_too_old(node):
+                break
+            if not overview_filter.matches(node):
+                continue
+        if node["id"] in existing:
+            continue
+        out.append(node["id"])
+    return out
+
+
+class DetailFetcher:
+    def __init__(
+        self, query_handler: SharedQueryHandler, max_concurrency: int = 1
+    ) -> None:
+        """Fetches battle details with a bounded number of queries in flight.
+
+        Args:
+            query_handler (SharedQueryHandler): The query handler to make the
+                detail queries with. It may be shared with other fetchers.
+            max_concurrency (int): The maximum number of detail queries that
+                may be in flight at once. A value of 1 fetches the details one
+                after another. Defaults to 1.
+        """
+        self.query_handler = query_handler
+        self.max_concurrency = max(1, max_concurrency)
+
+    def fetch_one(self, battle_id: str) -> QueryResponse:
+        """Fetches the details of a single battle.
+
+        Args:
+            battle_id (str): The base64 encoded ID of the battle.
+
+        Returns:
+            QueryResponse: The detailed response of the battle.
+        """
+        return self.query_handler.query(
+            DETAIL_QUERY, variables={DETAIL_VARIABLE: battle_id}
+        )
+
+    def iter_fetch(
+        self,
+        battle_ids: list[str],
+        progress_callback: Callable[[int, int], None] | None = None,
+    ) -> Iterator[tuple[int, QueryResponse]]:
+        """Fetches the details of the given battles as they become available.
+
+        Responses are yielded in the order they arrive rather than in the order
+        of ``battle_ids``, along with the index of the battle they belong to.
+        The caller may do work with each response while the remaining queries
+        are still in flight. If a query fails, the queries that have not
+        started yet are cancelled and the exception is raised.
+
+        Args:
+            battle_ids (list[str]): The base64 encoded IDs of the battles.
+            progress_callback (Callable[[int, int], None] | None): A callback
+                called with the number of finished queries and the total
+                number of queries. It is called with 0 before the first query.
+                Defaults to None.
+
+        Yields:
+            tuple[int, QueryResponse]: The index of the battle within
+                ``battle_ids`` and its detailed response.
+        """
+        total = len(battle_ids)
+        if progress_callback is not None:
+            progress_callback(0, total)
+
+        # Even with a single query in flight, the queries run on a worker
+        # thread so that the caller can process one response while the next
+        # one is being fetched.
+        if total <= 1:
+            for idx, battle_id in enumerate(battle_ids):
+                yield idx, self.fetch_one(battle_id)
+                if progress_callback is not None:
+                    progress_callback(idx + 1, total)
+            return
+
+        executor = ThreadPoolExecutor(
+            max_workers=min(self.max_concurrency, total)
+        )
+        try:
+            futures: dict[Future[QueryResponse], int] = {
+                executor.submit(self.fetch_one, battle_id): idx
+                for idx, battle_id in enumerate(battle_ids)
+            }
+            for done, future in enumerate(as_completed(futures), start=1):
+                yield futures[future], future.result()
+                if progress_callback is not None:
+                    progress_callback(done, total)
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def fetch(
+        self,
+        battle_ids: list[str],
+        progress_callback: Callable[[int, int], None] | None = None,
+        on_response: Callable[[int, QueryResponse], None] | None = None,
+    ) -> list[QueryResponse]:
+        """Fetches the details of the given battles.
+
+        Args:
+            battle_ids (list[str]): The base64 encoded IDs of the battles.
+            progress_callback (Callable[[int, int], None] | None): A callback
+                called with the number of finished queries and the total
+                number of queries. Defaults to None.
+            on_response (Callable[[int, QueryResponse], None] | None): A
+                callback called with the index and response of each battle as
+                soon as it arrives, while the remaining queries are still in
+                flight. Defaults to None.
+
+        Returns:
+            list[QueryResponse]: The detailed responses, in the same order as
+                ``battle_ids``.
+        """
+        out: list[QueryResponse | None] = [None] * len(battle_ids)
+        for idx, response in self.iter_fetch(battle_ids, progress_callback):
+            out[idx] = response
+            if on_response is not None:
+                on_response(idx, response)
+        return cast(list[QueryResponse], out)
@@ -0,0 +1,93 @@
+import datetime as dt
+from typing import Collection, get_args
+
+from data_zipcaster.models import main
+from data_zipcaster.transforms.splatnet_to_main.common import (
+    convert_result,
+    convert_rule,
+    convert_stage,
+    convert_start_time,
+)
+
+RULE_CHOICES: list[str] = list(get_args(main.RuleType))
+RESULT_CHOICES: list[str] = list(get_args(main.ResultType))
+
+
+class OverviewFilter:
+    def __init__(
+        self,
+        rules: Collection[str] = (),
+        stages: Collection[str] = (),
+        results: Collection[str] = (),
+        since: dt.datetime | None = None,
+    ) -> None:
+        """Selects battles using only what the overview knows about them.
+
+        Every battle node in the overview already includes its rule, stage,
+        result and the time it was played, so battles can be filtered out
+        before their details are fetched. Each criterion that is left empty
+        matches every battle.
+
+        Args:
+            rules (Collection[str]): The rules to keep, as ``main.RuleType``
+                values such as ``splat_zones``. Defaults to ().
+            stages (Collection[str]): The stages to keep, either by name or by
+                numeric stage ID. Names are not case sensitive. Defaults to ().
+            results (Collection[str]): The results to keep, as
+                ``main.ResultType`` values such as ``win``. Defaults to ().
+            since (dt.datetime | None): Only keep battles played at or after
+                this time. A naive datetime is taken to be in local time.
+                Defaults to None.
+        """
+        self.rules = set(rules)
+        self.stages = {stage.casefold() for stage in stages}
+        self.results = set(results)
+        self.since: dt.datetime | None = None
+        if since is not None:
+            # Start times are naive datetimes in UTC.
+            self.since = since.astimezone(dt.timezone.utc).replace(tzinfo=None)
+
+    @property
+    def is_empty(self) -> bool:
+        """Whether the filter matches every battle."""
+        return not (self.rules or self.stages or self.results or self.since)
+
+    def is_too_old(self, node: dict) -> bool:
+        """Checks if a battle was played before ``since``. Since the overview
+        is ordered newest first, every battle after this one is too old as
+        well.
+
+        Args:
+            node (dict): The raw node of the battle in the overview.
+
+        Returns:
+            bool: True if the battle was played before ``since``, False
+                otherwise or if the overview does not say when it was played.
+        """
+        played_time = node.get("playedTime", None)
+        if self.since is None or played_time is None:
+            return False
+        return convert_start_time(played_time) < self.since
+
+    def matches(self, node: dict) -> bool:
+        """Checks if a battle matches the rule, stage and result criteria.
+
+        Args:
+            node (dict): The raw node of the battle in the overview.
+
+        Returns:
+            bool: True if the battle should be kept, False otherwise.
+        """
+        if self.rules:
+            rule = node["vsRule"].get("rule", None)
+            if rule is None or convert_rule(rule) not in self.rules:
+                return False
+        if self.stages:
+            stage = node["vsStage"]
+            names = {stage["name"].casefold(), convert_stage(stage["id"])}
+            if names.isdisjoint(self.stages):
+                return False
+        if self.results:
+            if convert_result(node["judgement"]) not in self.results:
+                return False
+        return True
@@ -0,0 +1,303 @@
+import json
+import threading
+from typing import Any, Callable, cast
+
+import requests
+from splatnet3_scraper.auth import TokenManager
+from splatnet3_scraper.auth.exceptions import SplatNetException
+from splatnet3_scraper.auth.graph_ql_queries import queries
+from splatnet3_scraper.constants import TOKENS
+from splatnet3_scraper.query import QueryHandler, QueryResponse
+from splatnet3_scraper.utils import retry
+
+from data_zipcaster.cli.throttle import (
+    RETRYABLE_STATUS_CODES,
+    HostLimiter,
+    RetryableError,
+)
+
+# The paths a SplatNet 3 stand-in server answers on, relative to its URL.
+STANDIN_GRAPHQL_PATH = "/api/graphql"
+STANDIN_BULLET_TOKEN_PATH = "/api/bullet_tokens"
+
+
+class RawQueryResponse(QueryResponse):
+    def __init__(self, raw: bytes, data: dict | None = None) -> None:
+        """A query response that keeps the body exactly as SplatNet 3 sent it,
+        so that it can be saved without encoding the data a second time, and
+        validated straight from JSON.
+
+        The body is only decoded the first time the data is read, so a
+        response that is only ever validated from its body never has its data
+        built as Python objects.
+
+        Args:
+            raw (bytes): The body of the response, including the ``data``
+                wrapper of the GraphQL response.
+            data (dict | None): The data of the response, if it has already
+                been decoded. Defaults to None.
+        """
+        self.raw = raw
+        self.decoded = data
+        super().__init__(data=cast(dict, data))
+
+    @property
+    def _data(self) -> Any:
+        if self.decoded is None:
+            self.decoded = json.loads(self.raw)["data"]
+        return self.decoded
+
+    @_data.setter
+    def _data(self, value: Any) -> None:
+        self.decoded = value
+
+
+def raw_body(response: QueryResponse) -> bytes | None:
+    """Gets the body of a response as SplatNet 3 sent it, if it was kept.
+
+    Args:
+        response (QueryResponse): The response.
+
+    Returns:
+        bytes | None: The body of the response, or None if it was not kept.
+    """
+    if isinstance(response, RawQueryResponse):
+        return response.raw
+    return None
+
+
+class SharedQueryHandler:
+    def __init__(
+        self,
+        query_handler: QueryHandler,
+        on_refresh: Callable[[], None] | None = None,
+        limiter: HostLimiter | None = None,
+        standin_url: str | None = None,
+    ) -> None:
+        """Queries SplatNet 3 from any number of threads at once, refreshing
+        the tokens at most once when they expire.
+
+        ``QueryHandler.query`` regenerates the tokens whenever a query fails.
+        When several queries are in flight and the bullet token expires, every
+        one of them would fail and regenerate the tokens on its own, hitting
+        the f-token server and Nintendo once per query. This handler instead
+        tracks a generation number that is bumped on every refresh. A failed
+        query only refreshes the tokens if they are still the generation it
+        was sent with, every other failed query waits for that refresh to
+        finish and then retries with the new tokens.
+
+        If a limiter is given, every request is sent through it, so requests
+        are rate limited and retried with backoff when SplatNet 3 is
+        overloaded.
+
+        If a stand-in URL is given, queries are sent to that server instead of
+        SplatNet 3, by name rather than by the hash of the persisted query,
+        and the bullet token is refreshed by the stand-in as well. Nothing is
+        sent to Nintendo, so imports can be benchmarked offline.
+
+        Args:
+            query_handler (QueryHandler): The query handler holding the tokens.
+                Its token manager is used to regenerate them.
+            on_refresh (Callable[[], None] | None): A callback called once
+                after every refresh, while other queries are still waiting on
+                the new tokens. Defaults to None.
+            limiter (HostLimiter | None): The limiter to send requests through.
+                If None, requests are sent as they come. Defaults to None.
+            standin_url (str | None): The URL of a SplatNet 3 stand-in server
+                to send every query to. Defaults to None.
+        """
+        self.query_handler = query_handler
+        self.on_refresh = on_refresh
+        self.limiter = limiter
+        self.standin_url = (
+            standin_url.rstrip("/") if standin_url is not None else None
+        )
+        self.lock = threading.Lock()
+        self.generation = 0
+        # Reading these from the config may write to it, so they are read
+        # once up front rather than from every thread.
+        config = query_handler.config
+        self.language = config.get_data("language")
+        self.user_agent = config.get("user_agent")
+
+    @property
+    def token_manager(self) -> TokenManager:
+        return self.query_handler.config.token_manager
+
+    def current_tokens(self) -> tuple[int, str, str]:
+        """Gets the current tokens along with their generation. If a refresh
+        is in progress, this waits for it to finish.
+
+        Returns:
+            tuple[int, str, str]: The generation, the bullet token, and the
+                gtoken.
+        """
+        with self.lock:
+            return (
+                self.generation,
+                self.token_manager.get(TOKENS.BULLET_TOKEN),
+                self.token_manager.get(TOKENS.GTOKEN),
+            )
+
+    def refresh(self, generation: int | None = None) -> None:
+        """Regenerates the tokens, unless they were already regenerated.
+
+        Args:
+            generation (int | None): The generation of the tokens that were
+                found to be invalid. If the tokens have moved on from that
+                generation, another thread has already refreshed them and this
+                does nothing. If None, the tokens are always regenerated.
+                Defaults to None.
+        """
+        with self.lock:
+            if generation is not None and generation != self.generation:
+                return
+            if self.standin_url is None:
+                self.token_manager.generate_all_tokens()
+            else:
+                self.refresh_standin_token()
+            self.generation += 1
+            if self.on_refresh is not None:
+                self.on_refresh()
+
+    def refresh_standin_token(self) -> None:
+        """Gets a new bullet token from the stand-in server, the same way
+        SplatNet 3 hands them out for a gtoken.
+        """
+        response = queries.session.post(
+            cast(str, self.standin_url) + STANDIN_BULLET_TOKEN_PATH,
+            cookies={"_gtoken": self.token_manager.get(TOKENS.GTOKEN)},
+        )
+        response.raise_for_status()
+        self.token_manager.add_token(
+            response.json()["bulletToken"], TOKENS.BULLET_TOKEN
+        )
+
+    def post(
+        self,
+        query_name: str,
+        bullet_token: str,
+        gtoken: str,
+        variables: dict,
+    ) -> requests.Response:
+        """Posts a single query to SplatNet 3.
+
+        Args:
+            query_name (str): The name of the query.
+            bullet_token (str): The bullet token to send the query with.
+            gtoken (str): The gtoken to send the query with.
+            variables (dict): The variables to use in the query.
+
+        Raises:
+            RetryableError: If SplatNet 3 is overloaded or briefly unavailable.
+
+        Returns:
+            requests.Response: The response from SplatNet 3.
+        """
+        if self.standin_url is None:
+            response = queries.query(
+                query_name,
+                bullet_token,
+                gtoken,
+                self.language,
+                self.user_agent,
+                variables=variables,
+            )
+        else:
+            response = queries.session.post(
+                self.standin_url + STANDIN_GRAPHQL_PATH,
+                json={"query": query_name, "variables": variables},
+                headers={"Authorization": f"Bearer {bullet_token}"},
+                cookies={"_gtoken": gtoken},
+            )
+        if response.status_code in RETRYABLE_STATUS_CODES:
+            raise RetryableError(
+                f"SplatNet 3 returned status code {response.status_code}."
+            )
+        return response
+
+    def throttled_post(
+        self,
+        query_name: str,
+        bullet_token: str,
+        gtoken: str,
+        variables: dict,
+    ) -> requests.Response:
+        """Posts a single query to SplatNet 3 through the limiter, if any.
+
+        Args:
+            query_name (str): The name of the query.
+            bullet_token (str): The bullet token to send the query with.
+            gtoken (str): The gtoken to send the query with.
+            variables (dict): The variables to use in the query.
+
+        Returns:
+            requests.Response: The response from SplatNet 3.
+        """
+        if self.limiter is None:
+            return self.post(query_name, bullet_token, gtoken, variables)
+        return self.limiter.call(
+            self.post, query_name, bullet_token, gtoken, variables
+        )
+
+    def send(self, query_name: str, variables: dict) -> requests.Response:
+        """Sends a query to SplatNet 3, refreshing the tokens and retrying
+        once if it fails. The response of the retry is returned whatever its
+        status code, for the caller to check.
+
+        Args:
+            query_name (str): The name of the query.
+            variables (dict): The variables to use in the query.
+
+        Returns:
+            requests.Response: The response from SplatNet 3.
+        """
+        generation, bullet_token, gtoken = self.current_tokens()
+        response = self.throttled_post(
+            query_name, bullet_token, gtoken, variables
+        )
+        if response.status_code == 200:
+            return response
+
+        self.refresh(generation)
+        _, bullet_token, gtoken = self.current_tokens()
+        return self.throttled_post(query_name, bullet_token, gtoken, variables)
+
+    @retry(times=1, exceptions=ConnectionError)
+    def query(
+        self, query_name: str, variables: dict = {}
+    ) -> RawQueryResponse:
+        """Queries SplatNet 3 and returns the data. This is a drop-in
+        replacement for ``QueryHandler.query`` that is safe to call from
+        several threads at once. The body of the response is kept along with
+        the parsed data.
+
+        Args:
+            query_name (str): The name of the query.
+            variables (dict): The variables to use in the query. Defaults to {}.
+
+        Raises:
+            SplatNetException: If the query still failed after refreshing the
+                tokens, or if it returned any errors.
+
+        Returns:
+            RawQueryResponse: The response from the query.
+        """
+        response = self.send(query_name, variables)
+        if response.status_code != 200:
+            raise SplatNetException(
+                f"Query {query_name} failed with status code "
+                f"{response.status_code}."
+            )
+        raw = response.content
+        # Only decode the body here if it might hold errors. Otherwise it is
+        # left for whoever reads the data, if anyone does.
+        if b'"errors"' not in raw:
+            return RawQueryResponse(raw)
+        body = json.loads(raw)
+        if "errors" in body:
+            raise SplatNetException(
+                "Query was successful but returned at least one error. Errors: "
+                + json.dumps(body["errors"], indent=4)
+            )
+        return RawQueryResponse(raw, data=body["data"])
@@ -1,27 +1,71 @@
-import json
+import datetime as dt
 import os
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 from typing import Callable, ParamSpec, TypeVar, cast
 
 import rich_click as click
+from rich.markup import escape
+from rich.progress import Progress
 from splatnet3_scraper.auth.exceptions import (
     FTokenException,
     NintendoException,
     SplatNetException,
 )
+from splatnet3_scraper.auth.graph_ql_queries import queries
+from splatnet3_scraper.constants import GRAPHQL_URL
 from splatnet3_scraper.query import QueryResponse
 from splatnet3_scraper.scraper import SplatNet_Scraper
+from splatnet3_scraper.scraper.query_map import QueryMap
 
 from data_zipcaster.cli import constants as consts
 from data_zipcaster.cli import styles as s
 from data_zipcaster.cli.base_plugins import BaseImporter
-from data_zipcaster.cli.utils import ProgressBar
+from data_zipcaster.cli.importers.splatnet.fetch import (
+    DetailFetcher,
+    HighWaterMark,
+    PendingMark,
+    collect_battle_ids,
+    iter_overview_nodes,
+    newest_mark,
+    settle_mark,
+)
+from data_zipcaster.cli.importers.splatnet.filters import (
+    RESULT_CHOICES,
+    RULE_CHOICES,
+    OverviewFilter,
+)
+from data_zipcaster.cli.importers.splatnet.handler import (
+    SharedQueryHandler,
+    raw_body,
+)
+from data_zipcaster.cli.importers.splatnet.tokens import (
+    CACHED_TOKEN_TYPES,
+    REFRESH_MARGIN,
+    TOKEN_CACHE_FILENAME,
+    TokenCache,
+)
+from data_zipcaster.cli.throttle import (
+    CircuitOpenError,
+    RetryableError,
+    get_limiter,
+)
+from data_zipcaster.cli.utils import ProgressBar, mount_connection_pool
 from data_zipcaster.models import main, splatnet
+from data_zipcaster.raw import (
+    ArchiveRunWriter,
+    RawArchive,
+    RawDumpWriter,
+)
 from data_zipcaster.transforms import splatnet_to_main as transforms
+from data_zipcaster.utils import base64_decode, base64_encode
 
 T = TypeVar("T")
 P = ParamSpec("P")
 
+STANDIN_PLACEHOLDER_TOKEN = "standin"
+
 
 class SplatNetImporter(BaseImporter):
     def __init__(self) -> None:
@@ -31,6 +75,23 @@ class SplatNetImporter(BaseImporter):
         self.bullet_token: str | None = None
         self.silent: bool = False
         self.limit: int = -1
+        self.overview_filter = OverviewFilter()
+        self.mode_workers: int = 1
+        self.max_concurrency: int = 1
+        self.pipeline: bool = False
+        self.strict: bool = False
+        self.pool_size: int = 10
+        self.rate_limit: float = 5.0
+        self.standin_url: str | None = None
+        self.mounted_pool_size: int | None = None
+        self.scraper: SplatNet_Scraper | None = None
+        self.scraper_session_token: str | None = None
+        self.query_handler: SharedQueryHandler | None = None
+        self.high_water_marks: dict[str, HighWaterMark] = {}
+        self.pending_marks: dict[str, PendingMark] = {}
+        self.token_cache: TokenCache | None = None
+        self.archive: RawArchive | None = None
+        self.config_lock = threading.Lock()
 
     @property
     def name(self) -> str:
@@ -127,6 +188,118 @@ class SplatNetImporter(BaseImporter):
                 ),
                 default=-1,
             ),
+            BaseImporter.Options(
+                option_name_1="--rule",
+                type_=click.Choice(RULE_CHOICES),
+                multiple=True,
+                help=(
+                    "Only import battles played on this rule. Can be "
+                    "specified multiple times to import several rules. "
+                    "Battles are filtered before their details are fetched."
+                ),
+            ),
+            BaseImporter.Options(
+                option_name_1="--stage",
+                type_=str,
+                multiple=True,
+                help=(
+                    "Only import battles played on this stage, given either "
+                    "by its name or by its numeric ID. Can be specified "
+                    "multiple times to import several stages. Battles are "
+                    "filtered before their details are fetched."
+                ),
+            ),
+            BaseImporter.Options(
+                option_name_1="--result",
+                type_=click.Choice(RESULT_CHOICES),
+                multiple=True,
+                help=(
+                    "Only import battles with this result. Can be specified "
+                    "multiple times to import several results. Battles are "
+                    "filtered before their details are fetched."
+                ),
+            ),
+            BaseImporter.Options(
+                option_name_1="--since",
+                type_=click.DateTime(),
+                help=(
+                    "Only import battles played at or after this time, in "
+                    "local time. Older battles are never fetched, and the "
+                    "history is not walked any further once one is reached."
+                ),
+                default=None,
+            ),
+            BaseImporter.Options(
+                option_name_1="--mode-workers",
+                type_=click.IntRange(min=1),
+                help=(
+                    "The number of modes to import at the same time. Each "
+                    "mode's overview and battle details are fetched in their "
+                    "own worker, with at most this many workers running at "
+                    "once. If not specified, the default is "
+                    f"{s.EMPHASIZE}1[/], which imports each mode one after "
+                    "another."
+                ),
+                default=1,
+            ),
+            BaseImporter.Options(
+                option_name_1="--max-concurrency",
+                type_=click.IntRange(min=1),
+                help=(
+                    "The maximum number of battle details to fetch at the same "
+                    "time within a single mode. If not specified, the default "
+                    f"is {s.EMPHASIZE}1[/], which fetches each battle one "
+                    "after another."
+                ),
+                default=1,
+            ),
+            BaseImporter.Options(
+                option_name_1="--pipeline",
+                is_flag=True,
+                help=(
+                    "Convert each battle as soon as its details arrive, while "
+                    "the details of the remaining battles are still being "
+                    "fetched. This overlaps the conversion work with the "
+                    "network requests, and is most useful together with "
+                    f"{s.OPTION_COLOR}--max-concurrency[/]."
+                ),
+                default=False,
+            ),
+            BaseImporter.Options(
+                option_name_1="--strict",
+                is_flag=True,
+                help=(
+                    "Validate every field of each battle against the full "
+                    "SplatNet 3 schema, rather than only the fields that are "
+                    "converted. This is slower, but catches changes to the "
+                    "parts of the schema that are otherwise ignored."
+                ),
+                default=False,
+            ),
+            BaseImporter.Options(
+                option_name_1="--pool-size",
+                type_=click.IntRange(min=1),
+                help=(
+                    "The maximum number of connections to SplatNet 3 to keep "
+                    "open and reuse between queries. This should be at least "
+                    f"{s.OPTION_COLOR}--mode-workers[/] times "
+                    f"{s.OPTION_COLOR}--max-concurrency[/]. If not "
+                    f"specified, the default is {s.EMPHASIZE}10[/]."
+                ),
+                default=10,
+            ),
+            BaseImporter.Options(
+                option_name_1="--rate-limit",
+                type_=click.FloatRange(min=0),
+                help=(
+                    "The maximum number of queries to send to SplatNet 3 per "
+                    "second, across all workers. Queries that fail because "
+                    "SplatNet 3 is overloaded are retried with backoff. Set "
+                    f"to {s.EMPHASIZE}0[/] to disable the limit. If not "
+                    f"specified, the default is {s.EMPHASIZE}5[/]."
+                ),
+                default=5.0,
+            ),
             BaseImporter.Options(
                 option_name_1="--save-raw",
                 help=(
@@ -135,8 +308,11 @@ class SplatNetImporter(BaseImporter):
                     "to. If the path is relative, it will be relative to the "
                     "current working directory. It will be saved to a "
                     "directory with the current time as the name, and then "
-                    "subdirectories for each mode. The raw data will be saved "
-                    "as JSON files. If not specified, the raw data will not "
+                    "subdirectories for each mode. The overview is saved as a "
+                    "JSON file, and each battle is appended to a gzipped "
+                    "JSON Lines file as soon as it arrives. This data can be "
+                    f"imported again with the {s.COMMAND_COLOR}replay[/] "
+                    "importer. If not specified, the raw data will not "
                     "be saved. Having this option enabled is the only way to "
                     "import from splatnet without specifying an "
                     f"{s.EXPORTER_COLOR}exporter[/]."
@@ -145,6 +321,38 @@ class SplatNetImporter(BaseImporter):
                 nargs=1,
                 type_=click.Path(exists=False, file_okay=False),
             ),
+            BaseImporter.Options(
+                option_name_1="--standin-url",
+                type_=str,
+                help=(
+                    "Send every query to a local SplatNet 3 stand-in server at "
+                    "this URL instead of SplatNet 3, such as one started with "
+                    f"{s.EMPHASIZE}python -m data_zipcaster.bench serve[/]. "
+                    "Nothing is sent to Nintendo, and any missing tokens are "
+                    "filled in with placeholders. This is meant for "
+                    "benchmarking and testing, use a separate "
+                    f"{s.OPTION_COLOR}--config[/] file with it."
+                ),
+                default=None,
+            ),
+            BaseImporter.Options(
+                option_name_1="--archive",
+                help=(
+                    "Add the raw data from the query to an archive. Takes one "
+                    "argument, which is the path to the archive directory. "
+                    "Unlike "
+                    f"{s.OPTION_COLOR}--save-raw[/], each battle is only "
+                    "stored once no matter how many runs fetch it, and each "
+                    "run only records a small manifest of the battles it saw. "
+                    "The archive can be imported again with the "
+                    f"{s.COMMAND_COLOR}replay[/] importer. Having this option "
+                    "enabled also allows importing from splatnet without "
+                    f"specifying an {s.EXPORTER_COLOR}exporter[/]."
+                ),
+                default=None,
+                nargs=1,
+                type_=click.Path(exists=False, file_okay=False),
+            ),
             BaseImporter.Options(
                 option_name_1="--f-token-url",
                 type_=str,
@@ -189,9 +397,11 @@ class SplatNetImporter(BaseImporter):
         """Runs the importer. This is the main function of the importer, it is
         called automatically by ``BaseImporter.run``.
 
-        This function will parse the kwargs, get a scraper, test the tokens,
-        parse the flags, print the flags that are being imported, and then
-        process the data.
+        This function will parse the kwargs, get a scraper, make sure its
+        tokens are usable, parse the flags, print the flags that are being
+        imported, and then process the data. The scraper and its connections
+        are kept for the life of the process, so in monitor mode they are only
+        set up again if the session token changes.
 
         Args:
             **kwargs: The kwargs passed to the run function.
@@ -200,19 +410,75 @@ class SplatNetImporter(BaseImporter):
             list[main.VsExtract]: The imported data.
         """
         self.parse_kwargs(kwargs)
-        scraper = self.get_scraper()
-        self.test_tokens(scraper)
+        if self.token_cache is None:
+            self.token_cache = self.get_token_cache(kwargs)
+        # Tokens from the config file or the command line were not generated
+        # by this process, so when they were issued is unknown.
+        self.token_cache.ignore([self.gtoken, self.bullet_token])
+        if self.mounted_pool_size != self.pool_size:
+            # The scraper sends every query through one shared session.
+            mount_connection_pool(queries.session, self.pool_size)
+            self.mounted_pool_size = self.pool_size
+        if (
+            self.scraper is None
+            or self.scraper_session_token != self.session_token
+        ):
+            self.scraper = self.get_scraper()
+            self.scraper_session_token = self.session_token
+            self.query_handler = self.get_query_handler(self.scraper)
+        scraper = self.scraper
+        self.ensure_tokens(scraper)
         self.parse_flags(kwargs)
         self.print_importing_flags(kwargs)
 
         return self.process_data(scraper, kwargs)
 
+    def allows_no_exporters(self, ctx: click.Context) -> bool:
+        """Allows running without exporters if the raw data is being saved.
+
+        Args:
+            ctx (click.Context): The click context.
+
+        Returns:
+            bool: Whether the ``--save-raw`` or ``--archive`` option was
+                specified.
+        """
+        for option in ("save_raw", "archive"):
+            if ctx.get_parameter_source(option).name == "DEFAULT":
+                continue
+            self.vprint(
+                f"No exporters were specified, but the {s.OPTION_COLOR}"
+                f"--{option.replace('_', '-')}[/] option was specified. This "
+                "will save the raw data to the given path.",
+                level=1,
+            )
+            return True
+        return False
+
     def parse_kwargs(self, kwargs: dict) -> None:
         session_token = kwargs.get("session_token", None)
         gtoken = kwargs.get("gtoken", None)
         bullet_token = kwargs.get("bullet_token", None)
         silent = kwargs.get("silent", False)
         limit = kwargs.get("limit", None)
+        mode_workers = kwargs.get("mode_workers", 1)
+        max_concurrency = kwargs.get("max_concurrency", 1)
+        pipeline = kwargs.get("pipeline", False)
+        strict = kwargs.get("strict", False)
+        pool_size = kwargs.get("pool_size", 10)
+        rules = kwargs.get("rule", None) or ()
+        stages = kwargs.get("stage", None) or ()
+        results = kwargs.get("result", None) or ()
+        since = kwargs.get("since", None)
+        rate_limit = kwargs.get("rate_limit", 5.0)
+        standin_url = kwargs.get("standin_url", None)
+
+        if standin_url is not None:
+            # The stand-in does not check the session token or the gtoken, and
+            # hands out bullet tokens itself.
+            session_token = session_token or STANDIN_PLACEHOLDER_TOKEN
+            gtoken = gtoken or STANDIN_PLACEHOLDER_TOKEN
+            bullet_token = bullet_token or STANDIN_PLACEHOLDER_TOKEN
 
         if session_token is None:
             raise click.ClickException(
@@ -228,12 +494,25 @@ class SplatNetImporter(BaseImporter):
         self.bullet_token = cast(str | None, bullet_token)
         self.silent = cast(bool, silent)
         self.limit = cast(int, limit)
+        self.mode_workers = cast(int, mode_workers)
+        self.max_concurrency = cast(int, max_concurrency)
+        self.pipeline = cast(bool, pipeline)
+        self.strict = cast(bool, strict)
+        self.pool_size = cast(int, pool_size)
+        self.overview_filter = OverviewFilter(
+            rules=cast(tuple[str, ...], rules),
+            stages=cast(tuple[str, ...], stages),
+            results=cast(tuple[str, ...], results),
+            since=cast(dt.datetime | None, since),
+        )
+        self.rate_limit = cast(float, rate_limit)
+        self.standin_url = cast(str | None, standin_url)
 
     def test_tokens(self, scraper: SplatNet_Scraper) -> None:
         """Tests the session token to make sure it is valid.
 
         Tests the tokens loaded onto the scraper to make sure they are valid by
-        making a fast, simple query. If the query fails, the scraper will
+        making a fast, simple query. If the query fails, the query handler will
         automatically attempt to refresh the tokens. Also generates a progress
         bar that will be overwritten once this function is done. If silent is
         True, the progress bar will not be generated. Silent is set by the
@@ -242,7 +521,7 @@ class SplatNetImporter(BaseImporter):
         Args:
             scraper (SplatNet_Scraper): The scraper to test the tokens on.
         """
-        handler = scraper.query_handler
+        handler = cast(SharedQueryHandler, self.query_handler)
 
         def fxn() -> None:
             self.handle_scraper_errors(
@@ -262,6 +541,101 @@ class SplatNetImporter(BaseImporter):
             transient=True,
         )
 
+    def get_token_cache(self, kwargs: dict) -> TokenCache:
+        """Gets the token cache that belongs to the config file. The cache
+        lives next to the config file.
+
+        Args:
+            kwargs (dict): The kwargs passed to the run function.
+
+        Returns:
+            TokenCache: The token cache.
+        """
+        config_path = kwargs.get("config", None) or "config.ini"
+        config_dir = os.path.dirname(os.path.abspath(config_path))
+        cache_path = os.path.join(config_dir, TOKEN_CACHE_FILENAME)
+        self.vprint(
+            f"Loading token cache from {s.EMPHASIZE}{cache_path}[/].",
+            level=3,
+        )
+        return TokenCache(cache_path)
+
+    def ensure_tokens(self, scraper: SplatNet_Scraper) -> None:
+        """Makes sure the tokens loaded onto the scraper are usable.
+
+        The token cache records when each token was issued, so tokens that are
+        known to be valid for a while longer are used as they are without
+        making any query. Tokens that are about to expire, or have already
+        expired, are regenerated straight away. Only tokens whose age is
+        unknown, such as ones passed on the command line, are tested with
+        ``test_tokens``. Tokens that are rejected later on are regenerated by
+        the query handler when a query fails.
+
+        Args:
+            scraper (SplatNet_Scraper): The scraper whose tokens to check.
+        """
+        cache = cast(TokenCache, self.token_cache)
+        token_manager = scraper.query_handler.config.token_manager
+        time_left: list[float | None] = []
+        for token_type in CACHED_TOKEN_TYPES:
+            try:
+                token = token_manager.get(token_type)
+            except ValueError:
+                token = None
+            time_left.append(cache.time_left(token_type, token))
+
+        if any(left is None for left in time_left):
+            self.test_tokens(scraper)
+            return
+
+        if all(cast(float, left) > REFRESH_MARGIN for left in time_left):
+            self.vprint("Using cached tokens.", level=2)
+            return
+
+        handler = cast(SharedQueryHandler, self.query_handler)
+        self.progress_bar(
+            lambda: self.handle_scraper_errors(handler.refresh),
+            message="Refreshing expiring tokens...",
+            condition=self.silent,
+            transient=True,
+        )
+
+    def get_query_handler(
+        self, scraper: SplatNet_Scraper
+    ) -> SharedQueryHandler:
+        """Gets a query handler that can be shared by every thread making
+        queries with the scraper's tokens.
+
+        Whenever the handler refreshes the tokens, they are saved to the config
+        file straight away. The refresh may happen on a worker thread without
+        a click context, so the current context is captured here and entered
+        to save them. All queries share the rate limit of SplatNet 3, set by
+        ``rate_limit``.
+
+        Args:
+            scraper (SplatNet_Scraper): The scraper holding the tokens.
+
+        Returns:
+            SharedQueryHandler: The query handler.
+        """
+        ctx = click.get_current_context()
+
+        def on_refresh() -> None:
+            with ctx.scope(cleanup=False):
+                self.save_tokens(scraper)
+
+        limiter = get_limiter(
+            self.standin_url or GRAPHQL_URL,
+            self.rate_limit,
+            burst=self.max_concurrency,
+        )
+        return SharedQueryHandler(
+            scraper.query_handler,
+            on_refresh=on_refresh,
+            limiter=limiter,
+            standin_url=self.standin_url,
+        )
+
     def get_scraper(
         self,
     ) -> SplatNet_Scraper:
@@ -307,12 +681,23 @@ class SplatNetImporter(BaseImporter):
         mode: str,
         limit: int | None = None,
         progress_callback: Callable[[int, int], None] | None = None,
-        existing_ids: list[str] | None = None,
+        existing_ids: set[str] | None = None,
+        on_overview: Callable[[QueryResponse], None] | None = None,
+        on_selected: Callable[[list[str]], None] | None = None,
+        on_detail: Callable[[int, QueryResponse], None] | None = None,
     ) -> tuple[QueryResponse, list[QueryResponse]]:
         """Gets the vs battles from the scraper.
 
-        Gets the vs battles from the scraper. This will also update the tokens
-        in the config file if they have changed as a result of the query, which
+        Gets the overview of the mode from the scraper, then fetches the
+        details of every battle selected from it that is newer than the mode's
+        high-water mark. Up to ``max_concurrency`` detail queries are in flight
+        at once. Once the details have been fetched, the newest battle in the
+        overview becomes the mode's pending mark. On the next run in monitor
+        mode the mark is moved to it if every battle fetched now has been
+        handled since, so only the overview is fetched unless new battles have
+        been played. Otherwise the old mark is kept, and the battles that were
+        not handled are fetched again. This will also update the tokens in the
+        config file if they have changed as a result of the query, which
         automatically happens when the scraper refreshes the tokens on a failed
         query. Additionally, this will convert exceptions into click exceptions
         with helpful messages for the user.
@@ -324,19 +709,53 @@ class SplatNetImporter(BaseImporter):
                 to None.
             progress_callback (Callable[[int, int], None]): A callback to
                 update the progress bar. Defaults to None.
+            existing_ids (set[str] | None): The base64 encoded IDs of the
+                battles that have already been imported, which will not be
+                fetched again. Defaults to None.
+            on_overview (Callable[[QueryResponse], None] | None): A callback
+                called with the overview as soon as it arrives, before any
+                details are fetched. Defaults to None.
+            on_selected (Callable[[list[str]], None] | None): A callback
+                called with the base64 encoded IDs of the battles to fetch,
+                before any are fetched. The index passed to ``on_detail`` is
+                the position of the battle in this list. Defaults to None.
+            on_detail (Callable[[int, QueryResponse], None] | None): A
+                callback called with the index and response of each battle as
+                soon as it arrives. Defaults to None.
 
         Returns:
             tuple[QueryResponse, list[QueryResponse]]: The overview and
                 detailed vs battles.
         """
-        overview, detailed = self.handle_scraper_errors(
-            scraper.get_matches,
-            mode,
-            True,
+        handler = cast(SharedQueryHandler, self.query_handler)
+        if (pending := self.pending_marks.pop(mode, None)) is not None:
+            if (settled := settle_mark(pending, existing_ids)) is not None:
+                self.high_water_marks[mode] = settled
+        overview = self.handle_scraper_errors(
+            handler.query, QueryMap.get(mode)
+        )
+        if on_overview is not None:
+            on_overview(overview)
+        battle_ids = collect_battle_ids(
+            overview,
             limit,
+            existing_ids,
+            mark=self.high_water_marks.get(mode, None),
+            overview_filter=self.overview_filter,
+        )
+        if on_selected is not None:
+            on_selected(battle_ids)
+        fetcher = DetailFetcher(handler, self.max_concurrency)
+        detailed = self.handle_scraper_errors(
+            fetcher.fetch,
+            battle_ids,
             progress_callback=progress_callback,
-            existing_ids=existing_ids,
+            on_response=on_detail,
         )
+        if (mark := newest_mark(overview)) is not None:
+            self.pending_marks[mode] = PendingMark(
+                mark=mark, battle_ids=battle_ids
+            )
 
         self.save_tokens(scraper)
         return overview, detailed
@@ -357,6 +776,8 @@ class SplatNetImporter(BaseImporter):
             ClickException: Error 401
             ClickException: Error 403
             ClickException: Error 204
+            ClickException: When SplatNet 3 keeps failing to respond.
+            ClickException: When a query fails in any other way.
             Exception: Any other exception.
 
         Returns:
@@ -376,6 +797,12 @@ class SplatNetImporter(BaseImporter):
                 "server being down and is out of your control. Please try "
                 "again later."
             )
+        except (CircuitOpenError, RetryableError):
+            raise click.ClickException(
+                "SplatNet 3 is not responding or is rejecting requests for "
+                "being sent too quickly. Please try again later, or lower "
+                "the --rate-limit and --max-concurrency options."
+            )
         except SplatNetException as e:
             # Check the error code within the exception message
             message = e.args[0]
@@ -397,6 +824,7 @@ class SplatNetImporter(BaseImporter):
                     "online, or use a session token from an account that has "
                     "played at least one match of Splatoon 3 online."
                 )
+            raise click.ClickException(f"SplatNet 3 query failed. {message}")
         except Exception as e:
             raise e
 
@@ -407,19 +835,28 @@ class SplatNetImporter(BaseImporter):
         """Saves the tokens to the config file.
 
         Saves the tokens to the config file. This will only save the tokens
-        that have changed since the last time the tokens were saved.
+        that have changed since the last time the tokens were saved. Tokens
+        that have changed are also recorded in the token cache along with the
+        time they were issued.
 
         Args:
             scraper (SplatNet_Scraper): The scraper to get the tokens from.
         """
         tokens = scraper.query_handler.export_tokens()
-        for token_type, token in tokens:
-            if token_type == "session_token":
-                continue
-
-            if self.get_from_config(self.name, token_type) != token:
-                self.set_to_config(self.name, token_type, token)
-        self.save_config()
+        # Modes imported concurrently share the config, so only one of them
+        # may update and write it at a time.
+        with self.config_lock:
+            for token_type, token in tokens:
+                if token_type == "session_token":
+                    continue
+
+                if self.get_from_config(self.name, token_type) != token:
+                    self.set_to_config(self.name, token_type, token)
+            self.save_config()
+            if self.token_cache is not None:
+                self.token_cache.update(
+                    scraper.query_handler.config.token_manager
+                )
 
     def parse_flags(self, kwargs: dict) -> None:
         """Parses the flags to determine which modes to import.
@@ -551,42 +988,190 @@ class SplatNetImporter(BaseImporter):
     ) -> list[main.VsExtract]:
         """Retrieves and processes the data from the scraper.
 
+        Each selected mode is imported one after another, unless more than one
+        mode worker was requested, in which case the modes are imported
+        concurrently. Either way, the processed battles are returned sorted by
+        their start time so that the output does not depend on the order in
+        which the modes finished.
+
         Args:
             scraper (SplatNet_Scraper): The scraper to get the data from.
             kwargs (dict): The kwargs passed to the run function.
 
         Returns:
-            list[main.VsExtract]: The processed data.
+            list[main.VsExtract]: The processed data, sorted by start time.
         """
-        outs: list[main.VsExtract] = []
         datetime_str = "%Y-%m-%d %H:%M:%S"
         time_str = time.strftime(datetime_str, time.localtime())
-        for flag in consts.FLAG_LIST:
-            overview, detailed = self.get_matches(
-                scraper, time_str, flag, kwargs
+        flags = [flag for flag in consts.FLAG_LIST if kwargs.get(flag, False)]
+
+        if self.mode_workers > 1 and len(flags) > 1:
+            outs = self.process_modes_concurrently(
+                scraper, time_str, flags, kwargs
             )
-            if overview is None:
-                continue
+        else:
+            outs = []
+            for flag in flags:
+                outs.extend(self.process_mode(scraper, time_str, flag, kwargs))
 
-            if len(detailed) == 0:
-                self.warn(
-                    f"No {s.OPTION_COLOR}{consts.FLAG_MAP[flag]}[/] data "
-                    "found. Skipping this mode."
-                )
-                continue
+        return sorted(outs, key=lambda battle: (battle.start_time, battle.id))
+
+    def process_modes_concurrently(
+        self,
+        scraper: SplatNet_Scraper,
+        time_str: str,
+        flags: list[consts.FlagType],
+        kwargs: dict,
+    ) -> list[main.VsExtract]:
+        """Imports and processes several modes at the same time.
 
-            self.vprint("Processing data...", level=1)
-            out = self.process_matches(overview, detailed, flag)
-            outs.extend(out)
+        Every mode runs in a worker from a pool bounded by the
+        ``--mode-workers`` option. The click context is pushed onto each worker
+        so that the usual config and output helpers keep working, and the
+        progress bars of all modes are drawn within a single shared
+        ``Progress``.
 
+        Args:
+            scraper (SplatNet_Scraper): The scraper to get the data from.
+            time_str (str): The time string to use for the file names.
+            flags (list[consts.FlagType]): The flags of the modes to import.
+            kwargs (dict): The kwargs passed to the run function.
+
+        Returns:
+            list[main.VsExtract]: The processed data of every mode, in no
+                particular order.
+        """
+        ctx = click.get_current_context()
+        progress = None if self.silent else Progress()
+
+        def worker(flag: consts.FlagType) -> list[main.VsExtract]:
+            with ctx.scope(cleanup=False):
+                return self.process_mode(
+                    scraper, time_str, flag, kwargs, progress=progress
+                )
+
+        self.vprint(
+            f"Importing {len(flags)} modes with up to "
+            f"{s.EMPHASIZE}{self.mode_workers}[/] workers...",
+            level=1,
+        )
+        outs: list[main.VsExtract] = []
+        max_workers = min(self.mode_workers, len(flags))
+        try:
+            if progress is not None:
+                progress.start()
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                futures = [executor.submit(worker, flag) for flag in flags]
+                for future in futures:
+                    outs.extend(future.result())
+        finally:
+            if progress is not None:
+                progress.stop()
         return outs
 
+    def process_mode(
+        self,
+        scraper: SplatNet_Scraper,
+        time_str: str,
+        flag: consts.FlagType,
+        kwargs: dict,
+        progress: Progress | None = None,
+    ) -> list[main.VsExtract]:
+        """Retrieves and processes the data for a single mode.
+
+        Args:
+            scraper (SplatNet_Scraper): The scraper to get the data from.
+            time_str (str): The time string to use for the file names.
+            flag (consts.FlagType): The flag of the mode to import.
+            kwargs (dict): The kwargs passed to the run function.
+            progress (Progress | None): A shared ``Progress`` to draw the
+                progress bar in. If None, the progress bar gets its own.
+                Defaults to None.
+
+        Returns:
+            list[main.VsExtract]: The processed data for the mode.
+        """
+        if self.pipeline:
+            return self.process_mode_pipelined(
+                scraper, time_str, flag, kwargs, progress=progress
+            )
+
+        overview, detailed = self.get_matches(
+            scraper, time_str, flag, kwargs, progress=progress
+        )
+        if overview is None:
+            return []
+
+        if len(detailed) == 0:
+            self.warn(
+                f"No {s.OPTION_COLOR}{consts.FLAG_MAP[flag]}[/] data "
+                "found. Skipping this mode."
+            )
+            return []
+
+        self.vprint("Processing data...", level=1)
+        return self.process_matches(overview, detailed, flag)
+
+    def process_mode_pipelined(
+        self,
+        scraper: SplatNet_Scraper,
+        time_str: str,
+        flag: consts.FlagType,
+        kwargs: dict,
+        progress: Progress | None = None,
+    ) -> list[main.VsExtract]:
+        """Retrieves and processes the data for a single mode as it arrives.
+
+        The metadata is converted as soon as the overview arrives, and each
+        battle is validated and converted as soon as its details arrive, while
+        the details of later battles are still in flight.
+
+        Args:
+            scraper (SplatNet_Scraper): The scraper to get the data from.
+            time_str (str): The time string to use for the file names.
+            flag (consts.FlagType): The flag of the mode to import.
+            kwargs (dict): The kwargs passed to the run function.
+            progress (Progress | None): A shared ``Progress`` to draw the
+                progress bar in. If None, the progress bar gets its own.
+                Defaults to None.
+
+        Returns:
+            list[main.VsExtract]: The processed data for the mode, in the same
+                order as the overview.
+        """
+        metadata: dict[str, main.AnarchyMetadata | main.XMetadata] = {}
+        converted: dict[int, main.VsExtract] = {}
+
+        def on_overview(overview: QueryResponse) -> None:
+            self.vprint("Converting metadata...", level=2)
+            metadata.update(self.convert_metadata(overview, flag))
+
+        def on_detail(idx: int, vs_detail: QueryResponse) -> None:
+            converted[idx] = self.convert_vs_data(vs_detail, metadata)
+
+        overview, detailed = self.get_matches(
+            scraper,
+            time_str,
+            flag,
+            kwargs,
+            progress=progress,
+            on_overview=on_overview,
+            on_detail=on_detail,
+        )
+        if overview is None:
+            return []
+
+        return [converted[idx] for idx in sorted(converted)]
+
     def get_matches(
         self,
         scraper: SplatNet_Scraper,
         time_str: str,
         flag: consts.FlagType,
         kwargs: dict,
+        progress: Progress | None = None,
+        on_overview: Callable[[QueryResponse], None] | None = None,
+        on_detail: Callable[[int, QueryResponse], None] | None = None,
     ) -> tuple[QueryResponse | None, list[QueryResponse]]:
         """Gets the matches from the scraper.
 
@@ -595,6 +1180,14 @@ class SplatNetImporter(BaseImporter):
             time_str (str): The time string to use for the file names.
             flag (consts.FlagType): The flag to get the data for.
             kwargs (dict): The kwargs passed to the run function.
+            progress (Progress | None): A shared ``Progress`` to draw the
+                progress bar in. Defaults to None.
+            on_overview (Callable[[QueryResponse], None] | None): A callback
+                called with the overview as soon as it arrives. Defaults to
+                None.
+            on_detail (Callable[[int, QueryResponse], None] | None): A
+                callback called with the index and response of each battle as
+                soon as it arrives. Defaults to None.
 
         Returns:
             tuple[QueryResponse | None, list[QueryResponse]]: The overview and
@@ -605,29 +1198,86 @@ class SplatNetImporter(BaseImporter):
             return (None, [])
 
         message = f"Importing {s.OPTION_COLOR}%s[/] data from SplatNet 3."
-        if self.get_from_context("imported") is not None:
-            previously_imported = cast(
-                list[str], self.get_from_context("imported")
-            )
-        else:
-            previously_imported = []
-
-        previously_imported = cast(list[str], self.get_from_context("imported"))
-        with ProgressBar(
-            message % consts.FLAG_MAP[flag],
-        ) as progress_callback:
-            overview, detailed = self.__get_matches(
-                scraper,
-                flag,
-                limit=self.limit,
-                progress_callback=progress_callback,
-                existing_ids=previously_imported,
+        previously_imported = self.get_previously_imported()
+        writers = self.get_raw_writers(flag, time_str, kwargs)
+        # The overview is decoded to select the battles anyway, so the ID and
+        # played time of each battle are read from it rather than from the
+        # details, which are only decoded if they can not be saved as is.
+        played_times: dict[str, str | None] = {}
+        selected: list[str] = []
+
+        def overview_hook(overview: QueryResponse) -> None:
+            if len(writers) > 0:
+                for node in iter_overview_nodes(overview):
+                    played_times[node["id"]] = node.get("playedTime", None)
+            for writer in writers:
+                writer.write_overview(
+                    cast(dict, overview.data), raw=raw_body(overview)
+                )
+            if on_overview is not None:
+                on_overview(overview)
+
+        def detail_hook(idx: int, vs_detail: QueryResponse) -> None:
+            battle_id = selected[idx]
+            played_time = played_times.get(battle_id, None)
+            key = (
+                (base64_decode(battle_id), played_time)
+                if played_time is not None
+                else None
             )
-        self.save_raw_data(overview, detailed, flag, time_str, kwargs)
+            for writer in writers:
+                writer.write_detail(
+                    lambda: cast(dict, vs_detail.data),
+                    raw=raw_body(vs_detail),
+                    key=key,
+                )
+            if on_detail is not None:
+                on_detail(idx, vs_detail)
+
+        try:
+            with ProgressBar(
+                message % consts.FLAG_MAP[flag],
+                progress=progress,
+            ) as progress_callback:
+                overview, detailed = self.__get_matches(
+                    scraper,
+                    flag,
+                    limit=self.limit,
+                    progress_callback=progress_callback,
+                    existing_ids=previously_imported,
+                    on_overview=overview_hook,
+                    on_selected=selected.extend,
+                    on_detail=detail_hook,
+                )
+        finally:
+            for writer in writers:
+                writer.close()
+                if writer.count > 0:
+                    self.vprint(
+                        f"Saved {writer.count} raw battles to "
+                        f"{s.EMPHASIZE}{writer.path}[/].",
+                        level=2,
+                    )
         if len(detailed) == 0:
             return (None, detailed)
         return overview, detailed
 
+    def get_previously_imported(self) -> set[str]:
+        """Gets the battles that do not need to be fetched again.
+
+        The battles are read from the battle ledger. When exporters were
+        specified, only the battles that every one of them has already received
+        are skipped. Otherwise, every battle this importer has fetched before
+        is skipped.
+
+        Returns:
+            set[str]: The base64 encoded IDs of the battles, as they appear in
+                the SplatNet 3 overview.
+        """
+        exporters = cast(list[str], self.get_from_context("exporters") or [])
+        known_ids = self.get_ledger().known_ids(self.name, exporters)
+        return {base64_encode(battle_id) for battle_id in known_ids}
+
     def process_matches(
         self,
         overview: QueryResponse,
@@ -651,13 +1301,10 @@ class SplatNetImporter(BaseImporter):
         """
         if len(detailed) == 0:
             return []
-        out: list[main.VsExtract] = []
         self.vprint("Converting metadata...", level=2)
         metadata = self.convert_metadata(overview, flag)
         self.vprint("Converting matches...", level=2)
-        for match in detailed:
-            out.append(self.convert_vs_data(match, metadata))
-        return out
+        return self.convert_vs_batch(detailed, metadata)
 
     def convert_metadata(
         self,
@@ -676,9 +1323,9 @@ class SplatNetImporter(BaseImporter):
                 challenge, or salmon. The key will be the battle ID, and the
                 value will be the metadata.
         """
-        raw_metadata = splatnet.generate_metadata(overview.data)
         if flag in ("private", "turf", "challenge", "salmon"):
             return {}
+        raw_metadata = splatnet.generate_metadata(overview.data, flag)
         assert isinstance(
             raw_metadata, (splatnet.AnarchyMetadata, splatnet.XMetadata)
         )
@@ -701,76 +1348,131 @@ class SplatNetImporter(BaseImporter):
         Returns:
             main.VsExtract: The converted vs data.
         """
-        vs_detailed = splatnet.generate_vs_detail(vs_detail.data)
+        raw = raw_body(vs_detail)
+        if raw is not None:
+            vs_detailed = splatnet.generate_vs_detail_json(
+                raw, strict=self.strict
+            )
+        else:
+            vs_detailed = splatnet.generate_vs_detail(
+                vs_detail.data, strict=self.strict
+            )
         converted_vs = transforms.convert_vs_data(vs_detailed)
         return transforms.append_metadata(converted_vs, metadata)
 
-    def save_raw_data(
+    def convert_vs_batch(
         self,
-        overview: QueryResponse,
         detailed: list[QueryResponse],
+        metadata: dict[str, main.AnarchyMetadata | main.XMetadata],
+    ) -> list[main.VsExtract]:
+        """Converts the vs data of every battle of a mode at once.
+
+        The details are validated together in a single pass, straight from
+        their raw bodies when every response still has one. A battle that
+        fails to validate is skipped with a warning instead of stopping the
+        rest of the mode, and is picked up again by the next import.
+
+        Args:
+            detailed (list[QueryResponse]): The detailed responses from the
+                query.
+            metadata (dict[str, main.AnarchyMetadata  |  main.XMetadata]): The
+                metadata for the battles. This will be empty if the flag is
+                private, turf, challenge, or salmon. The key will be the battle
+                ID, and the value will be the metadata.
+
+        Returns:
+            list[main.VsExtract]: The converted vs data of the battles that
+                validated, in the order they were given.
+        """
+        bodies = [raw_body(vs_detail) for vs_detail in detailed]
+        if all(body is not None for body in bodies):
+            batch = splatnet.generate_vs_details_json(
+                cast(list[bytes], bodies), strict=self.strict
+            )
+        else:
+            batch = splatnet.generate_vs_details(
+                [cast(dict, vs_detail.data) for vs_detail in detailed],
+                strict=self.strict,
+            )
+
+        for idx, error in sorted(batch["errors"].items()):
+            self.warn(
+                f"Battle {idx + 1} of {len(detailed)} could not be validated "
+                f"and was skipped: {error.error_count()} errors."
+            )
+            self.vprint(escape(str(error)), level=2)
+
+        out: list[main.VsExtract] = []
+        for vs_detailed in batch["details"]:
+            if vs_detailed is None:
+                continue
+            converted_vs = transforms.convert_vs_data(vs_detailed)
+            out.append(transforms.append_metadata(converted_vs, metadata))
+        return out
+
+    def get_raw_writers(
+        self,
         flag: str,
         time_str: str,
         kwargs: dict,
-    ) -> None:
-        """Saves the raw data from the query.
+    ) -> list[RawDumpWriter | ArchiveRunWriter]:
+        """Gets the writers that save the raw data from the queries.
 
-        Saves the raw data from the query. This will save the data to the
-        directory specified by the save_raw option.
+        If the save_raw option is given, the raw data is saved to that
+        directory, in a subdirectory named after the time of the import and
+        then the mode. If the archive option is given, the raw data is added to
+        that archive, where each response is only stored once across every
+        run. Either way, each detailed response is written as soon as it
+        arrives, so the data of an import that stops part way through is not
+        lost.
 
         Args:
-            overview (QueryResponse): The overview response from the query.
-            detailed (list[QueryResponse]): The detailed responses from the
-                query.
             flag (str): The flag that was used to get the data.
-            time_str (str): The time string to use for the file names.
+            time_str (str): The time string to use for the directory name.
             kwargs (dict): The kwargs passed to the run function.
+
+        Returns:
+            list[RawDumpWriter | ArchiveRunWriter]: The writers, empty if the
+                raw data is not being saved.
         """
+        writers: list[RawDumpWriter | ArchiveRunWriter] = []
         save_raw = kwargs.get("save_raw", None)
-        if save_raw is None or len(detailed) == 0:
-            return
+        if save_raw is not None:
+            # Check if the path given is absolute or relative
+            if not os.path.isabs(save_raw):
+                save_raw = os.path.join(os.getcwd(), save_raw)
+
+            base_path = os.path.join(save_raw, time_str, flag)
+            self.vprint(
+                f"Saving raw data to {s.EMPHASIZE}{base_path}[/]...",
+                level=2,
+            )
+            writers.append(RawDumpWriter(base_path))
 
-        self.vprint(
-            f"Saving raw data to {s.EMPHASIZE}{save_raw}[/]...",
-            level=1,
-        )
-        # Check if the path given is absolute or relative
-        if not os.path.isabs(save_raw):
-            save_raw = os.path.join(os.getcwd(), save_raw)
-
-        base_path = os.path.join(save_raw, time_str, flag)
-        if not os.path.exists(base_path):
-            os.makedirs(base_path)
-
-        # Overview
-        overview_dict = overview.data
-        detailed_dicts = [detailed.data for detailed in detailed]
-        overview_path = os.path.join(base_path, "overview.json")
-        self.vprint(
-            f"Saving overview data to {s.EMPHASIZE}{overview_path}[/]...",
-            level=2,
-        )
-        with open(overview_path, "w") as f:
-            json.dump(overview_dict, f)
-        self.vprint(
-            "Saved overview data!",
-            level=3,
-        )
+        if (archive := self.get_archive(kwargs)) is not None:
+            writers.append(ArchiveRunWriter(archive, time_str, flag))
+        return writers
 
-        # Detailed
-        detailed_path = os.path.join(base_path, "detailed.json")
-        self.vprint(
-            f"Saving detailed data to {s.EMPHASIZE}{detailed_path}[/]...",
-            level=2,
-        )
-        with open(detailed_path, "w") as f:
-            json.dump(detailed_dicts, f)
-        self.vprint(
-            "Saved detailed data!",
-            level=3,
-        )
+    def get_archive(self, kwargs: dict) -> RawArchive | None:
+        """Gets the raw archive, opening it on first use. The archive is
+        shared by every mode.
 
-        self.vprint(
-            f"Saved raw data to {s.EMPHASIZE}{save_raw}[/]!",
-            level=1,
-        )
+        Args:
+            kwargs (dict): The kwargs passed to the run function.
+
+        Returns:
+            RawArchive | None: The archive, or None if the archive option was
+                not given.
+        """
+        archive_path = kwargs.get("archive", None)
+        if archive_path is None:
+            return None
+        archive_path = os.path.abspath(archive_path)
+        with self.config_lock:
+            if self.archive is None or self.archive.root != archive_path:
+                self.vprint(
+                    f"Opening raw archive at {s.EMPHASIZE}{archive_path}[/].",
+                    level=2,
+                )
+                self.archive = RawArchive(archive_path)
+            return self.archive
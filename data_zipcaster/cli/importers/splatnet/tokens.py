@@ -0,0 +1,137 @@
+import json
+import os
+import tempfile
+import time
+from typing import Iterable, TypedDict
+
+from splatnet3_scraper.auth import TokenManager
+from splatnet3_scraper.constants import TOKEN_EXPIRATIONS, TOKENS
+
+TOKEN_CACHE_FILENAME = "token_cache.json"
+# Tokens this close to expiring are regenerated rather than used as-is.
+REFRESH_MARGIN = 10 * 60
+CACHED_TOKEN_TYPES = (TOKENS.GTOKEN, TOKENS.BULLET_TOKEN)
+
+
+class CachedToken(TypedDict):
+    """A token along with when it was issued and how long it lasts.
+
+    Fields:
+        - token (str): The value of the token.
+        - issued_at (float): When the token was generated, in seconds since
+            the epoch.
+        - lifetime (float): How long the token stays valid after being issued,
+            in seconds.
+    """
+
+    token: str
+    issued_at: float
+    lifetime: float
+
+
+class TokenCache:
+    def __init__(self, path: str) -> None:
+        """A cache of the generated tokens that is shared between processes.
+
+        The config file only holds the value of each token, which says nothing
+        about whether it is still valid. The cache keeps track of when each
+        token was issued and how long it lasts, so that a new process can use
+        tokens that are known to be fresh without first probing SplatNet 3.
+
+        Args:
+            path (str): The path to the cache file. It will be created the
+                first time a token is recorded.
+        """
+        self.path = path
+        self.tokens: dict[str, CachedToken] = self.load()
+        self.ignored: set[str] = set()
+
+    def load(self) -> dict[str, CachedToken]:
+        """Loads the cache from disk. A missing or corrupt cache file is
+        treated as an empty cache.
+
+        Returns:
+            dict[str, CachedToken]: The cached tokens, keyed by token type.
+        """
+        try:
+            with open(self.path, "r") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def save(self) -> None:
+        """Saves the cache to disk. The cache is written to a temporary file
+        next to it first and then moved into place, so another process reading
+        the cache at the same time never sees a partly written file.
+        """
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp_path = tempfile.mkstemp(
+            prefix=os.path.basename(self.path) + ".", dir=directory
+        )
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(self.tokens, f)
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+
+    def time_left(self, token_type: str, token: str | None) -> float | None:
+        """Gets how long a token has left before it expires.
+
+        Args:
+            token_type (str): The type of the token.
+            token (str | None): The value of the token.
+
+        Returns:
+            float | None: The number of seconds left before the token expires,
+                negative if it has already expired. None if the token is not
+                the one in the cache, in which case its age is unknown.
+        """
+        cached = self.tokens.get(token_type, None)
+        if token is None or cached is None or cached["token"] != token:
+            return None
+        return cached["issued_at"] + cached["lifetime"] - time.time()
+
+    def ignore(self, tokens: Iterable[str | None]) -> None:
+        """Keeps tokens that were loaded rather than generated out of the
+        cache. The time a loaded token was issued is unknown, and recording
+        it as issued when it was loaded would trust a token that may be close
+        to expiring. Loaded tokens that are already in the cache are still
+        used, since they were recorded when they were generated.
+
+        Args:
+            tokens (Iterable[str | None]): The values of the loaded tokens.
+        """
+        self.ignored.update(token for token in tokens if token is not None)
+
+    def update(self, token_manager: TokenManager) -> None:
+        """Records any tokens that have changed since they were last cached.
+        Tokens that are already in the cache keep their original issue time,
+        and tokens passed to ``ignore`` are not recorded.
+
+        Args:
+            token_manager (TokenManager): The token manager holding the current
+                tokens.
+        """
+        changed = False
+        for token_type in CACHED_TOKEN_TYPES:
+            try:
+                token = token_manager.get(token_type, full_token=True)
+            except ValueError:
+                continue
+            if token.token in self.ignored:
+                continue
+            cached = self.tokens.get(token_type, None)
+            if cached is not None and cached["token"] == token.token:
+                continue
+            self.tokens[token_type] = CachedToken(
+                token=token.token,
+                issued_at=token.timestamp,
+                lifetime=TOKEN_EXPIRATIONS[token_type],
+            )
+            changed = True
+
+        if changed:
+            self.save()
+
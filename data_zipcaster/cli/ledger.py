@@ -0,0 +1,127 @@
+import sqlite3
+import threading
+import time
+from typing import Iterable
+
+LEDGER_FILENAME = "ledger.sqlite3"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS imports (
+    battle_id TEXT PRIMARY KEY,
+    importer TEXT NOT NULL,
+    imported_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS exports (
+    battle_id TEXT NOT NULL,
+    exporter TEXT NOT NULL,
+    exported_at REAL NOT NULL,
+    PRIMARY KEY (battle_id, exporter)
+);
+"""
+
+
+class BattleLedger:
+    def __init__(self, path: str) -> None:
+        """An on-disk record of the battles that have been handled.
+
+        The ledger is a SQLite database keyed by the decoded battle ID. It
+        records which importer first fetched each battle and which exporters
+        have received it, so that battles are not fetched or exported again
+        across runs. The connection may be shared between threads, all access
+        to it is serialized by a lock.
+
+        Args:
+            path (str): The path to the SQLite database. It will be created if
+                it does not exist.
+        """
+        self.path = path
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        with self.lock, self.connection:
+            self.connection.executescript(SCHEMA)
+
+    def record_import(self, battle_ids: Iterable[str], importer: str) -> None:
+        """Records that the given battles were fetched by an importer. Battles
+        that are already in the ledger keep their original importer.
+
+        Args:
+            battle_ids (Iterable[str]): The decoded IDs of the battles.
+            importer (str): The name of the importer.
+        """
+        now = time.time()
+        with self.lock, self.connection:
+            self.connection.executemany(
+                "INSERT OR IGNORE INTO imports VALUES (?, ?, ?)",
+                [(battle_id, importer, now) for battle_id in battle_ids],
+            )
+
+    def record_export(self, battle_ids: Iterable[str], exporter: str) -> None:
+        """Records that the given battles were received by an exporter.
+
+        Args:
+            battle_ids (Iterable[str]): The decoded IDs of the battles.
+            exporter (str): The name of the exporter.
+        """
+        now = time.time()
+        with self.lock, self.connection:
+            self.connection.executemany(
+                "INSERT OR IGNORE INTO exports VALUES (?, ?, ?)",
+                [(battle_id, exporter, now) for battle_id in battle_ids],
+            )
+
+    def imported_ids(self, importer: str) -> set[str]:
+        """Gets the battles that were fetched by an importer.
+
+        Args:
+            importer (str): The name of the importer.
+
+        Returns:
+            set[str]: The decoded IDs of the battles.
+        """
+        with self.lock:
+            rows = self.connection.execute(
+                "SELECT battle_id FROM imports WHERE importer = ?", (importer,)
+            ).fetchall()
+        return {row[0] for row in rows}
+
+    def exported_ids(self, exporter: str) -> set[str]:
+        """Gets the battles that were received by an exporter.
+
+        Args:
+            exporter (str): The name of the exporter.
+
+        Returns:
+            set[str]: The decoded IDs of the battles.
+        """
+        with self.lock:
+            rows = self.connection.execute(
+                "SELECT battle_id FROM exports WHERE exporter = ?", (exporter,)
+            ).fetchall()
+        return {row[0] for row in rows}
+
+    def known_ids(self, importer: str, exporters: list[str]) -> set[str]:
+        """Gets the battles that an importer does not need to fetch again.
+
+        If any exporters are given, a battle is only known once every one of
+        them has received it, so that a battle whose export failed is fetched
+        again on the next run. Otherwise, a battle is known once the importer
+        has fetched it.
+
+        Args:
+            importer (str): The name of the importer.
+            exporters (list[str]): The names of the exporters the imported
+                battles will be sent to.
+
+        Returns:
+            set[str]: The decoded IDs of the known battles.
+        """
+        if len(exporters) == 0:
+            return self.imported_ids(importer)
+        return set.intersection(
+            *[self.exported_ids(exporter) for exporter in exporters]
+        )
+
+    def close(self) -> None:
+        """Closes the connection to the database."""
+        with self.lock:
+            self.connection.close()
@@ -0,0 +1,251 @@
+import random
+import threading
+import time
+from typing import Callable, Iterator, ParamSpec, TypeVar
+from urllib.parse import urlparse
+
+import requests
+
+T = TypeVar("T")
+P = ParamSpec("P")
+
+# Status codes that mean the server is overloaded or briefly unavailable, and
+# that the same request is likely to succeed if it is sent again later.
+RETRYABLE_STATUS_CODES = frozenset({429, 500, 502, 503, 504})
+
+
+class CircuitOpenError(Exception):
+    """Raised when a request is refused because the host's circuit breaker is
+    open after too many consecutive failures."""
+
+    pass
+
+
+class RetryableError(Exception):
+    """Raised to signal that a request failed in a way that is worth retrying,
+    such as a 429 or 503 response."""
+
+    pass
+
+
+# Exceptions raised by a request that failed in a way that is worth retrying.
+TRANSIENT_EXCEPTIONS = (
+    RetryableError,
+    ConnectionError,
+    requests.ConnectionError,
+    requests.Timeout,
+)
+
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: int = 1) -> None:
+        """A thread-safe token bucket rate limiter.
+
+        The bucket holds up to ``burst`` tokens and refills at ``rate`` tokens
+        per second. Every request takes one token, waiting for one to become
+        available if the bucket is empty.
+
+        Args:
+            rate (float): The number of requests allowed per second. If 0 or
+                less, requests are never delayed.
+            burst (int): The number of requests that may be sent back to back
+                before being limited to ``rate``. Defaults to 1.
+        """
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.tokens = float(self.burst)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self) -> None:
+        """Takes a token from the bucket, waiting until one is available."""
+        if self.rate <= 0:
+            return
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(
+                    self.burst, self.tokens + (now - self.updated) * self.rate
+                )
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class CircuitBreaker:
+    def __init__(
+        self, failure_threshold: int = 5, reset_timeout: float = 30.0
+    ) -> None:
+        """A thread-safe circuit breaker.
+
+        After ``failure_threshold`` consecutive failures the circuit opens and
+        every request is refused straight away with a ``CircuitOpenError``.
+        Once ``reset_timeout`` seconds have passed, a single trial request is
+        let through. If it succeeds the circuit closes again, otherwise it
+        stays open for another ``reset_timeout`` seconds.
+
+        Args:
+            failure_threshold (int): The number of consecutive failures that
+                open the circuit. Defaults to 5.
+            reset_timeout (float): How long the circuit stays open before a
+                trial request is let through, in seconds. Defaults to 30.
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: float | None = None
+        self.lock = threading.Lock()
+
+    def before_call(self) -> None:
+        """Checks that a request may be sent.
+
+        Raises:
+            CircuitOpenError: If the circuit is open.
+        """
+        with self.lock:
+            if self.opened_at is None:
+                return
+            if time.monotonic() - self.opened_at < self.reset_timeout:
+                raise CircuitOpenError(
+                    f"Refusing to send request after {self.failures} "
+                    "consecutive failures."
+                )
+            # Let this request through as a trial, and keep the rest out until
+            # it has finished.
+            self.opened_at = time.monotonic()
+
+    def record_success(self) -> None:
+        """Records a successful request, closing the circuit."""
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+
+    def record_failure(self) -> None:
+        """Records a failed request, opening the circuit if there have been
+        too many in a row."""
+        with self.lock:
+            self.failures += 1
+            if self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+
+
+def backoff_delays(
+    retries: int, base: float = 0.5, cap: float = 30.0
+) -> Iterator[float]:
+    """Generates the delays to wait before each retry.
+
+    Uses exponential backoff with full jitter: the delay before the n-th retry
+    is picked at random between 0 and ``base * 2 ** n``, capped at ``cap``.
+    This keeps concurrent workers that failed together from retrying together.
+
+    Args:
+        retries (int): The number of delays to generate.
+        base (float): The upper bound of the first delay, in seconds. Defaults
+            to 0.5.
+        cap (float): The largest upper bound of any delay, in seconds. Defaults
+            to 30.
+
+    Yields:
+        float: The delay before each retry, in seconds.
+    """
+    for attempt in range(retries):
+        yield random.uniform(0, min(cap, base * 2**attempt))
+
+
+class HostLimiter:
+    def __init__(
+        self,
+        rate: float,
+        burst: int = 1,
+        retries: int = 4,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+    ) -> None:
+        """The rate limit, retry policy and circuit breaker for one host.
+
+        Args:
+            rate (float): The number of requests allowed per second. If 0 or
+                less, requests are never delayed.
+            burst (int): The number of requests that may be sent back to back.
+                Defaults to 1.
+            retries (int): The number of times to retry a request that failed
+                with one of the ``TRANSIENT_EXCEPTIONS``. Defaults to 4.
+            failure_threshold (int): The number of consecutive failures that
+                open the circuit. Defaults to 5.
+            reset_timeout (float): How long the circuit stays open, in seconds.
+                Defaults to 30.
+        """
+        self.bucket = TokenBucket(rate, burst)
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+        self.retries = retries
+
+    def call(
+        self, fxn: Callable[P, T], *args: P.args, **kwargs: P.kwargs
+    ) -> T:
+        """Calls a function that sends a request to the host.
+
+        Every attempt waits for the rate limit and is refused if the circuit is
+        open. Attempts that raise one of the ``TRANSIENT_EXCEPTIONS`` are
+        retried after a jittered exponential backoff. Any other exception is
+        raised straight away without counting as a failure of the host.
+
+        Args:
+            fxn (Callable[P, T]): The function that sends the request.
+            *args (P.args): The positional arguments to pass to the function.
+            **kwargs (P.kwargs): The keyword arguments to pass to the function.
+
+        Raises:
+            CircuitOpenError: If the circuit is open.
+            Exception: The last of the ``TRANSIENT_EXCEPTIONS`` raised, if
+                every attempt failed.
+
+        Returns:
+            T: The return value of the function.
+        """
+        delays = backoff_delays(self.retries)
+        while True:
+            self.breaker.before_call()
+            self.bucket.acquire()
+            try:
+                out = fxn(*args, **kwargs)
+            except TRANSIENT_EXCEPTIONS:
+                self.breaker.record_failure()
+                delay = next(delays, None)
+                if delay is None:
+                    raise
+                time.sleep(delay)
+                continue
+            self.breaker.record_success()
+            return out
+
+
+_limiters: dict[str, HostLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_limiter(url: str, rate: float, burst: int = 1) -> HostLimiter:
+    """Gets the limiter shared by every request to the host of a URL. The
+    limiter is created on first use with the given rate and burst, which then
+    apply to every request to the host. Later calls get the same limiter and
+    do not change its settings, so one caller can not silently loosen or
+    tighten the limit for the others.
+
+    Args:
+        url (str): A URL on the host.
+        rate (float): The number of requests allowed per second to the host.
+        burst (int): The number of requests that may be sent back to back.
+            Defaults to 1.
+
+    Returns:
+        HostLimiter: The limiter of the host.
+    """
+    host = urlparse(url).netloc
+    with _limiters_lock:
+        limiter = _limiters.get(host, None)
+        if limiter is None:
+            limiter = HostLimiter(rate, burst)
+            _limiters[host] = limiter
+        return limiter
@@ -5,8 +5,10 @@ import sys
 import traceback
 from typing import Callable, ParamSpec, TypeVar
 
+import requests
 import rich
 import rich_click as click
+from requests.adapters import HTTPAdapter
 from rich.progress import Progress
 
 from data_zipcaster import __version__
@@ -76,16 +78,44 @@ def handle_exception(
     return wrapper
 
 
+def mount_connection_pool(session: requests.Session, pool_size: int) -> None:
+    """Sizes the connection pool of a session.
+
+    Each host the session talks to gets its own pool of keep-alive
+    connections, holding up to ``pool_size`` connections that are reused
+    between requests instead of opening a new connection every time. The
+    default pool of ``requests`` holds 10 connections, so running more requests
+    than that at once would otherwise open and throw away extra connections.
+
+    Args:
+        session (requests.Session): The session to size the pool of.
+        pool_size (int): The maximum number of connections to keep open to
+            each host.
+    """
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+
+
 class ProgressBar:
-    def __init__(self, task_message: str = ""):
+    def __init__(
+        self, task_message: str = "", progress: Progress | None = None
+    ):
         """A context manager that creates a progress bar. If the silent option
         is passed, the progress bar will not be created.
 
         Args:
             task_message (str): The message to display in the progress bar.
                 Defaults to "".
+            progress (Progress | None): An already running ``Progress`` to add
+                this progress bar to as a new task. This allows several
+                progress bars to be displayed at once, such as when multiple
+                modes are imported concurrently. The shared ``Progress`` is
+                not stopped when this context manager exits. If None, a new
+                ``Progress`` is created. Defaults to None.
         """
         self.progress: Progress | None = None
+        self.shared_progress = progress
         self.task_id: str | None = None
         self.task_message = task_message
         ctx = click.get_current_context()
@@ -103,12 +133,18 @@ class ProgressBar:
                 current (int): Current progress.
                 total (int): Total progress.
             """
-            if current == 0:
+            if current == 0 and self.shared_progress is not None:
+                self.task_id = self.shared_progress.add_task(
+                    self.task_message, total=total
+                )
+            elif current == 0:
                 self.progress = Progress()
                 self.task_id = self.progress.add_task(
                     self.task_message, total=total
                 )
                 self.progress.start()
+            elif self.shared_progress is not None:
+                self.shared_progress.update(self.task_id, advance=1)
             else:
                 self.progress.update(self.task_id, advance=1)
 
@@ -1,7 +1,28 @@
-from typing import TypeAlias
+import functools
+import re
+from typing import Any, Callable, Sequence, TypedDict
 
-from pydantic import ValidationError
+from pydantic import BaseModel, TypeAdapter, ValidationError
 
+from data_zipcaster.models.splatnet.lean import (
+    AnyGear,
+    AnyPlayer,
+    AnyTeam,
+    AnyVsDetail,
+    LeanBackground,
+    LeanBadge,
+    LeanGear,
+    LeanGearPower,
+    LeanId,
+    LeanNamed,
+    LeanNameplate,
+    LeanPlayer,
+    LeanTeam,
+    LeanVsDetail,
+    LeanVsHistoryDetail,
+    LeanVsRule,
+    LeanWeapon,
+)
 from data_zipcaster.models.splatnet.submodels import (
     AwardRankType,
     Background,
@@ -61,37 +82,335 @@ from data_zipcaster.models.splatnet.submodels import (
     XPower,
 )
 from data_zipcaster.models.splatnet.vs import (
+    METADATA_KEYS,
+    METADATA_MODELS,
     AnarchyMetadata,
     Award,
     ChallengeMetadata,
+    GraphQLResponse,
+    Metadata,
+    MetadataAdapter,
     MetadataHistories,
+    PrivateMetadata,
     TurfMetadata,
     VsDetail,
     VsHistoryDetail,
     XMetadata,
+    metadata_key,
 )
-from data_zipcaster.models.utils import strip_prefix_keys
 
-Metadata: TypeAlias = (
-    AnarchyMetadata | XMetadata | TurfMetadata | ChallengeMetadata
-)
 
+def generate_metadata(input_dict: dict, flag: str | None = None) -> Metadata:
+    """Validates the data of an overview response against the metadata model
+    of its mode. The model is picked up front, from the flag if one is given
+    or else from the top-level key of the overview, so the overview is only
+    validated once.
+
+    Args:
+        input_dict (dict): The data of the overview response.
+        flag (str | None): The flag of the mode the overview lists. Defaults
+            to None, which picks the mode from the top-level key.
+
+    Raises:
+        ValueError: If there is no metadata model for the flag.
+        ValidationError: If the overview does not match the model of its
+            mode, or if it has none of the known top-level keys when no flag
+            is given.
+
+    Returns:
+        Metadata: The metadata.
+    """
+    if flag is None:
+        return MetadataAdapter.validate_python(input_dict)
+    if flag not in METADATA_MODELS:
+        raise ValueError(f"There is no metadata for {flag!r}.")
+    return METADATA_MODELS[flag].model_validate(input_dict)  # type: ignore
+
+
+def generate_vs_detail(input_dict: dict, strict: bool = False) -> AnyVsDetail:
+    """Validates the data of a detailed response.
+
+    By default only the fields the transforms read are validated, into the
+    lean ``LeanVsDetail`` projection. In strict mode the whole response is
+    validated against the full ``VsDetail`` model instead, which catches
+    changes to parts of the schema that are otherwise ignored.
+
+    Args:
+        input_dict (dict): The data of the detailed response.
+        strict (bool): Whether to validate against the full model. Defaults
+            to False.
+
+    Returns:
+        AnyVsDetail: The validated detail, a ``VsDetail`` in strict mode and a
+            ``LeanVsDetail`` otherwise.
+    """
+    if strict:
+        return VsDetail.model_validate(input_dict)
+    return LeanVsDetail.model_validate(input_dict)
+
+
+# Matches the start of a body that is still inside the ``data`` wrapper of a
+# GraphQL response. The data itself never has a ``data`` key at the top.
+DATA_WRAPPER = re.compile(rb"\s*\{\s*\"data\"\s*:")
+
+
+def is_wrapped(raw: bytes) -> bool:
+    """Checks if a raw body is still inside the ``data`` wrapper of a GraphQL
+    response, without parsing it.
+
+    Args:
+        raw (bytes): The body of the response.
+
+    Returns:
+        bool: True if the body is wrapped.
+    """
+    return DATA_WRAPPER.match(raw) is not None
+
+
+@functools.lru_cache(maxsize=None)
+def json_adapter(model: Any, wrapped: bool) -> TypeAdapter:
+    """Gets the adapter that validates JSON into a model, either bare or
+    inside the ``data`` wrapper.
+
+    Args:
+        model (Any): The model, or any type pydantic can validate.
+        wrapped (bool): Whether the JSON is inside the ``data`` wrapper.
+
+    Returns:
+        TypeAdapter: The adapter.
+    """
+    return TypeAdapter(GraphQLResponse[model] if wrapped else model)
+
+
+def validate_json(model: Any, raw: bytes) -> Any:
+    """Validates a raw body straight into a model with pydantic-core's JSON
+    parser, so no Python dicts are built for it along the way.
+
+    Args:
+        model (Any): The model, or any type pydantic can validate.
+        raw (bytes): The body, either as SplatNet 3 sent it or as saved
+            without the ``data`` wrapper.
+
+    Returns:
+        Any: The validated data, without the wrapper.
+    """
+    wrapped = is_wrapped(raw)
+    validated = json_adapter(model, wrapped).validate_json(raw)
+    if wrapped:
+        return validated.data
+    return validated
+
+
+def generate_metadata_json(raw: bytes, flag: str | None = None) -> Metadata:
+    """Like ``generate_metadata``, but validates the raw body of an overview
+    response as it was received or saved.
+
+    Args:
+        raw (bytes): The body of the overview response, with or without the
+            ``data`` wrapper.
+        flag (str | None): The flag of the mode the overview lists. Defaults
+            to None, which picks the mode from the top-level key.
+
+    Raises:
+        ValueError: If there is no metadata model for the flag.
+        ValidationError: If the overview does not match the model of its
+            mode.
+
+    Returns:
+        Metadata: The metadata.
+    """
+    if flag is None:
+        return validate_json(Metadata, raw)
+    if flag not in METADATA_MODELS:
+        raise ValueError(f"There is no metadata for {flag!r}.")
+    return validate_json(METADATA_MODELS[flag], raw)
 
-def generate_metadata(input_dict: dict) -> Metadata:
-    # Iterate through each Metadata type and try to generate it
-    input_dict = strip_prefix_keys(input_dict)
-    for metadata_type in (
-        AnarchyMetadata,
-        XMetadata,
-        TurfMetadata,
-        ChallengeMetadata,
-    ):
+
+def generate_vs_detail_json(raw: bytes, strict: bool = False) -> AnyVsDetail:
+    """Like ``generate_vs_detail``, but validates the raw body of a detailed
+    response as it was received or saved.
+
+    Args:
+        raw (bytes): The body of the detailed response, with or without the
+            ``data`` wrapper.
+        strict (bool): Whether to validate against the full model. Defaults
+            to False.
+
+    Returns:
+        AnyVsDetail: The validated detail, a ``VsDetail`` in strict mode and a
+            ``LeanVsDetail`` otherwise.
+    """
+    model: type[BaseModel] = VsDetail if strict else LeanVsDetail
+    return validate_json(model, raw)
+
+
+class DetailBatch(TypedDict):
+    """The result of validating many detailed responses at once.
+
+    Fields:
+        - details (list[AnyVsDetail | None]): The validated details, in the
+            same order as the responses. Responses that failed to validate
+            are None.
+        - errors (dict[int, ValidationError]): The error of each response
+            that failed to validate, keyed by its position.
+    """
+
+    details: list[AnyVsDetail | None]
+    errors: dict[int, ValidationError]
+
+
+# How many details are validated in each call. Measured on 500 synthetic
+# Anarchy and Turf War battles, one pass over the whole list was never faster
+# than chunks of 16, and from JSON it was 30 to 50% slower than one call per
+# battle, since pydantic-core parses the whole input before validating any of
+# it. Chunks of 16 validated dicts 15 to 33% faster than one call per battle,
+# and JSON bodies about as fast.
+BATCH_SIZE = 16
+
+
+def validate_chunk(
+    items: Sequence[Any],
+    validate_all: Callable[[Sequence[Any]], list[Any]],
+    validate_one: Callable[[Any], Any],
+) -> DetailBatch:
+    """Validates a chunk of items in a single call, without letting the items
+    that fail stop the others.
+
+    Only if the call fails are the failing items picked out from the errors
+    and validated on their own to get their errors, and the rest validated
+    again in one call.
+
+    Args:
+        items (Sequence[Any]): The items to validate.
+        validate_all (Callable[[Sequence[Any]], list[Any]]): Validates a
+            list of items in one call.
+        validate_one (Callable[[Any], Any]): Validates a single item.
+
+    Returns:
+        DetailBatch: The validated items and the errors of those that failed.
+    """
+    try:
+        return DetailBatch(details=validate_all(items), errors={})
+    except ValidationError as e:
+        locations = [error["loc"] for error in e.errors()]
+
+    if all(len(loc) > 0 and isinstance(loc[0], int) for loc in locations):
+        suspects = {int(loc[0]) for loc in locations}
+    else:
+        # The list as a whole was invalid, such as JSON that does not parse,
+        # so any item could be at fault.
+        suspects = set(range(len(items)))
+
+    errors: dict[int, ValidationError] = {}
+    for idx in suspects:
         try:
-            return metadata_type(**input_dict)  # type: ignore
-        except ValidationError:
-            pass
-    raise ValueError(f"Could not generate metadata, input_dict: {input_dict}")
+            validate_one(items[idx])
+        except ValidationError as e:
+            errors[idx] = e
+
+    valid = [idx for idx in range(len(items)) if idx not in errors]
+    details: list[AnyVsDetail | None] = [None] * len(items)
+    if len(valid) > 0:
+        validated = validate_all([items[idx] for idx in valid])
+        for idx, detail in zip(valid, validated):
+            details[idx] = detail
+    return DetailBatch(details=details, errors=errors)
+
+
+def validate_batch(
+    items: Sequence[Any],
+    validate_all: Callable[[Sequence[Any]], list[Any]],
+    validate_one: Callable[[Any], Any],
+) -> DetailBatch:
+    """Validates many items, ``BATCH_SIZE`` at a time, without letting the
+    items that fail stop the others.
+
+    Args:
+        items (Sequence[Any]): The items to validate.
+        validate_all (Callable[[Sequence[Any]], list[Any]]): Validates a
+            list of items in one call.
+        validate_one (Callable[[Any], Any]): Validates a single item.
+
+    Returns:
+        DetailBatch: The validated items, in the order they were given, and
+            the errors of those that failed.
+    """
+    out = DetailBatch(details=[], errors={})
+    for start in range(0, len(items), BATCH_SIZE):
+        chunk = validate_chunk(
+            items[start : start + BATCH_SIZE], validate_all, validate_one
+        )
+        out["details"].extend(chunk["details"])
+        for idx, error in chunk["errors"].items():
+            out["errors"][start + idx] = error
+    return out
+
+
+def generate_vs_details(
+    items: Sequence[dict], strict: bool = False
+) -> DetailBatch:
+    """Validates the data of many detailed responses, such as every battle of
+    a mode, with one ``list`` validation per chunk instead of one call per
+    battle.
+
+    Args:
+        items (Sequence[dict]): The data of the detailed responses.
+        strict (bool): Whether to validate against the full model. Defaults
+            to False.
+
+    Returns:
+        DetailBatch: The validated details and the errors of the responses
+            that failed to validate.
+    """
+    model: type[BaseModel] = VsDetail if strict else LeanVsDetail
+    adapter = json_adapter(list[model], False)  # type: ignore
+    return validate_batch(items, adapter.validate_python, model.model_validate)
+
+
+def generate_vs_details_json(
+    bodies: Sequence[bytes], strict: bool = False
+) -> DetailBatch:
+    """Like ``generate_vs_details``, but validates the raw bodies of the
+    detailed responses straight from JSON. Each chunk of bodies is joined
+    into a JSON array and validated in a single call, with the bodies inside
+    the ``data`` wrapper and those without it kept apart.
+
+    Args:
+        bodies (Sequence[bytes]): The bodies of the detailed responses, with
+            or without the ``data`` wrapper.
+        strict (bool): Whether to validate against the full model. Defaults
+            to False.
+
+    Returns:
+        DetailBatch: The validated details and the errors of the responses
+            that failed to validate.
+    """
+    model: type[BaseModel] = VsDetail if strict else LeanVsDetail
+    out = DetailBatch(details=[None] * len(bodies), errors={})
+    for wrapped in (True, False):
+        positions = [
+            idx
+            for idx, body in enumerate(bodies)
+            if is_wrapped(body) is wrapped
+        ]
+        if len(positions) == 0:
+            continue
+        item = GraphQLResponse[model] if wrapped else model  # type: ignore
+        adapter = json_adapter(list[item], False)  # type: ignore
 
+        def validate_all(batch: Sequence[bytes]) -> list[Any]:
+            validated = adapter.validate_json(b"[" + b",".join(batch) + b"]")
+            if wrapped:
+                return [response.data for response in validated]
+            return validated
 
-def generate_vs_detail(input_dict: dict) -> VsDetail:
-    return VsDetail(**strip_prefix_keys(input_dict))
+        batch = validate_batch(
+            [bodies[idx] for idx in positions],
+            validate_all,
+            lambda body: validate_json(model, body),
+        )
+        for idx, detail in zip(positions, batch["details"]):
+            out["details"][idx] = detail
+        for idx, error in batch["errors"].items():
+            out["errors"][positions[idx]] = error
+    return out
@@ -0,0 +1,179 @@
+from typing import Optional, TypeAlias
+
+from pydantic import BaseModel
+
+from data_zipcaster.models.splatnet.submodels import (
+    BankaraMatch,
+    Color,
+    CrownType,
+    Gear,
+    KnockoutType,
+    LeagueMatch,
+    Player,
+    PlayerResult,
+    ResultType,
+    RuleType,
+    SpeciesType,
+    SplatfestMatch,
+    Team,
+    TeamResult,
+    TricolorRoleType,
+    Url,
+    XMatch,
+)
+from data_zipcaster.models.splatnet.vs import Award, VsDetail
+
+__all__ = [
+    "LeanBadge",
+    "LeanBackground",
+    "LeanNameplate",
+    "LeanNamed",
+    "LeanWeapon",
+    "LeanGearPower",
+    "LeanGear",
+    "LeanPlayer",
+    "LeanTeam",
+    "LeanId",
+    "LeanVsRule",
+    "LeanVsHistoryDetail",
+    "LeanVsDetail",
+    "AnyGear",
+    "AnyPlayer",
+    "AnyTeam",
+    "AnyVsDetail",
+]
+
+# Projections of the full SplatNet models that only hold the fields the
+# transforms read. Keys a model does not declare are skipped by pydantic-core
+# without being validated or built into objects, so the images, masks, brand
+# details and so on of every player are never touched. The full models are
+# still used when validating strictly.
+
+
+class LeanBadge(BaseModel):
+    id: str
+
+
+class LeanBackground(BaseModel):
+    textColor: Color
+    id: str
+
+
+class LeanNameplate(BaseModel):
+    badges: list[LeanBadge | None]
+    background: LeanBackground
+
+
+class LeanNamed(BaseModel):
+    name: str
+
+
+class LeanWeapon(BaseModel):
+    name: str
+    id: str
+    specialWeapon: LeanNamed
+    subWeapon: LeanNamed
+
+
+class LeanGearPower(BaseModel):
+    image: Url
+
+
+class LeanGear(BaseModel):
+    name: str
+    primaryGearPower: LeanGearPower
+    additionalGearPowers: list[LeanGearPower]
+    brand: LeanNamed
+
+
+class LeanPlayer(BaseModel):
+    byname: str
+    name: str
+    nameId: str
+    nameplate: LeanNameplate
+    id: str
+    headGear: LeanGear
+    clothingGear: LeanGear
+    shoesGear: LeanGear
+    paint: int
+    isMyself: bool
+    weapon: LeanWeapon
+    species: SpeciesType
+    result: Optional[PlayerResult] = None
+    crown: bool
+    festDragonCert: Optional[CrownType] = None
+
+
+class LeanTeam(BaseModel):
+    color: Color
+    result: Optional[TeamResult] = None
+    tricolorRole: Optional[TricolorRoleType] = None
+    festTeamName: Optional[str] = None
+    festUniformBonusRate: Optional[float] = None
+    judgement: Optional[ResultType] = None
+    players: list[LeanPlayer]
+    order: int
+    festUniformName: Optional[str] = None
+
+
+class LeanId(BaseModel):
+    id: str
+
+
+class LeanVsRule(BaseModel):
+    rule: Optional[RuleType] = None
+
+
+class LeanVsHistoryDetail(BaseModel):
+    """The projection of ``VsHistoryDetail`` the transforms read.
+
+    Fields:
+        - id (str) - The match's id. Base64 encoded.
+        - vsRule (LeanVsRule) - The rule of the match.
+        - vsMode (LeanId) - The ID of the mode of the match.
+        - judgement (ResultType) - The result of the match.
+        - myTeam (LeanTeam) - The player's team.
+        - vsStage (LeanId) - The ID of the stage of the match.
+        - festMatch (Optional[SplatfestMatch]) - The splatfest match data.
+        - knockout (Optional[KnockoutType]) - The knockout type of the match.
+        - otherTeams (list[LeanTeam]) - The other teams in the match.
+        - bankaraMatch (Optional[BankaraMatch]) - The Anarchy match data.
+        - leagueMatch (Optional[LeagueMatch]) - The Challenge match data.
+        - xMatch (Optional[XMatch]) - The Xbattle match data.
+        - duration (int) - The duration of the match in seconds.
+        - playedTime (str) - The time the match was played.
+        - awards (list[Award]) - The awards the player got.
+    """
+
+    id: str
+    vsRule: LeanVsRule
+    vsMode: LeanId
+    judgement: ResultType
+    myTeam: LeanTeam
+    vsStage: LeanId
+    festMatch: Optional[SplatfestMatch] = None
+    knockout: Optional[KnockoutType] = None
+    otherTeams: list[LeanTeam]
+    bankaraMatch: Optional[BankaraMatch] = None
+    leagueMatch: Optional[LeagueMatch] = None
+    xMatch: Optional[XMatch] = None
+    duration: int
+    playedTime: str
+    awards: list[Award]
+
+
+class LeanVsDetail(BaseModel):
+    """The projection of ``VsDetail`` the transforms read.
+
+    Fields:
+        - vsHistoryDetail (LeanVsHistoryDetail) - The history detail.
+    """
+
+    vsHistoryDetail: LeanVsHistoryDetail
+
+
+# The transforms take either the full models or their projections.
+AnyGear: TypeAlias = Gear | LeanGear
+AnyPlayer: TypeAlias = Player | LeanPlayer
+AnyTeam: TypeAlias = Team | LeanTeam
+AnyVsDetail: TypeAlias = VsDetail | LeanVsDetail
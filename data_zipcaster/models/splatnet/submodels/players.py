@@ -1,6 +1,6 @@
 from typing import Optional
 
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict, Field
 
 from data_zipcaster.models.splatnet.submodels.common import Color, Url
 from data_zipcaster.models.splatnet.submodels.typing import (
@@ -98,9 +98,13 @@ class Brand(BaseModel):
 
 
 class Gear(BaseModel):
+    # SplatNet 3 sends "__isGear", which is kept as the alias so raw payloads
+    # validate as they are.
+    model_config = ConfigDict(populate_by_name=True)
+
     name: str
     thumbnailImage: Optional[Url] = None
-    isGear: str
+    isGear: str = Field(alias="__isGear")
     primaryGearPower: GearPower
     additionalGearPowers: list[GearPower]
     originalImage: Url
@@ -116,7 +120,9 @@ class PlayerResult(BaseModel):
 
 
 class PlayerRoot(BaseModel):
-    isPlayer: str
+    model_config = ConfigDict(populate_by_name=True)
+
+    isPlayer: str = Field(alias="__isPlayer")
     byname: str
     name: str
     nameId: str
@@ -1,6 +1,13 @@
-from typing import Optional
-
-from pydantic import BaseModel
+from typing import Annotated, Any, Generic, Optional, TypeAlias, TypeVar, Union
+
+from pydantic import (
+    BaseModel,
+    ConfigDict,
+    Discriminator,
+    Field,
+    Tag,
+    TypeAdapter,
+)
 
 from data_zipcaster.models.splatnet.submodels import (
     AwardRankType,
@@ -30,8 +37,17 @@ __all__ = [
     "XMetadata",
     "TurfMetadata",
     "ChallengeMetadata",
+    "PrivateMetadata",
+    "METADATA_KEYS",
+    "METADATA_MODELS",
+    "Metadata",
+    "MetadataAdapter",
+    "metadata_key",
+    "GraphQLResponse",
 ]
 
+ModelT = TypeVar("ModelT")
+
 
 class Award(BaseModel):
     """This is the award model.
@@ -49,7 +65,7 @@ class VsHistoryDetail(BaseModel):
     """This is the actual history detail model.
 
     Fields:
-        - typename (str) - Not sure what this is.
+        - typename (str) - Not sure what this is. Sent as "__typename".
         - id (str) - The match's id. Base64 encoded.
         - vsRule (VsRule) - The rule of the match.
         - vsMode (VsMode) - The mode of the match.
@@ -73,7 +89,9 @@ class VsHistoryDetail(BaseModel):
             match's ID. Base64 encoded.
     """
 
-    typename: str
+    model_config = ConfigDict(populate_by_name=True)
+
+    typename: str = Field(alias="__typename")
     id: str
     vsRule: VsRule
     vsMode: VsMode
@@ -159,3 +177,76 @@ class ChallengeMetadata(BaseModel):
     """
 
     eventBattleHistories: MetadataHistories
+
+
+class PrivateMetadata(BaseModel):
+    """This is the private battle metadata model.
+
+    Fields:
+        - privateBattleHistories (MetadataHistories) - The private battle
+            histories.
+    """
+
+    privateBattleHistories: MetadataHistories
+
+
+# The top-level key of each overview, by the flag of the mode it lists.
+METADATA_KEYS = {
+    "anarchy": "bankaraBattleHistories",
+    "xbattle": "xBattleHistories",
+    "turf": "regularBattleHistories",
+    "challenge": "eventBattleHistories",
+    "private": "privateBattleHistories",
+}
+
+
+def metadata_key(value: Any) -> str | None:
+    """Finds the top-level key that tells which mode an overview lists.
+
+    Args:
+        value (Any): The overview, either as a dict or as a metadata model.
+
+    Returns:
+        str | None: The key, or None if the overview does not have any of the
+            known keys.
+    """
+    for key in METADATA_KEYS.values():
+        if isinstance(value, dict):
+            if key in value:
+                return key
+        elif hasattr(value, key):
+            return key
+    return None
+
+
+# The metadata model of each mode, by its flag.
+METADATA_MODELS: dict[str, type[BaseModel]] = {
+    "anarchy": AnarchyMetadata,
+    "xbattle": XMetadata,
+    "turf": TurfMetadata,
+    "challenge": ChallengeMetadata,
+    "private": PrivateMetadata,
+}
+Metadata: TypeAlias = Annotated[
+    Union[
+        Annotated[AnarchyMetadata, Tag("bankaraBattleHistories")],
+        Annotated[XMetadata, Tag("xBattleHistories")],
+        Annotated[TurfMetadata, Tag("regularBattleHistories")],
+        Annotated[ChallengeMetadata, Tag("eventBattleHistories")],
+        Annotated[PrivateMetadata, Tag("privateBattleHistories")],
+    ],
+    Discriminator(metadata_key),
+]
+# Picks the metadata model from the top-level key and validates against only
+# that model, in a single pass.
+MetadataAdapter: TypeAdapter[Metadata] = TypeAdapter(Metadata)
+
+
+class GraphQLResponse(BaseModel, Generic[ModelT]):
+    """The ``data`` wrapper of a GraphQL response, as SplatNet 3 sends it.
+
+    Fields:
+        - data (ModelT) - The data of the response.
+    """
+
+    data: ModelT
@@ -0,0 +1,34 @@
+from data_zipcaster.raw.archive import (
+    ArchiveRunWriter,
+    BattleRecord,
+    Manifest,
+    RawArchive,
+    RecordLocation,
+    content_hash,
+    read_record,
+    read_record_bytes,
+)
+from data_zipcaster.raw.consolidate import (
+    consolidate_dumps,
+    reconcile_overviews,
+    snapshot_sort_key,
+)
+from data_zipcaster.raw.stream import (
+    DETAILED_FILENAME,
+    DETAILED_STREAM_FILENAME,
+    OVERVIEW_FILENAME,
+    JsonArrayReader,
+    LazyData,
+    RawDumpWriter,
+    encode_json,
+    is_dump,
+    iter_dump_detail_records,
+    iter_dump_details,
+    iter_json_array,
+    iter_json_line_bytes,
+    iter_json_lines,
+    load_dump_overview,
+    read_dump_overview,
+    resolve_data,
+    unwrap_data,
+)
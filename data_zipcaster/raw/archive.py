@@ -0,0 +1,586 @@
+import gzip
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+from typing import Iterator, TypedDict
+
+from data_zipcaster.raw.stream import (
+    LazyData,
+    encode_json,
+    resolve_data,
+    unwrap_data,
+)
+from data_zipcaster.utils import base64_decode
+
+INDEX_FILENAME = "index.sqlite3"
+SEGMENTS_DIRNAME = "segments"
+SEGMENT_PREFIX = "segment-"
+SEGMENT_SUFFIX = ".gz"
+# Segments are rotated once they grow past this size, in bytes.
+SEGMENT_SIZE = 64 * 1024 * 1024
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS objects (
+    content_hash TEXT PRIMARY KEY,
+    segment TEXT NOT NULL,
+    offset INTEGER NOT NULL,
+    length INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS details (
+    battle_id TEXT NOT NULL,
+    content_hash TEXT NOT NULL,
+    mode TEXT NOT NULL,
+    played_time TEXT,
+    PRIMARY KEY (battle_id, content_hash)
+);
+CREATE INDEX IF NOT EXISTS details_played_time ON details (played_time);
+CREATE INDEX IF NOT EXISTS details_mode ON details (mode, played_time);
+CREATE TABLE IF NOT EXISTS runs (
+    run TEXT NOT NULL,
+    mode TEXT NOT NULL,
+    overview_hash TEXT NOT NULL,
+    PRIMARY KEY (run, mode)
+);
+CREATE TABLE IF NOT EXISTS run_details (
+    run TEXT NOT NULL,
+    mode TEXT NOT NULL,
+    battle_id TEXT NOT NULL,
+    content_hash TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    PRIMARY KEY (run, mode, battle_id)
+);
+CREATE INDEX IF NOT EXISTS run_details_battle ON run_details (battle_id, run);
+"""
+
+
+class Manifest(TypedDict):
+    """The record of a single run of a single mode.
+
+    Fields:
+        - run (str): The time string of the run.
+        - mode (str): The flag of the mode.
+        - overview (str): The content hash of the overview response.
+        - details (list[tuple[str, str]]): The decoded battle ID and content
+            hash of each detailed response, in the order they arrived.
+    """
+
+    run: str
+    mode: str
+    overview: str
+    details: list[tuple[str, str]]
+
+
+class RecordLocation(TypedDict):
+    """Where a stored response is within the segment files.
+
+    Fields:
+        - segment (str): The file name of the segment.
+        - offset (int): The byte offset of the record within the segment.
+        - length (int): The length of the compressed record, in bytes.
+    """
+
+    segment: str
+    offset: int
+    length: int
+
+
+class BattleRecord(TypedDict):
+    """A detailed response as listed in the index.
+
+    Fields:
+        - battle_id (str): The decoded battle ID.
+        - mode (str): The flag of the mode the battle was fetched for.
+        - played_time (str | None): The ``playedTime`` of the battle.
+        - content_hash (str): The content hash of the detailed response.
+        - location (RecordLocation): Where the detailed response is stored.
+    """
+
+    battle_id: str
+    mode: str
+    played_time: str | None
+    content_hash: str
+    location: RecordLocation
+
+
+def content_hash(payload: bytes) -> str:
+    """Hashes a stored response so that identical responses get the same hash.
+    Responses for the same data are not always identical, since SplatNet 3
+    signs image URLs with query strings that change between fetches, so
+    ``RawArchive.put_detail`` also deduplicates detailed responses by battle.
+
+    Args:
+        payload (bytes): The stored bytes of the response.
+
+    Returns:
+        str: The SHA-256 hex digest of the bytes.
+    """
+    return hashlib.sha256(payload).hexdigest()
+
+
+def detail_key(detail: dict) -> tuple[str, str | None]:
+    """Gets the decoded battle ID and played time of a detailed response.
+
+    Args:
+        detail (dict): The data of the detailed response.
+
+    Returns:
+        tuple[str, str | None]: The decoded battle ID and the ``playedTime``.
+    """
+    vs_detail = detail["vsHistoryDetail"]
+    return base64_decode(vs_detail["id"]), vs_detail.get("playedTime", None)
+
+
+def segment_name(number: int) -> str:
+    """Gets the file name of a segment.
+
+    Args:
+        number (int): The number of the segment.
+
+    Returns:
+        str: The file name of the segment.
+    """
+    return f"{SEGMENT_PREFIX}{number:06d}{SEGMENT_SUFFIX}"
+
+
+def read_record_bytes(root: str, location: RecordLocation) -> bytes:
+    """Reads a single stored response, decompressing only that record but
+    without decoding it. This does not need the index, so it can be called
+    from a worker process.
+
+    Args:
+        root (str): The path to the archive directory.
+        location (RecordLocation): Where the response is stored.
+
+    Returns:
+        bytes: The response as stored, which may still be inside the ``data``
+            wrapper.
+    """
+    path = os.path.join(root, SEGMENTS_DIRNAME, location["segment"])
+    with open(path, "rb") as f:
+        f.seek(location["offset"])
+        compressed = f.read(location["length"])
+    return gzip.decompress(compressed)
+
+
+def read_record(root: str, location: RecordLocation) -> dict:
+    """Reads and decodes a single stored response. See
+    ``read_record_bytes``.
+
+    Args:
+        root (str): The path to the archive directory.
+        location (RecordLocation): Where the response is stored.
+
+    Returns:
+        dict: The data of the response.
+    """
+    return unwrap_data(json.loads(read_record_bytes(root, location)))
+
+
+class RawArchive:
+    def __init__(self, root: str) -> None:
+        """A deduplicated archive of raw responses.
+
+        Every response is stored once, no matter how many runs fetched it, as
+        its own gzip member appended to a segment file. SplatNet 3 returns the
+        same recent battles on every run, so most runs only add a manifest to
+        the index listing the responses they saw. The detailed response of a
+        battle is stored the first time the battle is seen, and reused by
+        every later run that sees it.
+
+        The index maps the hash of every response to its segment, offset and
+        length, and every decoded battle ID to its responses along with its
+        mode and the time it was played. A single battle can therefore be read
+        by seeking to its record and decompressing only that, without touching
+        the rest of the archive. The archive may be written to from several
+        threads, and by several processes at once: each ``RawArchive`` appends
+        to segments that it created itself, so the offsets it indexes can not
+        be moved by another writer.
+
+        Args:
+            root (str): The path to the archive directory. It will be created
+                if it does not exist.
+        """
+        self.root = root
+        self.segments_path = os.path.join(root, SEGMENTS_DIRNAME)
+        os.makedirs(self.segments_path, exist_ok=True)
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(
+            os.path.join(root, INDEX_FILENAME), check_same_thread=False
+        )
+        with self.lock, self.connection:
+            self.connection.executescript(SCHEMA)
+        self.segment: str | None = None
+
+    def latest_segment_number(self) -> int:
+        """Gets the number of the highest numbered segment.
+
+        Returns:
+            int: The number of the highest numbered segment, or 0 if there are
+                no segments yet.
+        """
+        numbers = [
+            int(filename[len(SEGMENT_PREFIX) : -len(SEGMENT_SUFFIX)])
+            for filename in os.listdir(self.segments_path)
+            if filename.startswith(SEGMENT_PREFIX)
+            and filename.endswith(SEGMENT_SUFFIX)
+        ]
+        return max(numbers, default=0)
+
+    def claim_segment(self) -> str:
+        """Creates a new, empty segment that only this archive appends to.
+        The file is created exclusively, so two writers can never claim the
+        same segment.
+
+        Returns:
+            str: The file name of the segment.
+        """
+        number = self.latest_segment_number() + 1
+        while True:
+            segment = segment_name(number)
+            try:
+                with open(os.path.join(self.segments_path, segment), "xb"):
+                    pass
+            except FileExistsError:
+                number += 1
+                continue
+            return segment
+
+    def locate(self, digest: str) -> RecordLocation | None:
+        """Gets where a response is stored.
+
+        Args:
+            digest (str): The content hash of the response.
+
+        Returns:
+            RecordLocation | None: The location of the response, or None if it
+                is not stored.
+        """
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT segment, offset, length FROM objects "
+                "WHERE content_hash = ?",
+                (digest,),
+            ).fetchone()
+        if row is None:
+            return None
+        return RecordLocation(segment=row[0], offset=row[1], length=row[2])
+
+    def is_stored(self, digest: str) -> bool:
+        """Checks if a response is stored. The lock must already be held.
+
+        Args:
+            digest (str): The content hash of the response.
+
+        Returns:
+            bool: True if the response is stored.
+        """
+        row = self.connection.execute(
+            "SELECT 1 FROM objects WHERE content_hash = ?", (digest,)
+        ).fetchone()
+        return row is not None
+
+    def put(self, data: LazyData, raw: bytes | None = None) -> str:
+        """Stores a response, unless an identical one is already stored.
+
+        Args:
+            data (LazyData): The data of the response. Only read if the body
+                is not given.
+            raw (bytes | None): The body of the response as SplatNet 3 sent
+                it. If given, it is stored as is instead of encoding the data
+                again. Defaults to None.
+
+        Returns:
+            str: The content hash of the response.
+        """
+        payload = raw if raw is not None else encode_json(resolve_data(data))
+        digest = content_hash(payload)
+        if self.locate(digest) is not None:
+            return digest
+        compressed = gzip.compress(payload)
+        with self.lock:
+            # Another thread may have stored the same response since.
+            if self.is_stored(digest):
+                return digest
+            if self.segment is None or (
+                os.path.getsize(os.path.join(self.segments_path, self.segment))
+                >= SEGMENT_SIZE
+            ):
+                self.segment = self.claim_segment()
+            segment = self.segment
+            path = os.path.join(self.segments_path, segment)
+            with open(path, "ab") as f:
+                offset = f.tell()
+                f.write(compressed)
+            # The record is only indexed once it has been written, so a crash
+            # can at worst leave unreferenced bytes at the end of a segment.
+            with self.connection:
+                self.connection.execute(
+                    "INSERT OR IGNORE INTO objects VALUES (?, ?, ?, ?)",
+                    (digest, segment, offset, len(compressed)),
+                )
+        return digest
+
+    def get(self, digest: str) -> dict:
+        """Loads a stored response.
+
+        Args:
+            digest (str): The content hash of the response.
+
+        Raises:
+            KeyError: If the response is not stored.
+
+        Returns:
+            dict: The data of the response.
+        """
+        location = self.locate(digest)
+        if location is None:
+            raise KeyError(digest)
+        return read_record(self.root, location)
+
+    def put_detail(
+        self,
+        detail: LazyData,
+        mode: str,
+        raw: bytes | None = None,
+        key: tuple[str, str | None] | None = None,
+    ) -> tuple[str, str]:
+        """Stores a detailed response and indexes it, unless a detailed
+        response of the same battle is already stored, in which case that one
+        is reused.
+
+        Args:
+            detail (LazyData): The data of the detailed response. Only read if
+                the body or the key is not given.
+            mode (str): The flag of the mode the battle was fetched for.
+            raw (bytes | None): The body of the detailed response as SplatNet
+                3 sent it. Defaults to None.
+            key (tuple[str, str | None] | None): The decoded battle ID and
+                played time, if they are already known, such as from the
+                overview. Defaults to None, which reads them from the data.
+
+        Returns:
+            tuple[str, str]: The decoded battle ID and the content hash of the
+                stored response.
+        """
+        if key is None:
+            key = detail_key(resolve_data(detail))
+        battle_id, played_time = key
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT content_hash FROM details WHERE battle_id = ? LIMIT 1",
+                (battle_id,),
+            ).fetchone()
+        if row is not None:
+            return battle_id, row[0]
+        digest = self.put(detail, raw)
+        with self.lock, self.connection:
+            self.connection.execute(
+                "INSERT OR IGNORE INTO details VALUES (?, ?, ?, ?)",
+                (battle_id, digest, mode, played_time),
+            )
+        return battle_id, digest
+
+    def find(self, battle_id: str) -> list[BattleRecord]:
+        """Looks up the detailed responses of a battle in the index.
+
+        Args:
+            battle_id (str): The decoded battle ID.
+
+        Returns:
+            list[BattleRecord]: Every stored detailed response of the battle.
+                This is empty if the battle is not in the archive.
+        """
+        with self.lock:
+            rows = self.connection.execute(
+                "SELECT d.battle_id, d.mode, d.played_time, d.content_hash, "
+                "o.segment, o.offset, o.length "
+                "FROM details d JOIN objects o USING (content_hash) "
+                "WHERE d.battle_id = ?",
+                (battle_id,),
+            ).fetchall()
+        return [
+            BattleRecord(
+                battle_id=row[0],
+                mode=row[1],
+                played_time=row[2],
+                content_hash=row[3],
+                location=RecordLocation(
+                    segment=row[4], offset=row[5], length=row[6]
+                ),
+            )
+            for row in rows
+        ]
+
+    def write_manifest(self, manifest: Manifest) -> None:
+        """Records the manifest of a run in the index.
+
+        Args:
+            manifest (Manifest): The manifest.
+        """
+        run, mode = manifest["run"], manifest["mode"]
+        with self.lock, self.connection:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO runs VALUES (?, ?, ?)",
+                (run, mode, manifest["overview"]),
+            )
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO run_details VALUES (?, ?, ?, ?, ?)",
+                [
+                    (run, mode, battle_id, digest, position)
+                    for position, (battle_id, digest) in enumerate(
+                        manifest["details"]
+                    )
+                ],
+            )
+
+    def iter_manifests(self) -> Iterator[Manifest]:
+        """Iterates over the manifests of every run, oldest run first.
+
+        Yields:
+            Manifest: Each manifest.
+        """
+        with self.lock:
+            runs = self.connection.execute(
+                "SELECT run, mode, overview_hash FROM runs ORDER BY run, mode"
+            ).fetchall()
+        for run, mode, overview in runs:
+            with self.lock:
+                details = self.connection.execute(
+                    "SELECT battle_id, content_hash FROM run_details "
+                    "WHERE run = ? AND mode = ? ORDER BY position",
+                    (run, mode),
+                ).fetchall()
+            yield Manifest(
+                run=run,
+                mode=mode,
+                overview=overview,
+                details=[(row[0], row[1]) for row in details],
+            )
+
+    def latest_runs(
+        self, battle_ids: list[str] | None = None
+    ) -> list[tuple[str, str, str, str]]:
+        """Gets the latest run that saw each battle.
+
+        Args:
+            battle_ids (list[str] | None): The decoded IDs of the battles to
+                look up. If None, every battle in the archive is looked up.
+                Defaults to None.
+
+        Returns:
+            list[tuple[str, str, str, str]]: The run, mode, overview hash and
+                detail hash of each battle that was found, oldest run first.
+        """
+        query = (
+            "SELECT rd.run, rd.mode, r.overview_hash, rd.content_hash "
+            "FROM run_details rd JOIN runs r USING (run, mode) "
+            "WHERE rd.run = ("
+            "SELECT MAX(run) FROM run_details WHERE battle_id = rd.battle_id"
+            ")"
+        )
+        params: list[str] = []
+        if battle_ids is not None:
+            placeholders = ", ".join("?" * len(battle_ids))
+            query += f" AND rd.battle_id IN ({placeholders})"
+            params = battle_ids
+        query += " ORDER BY rd.run, rd.mode, rd.position"
+        with self.lock:
+            return self.connection.execute(query, params).fetchall()
+
+    def battle_ids(self) -> set[str]:
+        """Gets the decoded IDs of every battle in the archive.
+
+        Returns:
+            set[str]: The decoded battle IDs.
+        """
+        with self.lock:
+            rows = self.connection.execute(
+                "SELECT DISTINCT battle_id FROM details"
+            ).fetchall()
+        return {row[0] for row in rows}
+
+    def close(self) -> None:
+        """Closes the index."""
+        with self.lock:
+            self.connection.close()
+
+
+class ArchiveRunWriter:
+    def __init__(self, archive: RawArchive, run: str, mode: str) -> None:
+        """Writes the responses of one run of one mode to an archive.
+
+        Has the same interface as ``RawDumpWriter``. Responses are stored as
+        soon as they arrive, and the manifest is written when the writer is
+        closed. Nothing is recorded for a run without any new battles.
+
+        Args:
+            archive (RawArchive): The archive to write to.
+            run (str): The time string of the run.
+            mode (str): The flag of the mode.
+        """
+        self.archive = archive
+        self.path = archive.root
+        self.run = run
+        self.mode = mode
+        self.overview: tuple[LazyData, bytes | None] | None = None
+        self.details: list[tuple[str, str]] = []
+
+    @property
+    def count(self) -> int:
+        return len(self.details)
+
+    def write_overview(
+        self, overview: LazyData, raw: bytes | None = None
+    ) -> None:
+        """Holds on to the overview, to be stored once a detailed response
+        arrives.
+
+        Args:
+            overview (LazyData): The data of the overview response. Only read
+                if the body is not given.
+            raw (bytes | None): The body of the overview response as SplatNet
+                3 sent it. Defaults to None.
+        """
+        self.overview = (overview, raw)
+
+    def write_detail(
+        self,
+        detail: LazyData,
+        raw: bytes | None = None,
+        key: tuple[str, str | None] | None = None,
+    ) -> None:
+        """Stores a detailed response.
+
+        Args:
+            detail (LazyData): The data of the detailed response. Only read if
+                the body or the key is not given.
+            raw (bytes | None): The body of the detailed response as SplatNet
+                3 sent it. Defaults to None.
+            key (tuple[str, str | None] | None): The decoded battle ID and
+                played time, if they are already known. Defaults to None.
+        """
+        self.details.append(
+            self.archive.put_detail(detail, self.mode, raw, key)
+        )
+
+    def close(self) -> None:
+        """Stores the overview and writes the manifest of the run."""
+        if self.overview is None or self.count == 0:
+            return
+        self.archive.write_manifest(
+            Manifest(
+                run=self.run,
+                mode=self.mode,
+                overview=self.archive.put(*self.overview),
+                details=self.details,
+            )
+        )
+        self.overview = None
+
+    def __enter__(self) -> "ArchiveRunWriter":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
@@ -0,0 +1,329 @@
+import heapq
+import json
+import os
+import tempfile
+from typing import Iterable, Iterator
+
+from data_zipcaster.raw.stream import (
+    RawDumpWriter,
+    iter_dump_details,
+    iter_json_lines,
+    load_dump_overview,
+)
+
+SERIES_KEYS = ("bankaraMatchChallenge", "xMatchMeasurement")
+SERIES_RESULT_KEYS = ("udemaeAfter", "xPowerAfter")
+
+
+def detail_sort_key(detail: dict) -> tuple[str, str]:
+    """Gets the key detailed responses are merged by.
+
+    Args:
+        detail (dict): The data of the detailed response.
+
+    Returns:
+        tuple[str, str]: The ``playedTime`` and the encoded battle ID.
+    """
+    vs_detail = detail["vsHistoryDetail"]
+    return vs_detail.get("playedTime", None) or "", vs_detail["id"]
+
+
+def histories_key(overview: dict) -> str:
+    """Gets the key of the battle histories in an overview response, such as
+    ``bankaraBattleHistories``.
+
+    Args:
+        overview (dict): The data of the overview response.
+
+    Raises:
+        ValueError: If the overview does not hold any battle histories.
+
+    Returns:
+        str: The key of the battle histories.
+    """
+    for key in overview:
+        if key.endswith("BattleHistories"):
+            return key
+    raise ValueError("The overview does not hold any battle histories.")
+
+
+def group_battle_ids(group: dict) -> list[str]:
+    """Gets the encoded IDs of the battles in an overview group.
+
+    Args:
+        group (dict): The history group.
+
+    Returns:
+        list[str]: The battle IDs, newest first.
+    """
+    return [node["id"] for node in group["historyDetails"]["nodes"]]
+
+
+def merge_nodes(nodes: list[dict], other: list[dict]) -> None:
+    """Merges the battle nodes of another copy of a group into a group, in
+    place, keeping them newest first.
+
+    Each battle that is missing from the group is inserted right after the
+    battle that comes before it in the other copy, or at the start if no
+    battle does.
+
+    Args:
+        nodes (list[dict]): The battle nodes of the group, newest first.
+        other (list[dict]): The battle nodes of the other copy, newest first.
+    """
+    positions = {node["id"]: idx for idx, node in enumerate(nodes)}
+    anchor = -1
+    for node in other:
+        if node["id"] in positions:
+            anchor = positions[node["id"]]
+            continue
+        anchor += 1
+        nodes.insert(anchor, node)
+        positions = {node["id"]: idx for idx, node in enumerate(nodes)}
+
+
+def series_state(group: dict) -> dict | None:
+    """Gets the state of the series an overview group belongs to.
+
+    Args:
+        group (dict): The history group.
+
+    Returns:
+        dict | None: The ``bankaraMatchChallenge`` or ``xMatchMeasurement`` of
+            the group, or None if the group is not a series.
+    """
+    for key in SERIES_KEYS:
+        if group.get(key, None) is not None:
+            return group[key]
+    return None
+
+
+def group_completeness(group: dict, snapshot: int) -> tuple[bool, int, int]:
+    """Scores how complete the state of a series is in an overview group.
+
+    A series only gets its ``udemaeAfter`` or ``xPowerAfter`` once it is over,
+    so a group that has it beats one that does not. After that, the group with
+    the most battles wins, and then the one from the latest snapshot.
+
+    Args:
+        group (dict): The history group of the series.
+        snapshot (int): The position of the snapshot the group is from, with
+            later snapshots having higher positions.
+
+    Returns:
+        tuple[bool, int, int]: The score, where higher is more complete.
+    """
+    state = series_state(group) or {}
+    is_over = any(
+        state.get(key, None) is not None for key in SERIES_RESULT_KEYS
+    )
+    return is_over, len(group["historyDetails"]["nodes"]), snapshot
+
+
+class SeriesGroup:
+    def __init__(self, group: dict, snapshot: int) -> None:
+        """The reconciled copies of one overview group, across every snapshot
+        that holds it.
+
+        Copies of a series are reconciled by keeping the most complete one,
+        since the counts in a series only add up over the battles of that
+        copy. The battles of a group that is not a series, such as open
+        Anarchy battles, are independent of each other, so their copies are
+        merged instead.
+
+        Args:
+            group (dict): The first copy of the group.
+            snapshot (int): The position of the snapshot the copy is from.
+        """
+        self.group = group
+        self.score = group_completeness(group, snapshot)
+
+    def add(self, group: dict, snapshot: int) -> None:
+        """Reconciles another copy of the group.
+
+        Args:
+            group (dict): The copy of the group.
+            snapshot (int): The position of the snapshot the copy is from.
+        """
+        score = group_completeness(group, snapshot)
+        if series_state(self.group) is None and series_state(group) is None:
+            merge_nodes(
+                self.group["historyDetails"]["nodes"],
+                group["historyDetails"]["nodes"],
+            )
+            self.score = max(self.score, score)
+        elif score > self.score:
+            self.group, self.score = group, score
+
+
+def reconcile_overviews(overviews: Iterable[tuple[int, dict]]) -> dict:
+    """Reconciles the overview responses of many snapshots of one mode into a
+    single overview.
+
+    Groups that share a battle are copies of the same group. Each group is
+    kept once, reconciled across its copies, in the order that the newest
+    snapshot lists them. Everything besides the history groups is taken from
+    the newest snapshot.
+
+    Args:
+        overviews (Iterable[tuple[int, dict]]): The position of each snapshot
+            and its overview, newest snapshot first.
+
+    Returns:
+        dict: The reconciled overview.
+    """
+    groups: list[SeriesGroup | None] = []
+    owners: dict[str, int] = {}
+    newest: dict | None = None
+    for snapshot, overview in overviews:
+        if newest is None:
+            newest = overview
+        key = histories_key(overview)
+        for group in overview[key]["historyGroups"]["nodes"]:
+            battle_ids = group_battle_ids(group)
+            hits = sorted({owners[i] for i in battle_ids if i in owners})
+            if len(hits) == 0:
+                idx = len(groups)
+                groups.append(SeriesGroup(group, snapshot))
+            else:
+                idx = hits[0]
+                series_group = groups[idx]
+                assert series_group is not None
+                series_group.add(group, snapshot)
+                # A group can bridge two groups that looked separate, in
+                # which case they are folded into the one listed first. The
+                # bridging group is added before them, since it is the one
+                # that knows where their battles go.
+                for other_idx in hits[1:]:
+                    other = groups[other_idx]
+                    assert other is not None
+                    series_group.add(other.group, other.score[2])
+                    for battle_id in group_battle_ids(other.group):
+                        owners[battle_id] = idx
+                    groups[other_idx] = None
+            for battle_id in battle_ids:
+                owners[battle_id] = idx
+
+    if newest is None:
+        raise ValueError("No overviews to reconcile.")
+    key = histories_key(newest)
+    out = {**newest, key: {**newest[key]}}
+    out[key]["historyGroups"] = {
+        **newest[key]["historyGroups"],
+        "nodes": [group.group for group in groups if group is not None],
+    }
+    return out
+
+
+def write_sorted_run(details: Iterable[dict], path: str) -> None:
+    """Sorts the detailed responses of one snapshot by played time and writes
+    them to a temporary file as JSON Lines.
+
+    Args:
+        details (Iterable[dict]): The detailed responses of the snapshot.
+        path (str): The path of the file to write.
+    """
+    with open(path, "w") as f:
+        for detail in sorted(details, key=detail_sort_key):
+            f.write(json.dumps(detail) + "\n")
+
+
+def iter_sorted_run(
+    path: str, snapshot: int
+) -> Iterator[tuple[str, str, int, dict]]:
+    """Iterates over a sorted temporary file, with the key to merge by.
+
+    Args:
+        path (str): The path to the file.
+        snapshot (int): The position of the snapshot the file is from.
+
+    Yields:
+        tuple[str, str, int, dict]: The played time, battle ID and negated
+            snapshot position of each detailed response, and its data.
+    """
+    for detail in iter_json_lines(path):
+        yield (*detail_sort_key(detail), -snapshot, detail)
+
+
+def merge_details(dumps: list[str], tmp_path: str) -> Iterator[dict]:
+    """Merges the detailed responses of many snapshots by played time, keeping
+    one copy of each battle.
+
+    Each snapshot is sorted on its own and spilled to a temporary file, and
+    the sorted files are then merged lazily, so only one snapshot is held in
+    memory at a time. When a battle is in several snapshots, the copy from the
+    latest snapshot is kept.
+
+    Args:
+        dumps (list[str]): The paths to the dump directories of the snapshots,
+            oldest first.
+        tmp_path (str): The path to a directory for the temporary files.
+
+    Yields:
+        dict: The data of each detailed response, oldest battle first.
+    """
+    runs: list[Iterator[tuple[str, str, int, dict]]] = []
+    for snapshot, dump_path in enumerate(dumps):
+        run_path = os.path.join(tmp_path, f"{snapshot}.jsonl")
+        write_sorted_run(iter_dump_details(dump_path), run_path)
+        runs.append(iter_sorted_run(run_path, snapshot))
+
+    last_id: str | None = None
+    for _, battle_id, _, detail in heapq.merge(
+        *runs, key=lambda item: item[:3]
+    ):
+        # Copies of a battle have the same key, so they come out together,
+        # latest snapshot first.
+        if battle_id == last_id:
+            continue
+        last_id = battle_id
+        yield detail
+
+
+def snapshot_sort_key(dump_path: str) -> tuple[str, str]:
+    """Gets the key that orders the dumps of one mode from oldest to newest.
+
+    Dumps live in a directory named after the time of the import, so that is
+    compared first, before the full path.
+
+    Args:
+        dump_path (str): The path to the dump directory.
+
+    Returns:
+        tuple[str, str]: The sort key.
+    """
+    run = os.path.basename(os.path.dirname(os.path.abspath(dump_path)))
+    return run, dump_path
+
+
+def consolidate_dumps(dumps: list[str], out_path: str) -> int:
+    """Consolidates many overlapping snapshots of one mode into a single dump.
+
+    The detailed responses are merged by played time with one copy of each
+    battle, and the overviews are reconciled so that every series keeps its
+    most complete state, such as its rank or X Power after the series, which
+    earlier snapshots taken while the series was still going do not have.
+    The result is written as a regular dump that can be replayed.
+
+    Args:
+        dumps (list[str]): The paths to the dump directories. They must all be
+            for the same mode.
+        out_path (str): The path to the dump directory to write.
+
+    Returns:
+        int: The number of battles written.
+    """
+    dumps = sorted(dumps, key=snapshot_sort_key)
+
+    def iter_overviews() -> Iterator[tuple[int, dict]]:
+        for snapshot in reversed(range(len(dumps))):
+            yield snapshot, load_dump_overview(dumps[snapshot])
+
+    overview = reconcile_overviews(iter_overviews())
+    with tempfile.TemporaryDirectory() as tmp_path, RawDumpWriter(
+        out_path
+    ) as writer:
+        writer.write_overview(overview)
+        for detail in merge_details(dumps, tmp_path):
+            writer.write_detail(detail)
+        return writer.count
@@ -0,0 +1,411 @@
+import gzip
+import json
+import os
+import re
+import zlib
+from typing import IO, Any, Callable, Iterator, TypeAlias
+
+OVERVIEW_FILENAME = "overview.json"
+DETAILED_FILENAME = "detailed.json"
+DETAILED_STREAM_FILENAME = "detailed.jsonl.gz"
+# The number of characters read at a time when streaming a JSON array.
+CHUNK_SIZE = 64 * 1024
+WHITESPACE = re.compile(r"\s*")
+NUMBER_CHARS = "0123456789+-.eE"
+# The data of a response, or a function that decodes it when it is needed.
+LazyData: TypeAlias = dict | Callable[[], dict]
+
+
+class RawDumpWriter:
+    def __init__(self, path: str) -> None:
+        """Writes the raw responses of one mode to a dump directory as they
+        arrive.
+
+        The overview is written to ``overview.json``, and every detailed
+        response is appended to ``detailed.jsonl.gz`` as one line of JSON,
+        flushed to disk straight away. Only one response is held in memory at
+        a time, and if the import stops part way through, every response
+        written so far can still be read back with ``iter_json_lines``.
+
+        When the body of a response is given as SplatNet 3 sent it, it is
+        written as is, ``data`` wrapper and all, rather than encoding the data
+        again. ``unwrap_data`` removes the wrapper when reading it back.
+
+        Nothing is written until the first detailed response arrives, so a
+        mode without any new battles does not leave an empty dump behind.
+
+        Args:
+            path (str): The path to the dump directory. It will be created if
+                it does not exist.
+        """
+        self.path = path
+        self.overview: bytes | None = None
+        self.count = 0
+        self.file: IO[bytes] | None = None
+
+    def write_overview(
+        self, overview: LazyData, raw: bytes | None = None
+    ) -> None:
+        """Holds on to the overview, to be written with the first detailed
+        response.
+
+        Args:
+            overview (LazyData): The data of the overview response. Only read
+                if the body is not given.
+            raw (bytes | None): The body of the overview response as SplatNet
+                3 sent it. Defaults to None.
+        """
+        if raw is None:
+            raw = encode_json(resolve_data(overview))
+        self.overview = raw
+
+    def open(self) -> IO[bytes]:
+        """Creates the dump directory, writes the overview and opens the
+        detailed stream.
+
+        Returns:
+            IO[bytes]: The detailed stream.
+        """
+        os.makedirs(self.path, exist_ok=True)
+        if self.overview is not None:
+            overview_path = os.path.join(self.path, OVERVIEW_FILENAME)
+            with open(overview_path, "wb") as f:
+                f.write(self.overview)
+        detailed_path = os.path.join(self.path, DETAILED_STREAM_FILENAME)
+        return gzip.open(detailed_path, "ab")
+
+    def write_detail(
+        self,
+        detail: LazyData,
+        raw: bytes | None = None,
+        key: tuple[str, str | None] | None = None,
+    ) -> None:
+        """Appends a detailed response to the stream and flushes it to disk.
+
+        Args:
+            detail (LazyData): The data of the detailed response. Only read if
+                the body is not given or can not be written as is.
+            raw (bytes | None): The body of the detailed response as SplatNet
+                3 sent it. Defaults to None.
+            key (tuple[str, str | None] | None): The decoded battle ID and
+                played time. Unused, it is only taken to share the interface
+                of ``ArchiveRunWriter``. Defaults to None.
+        """
+        line = raw.strip() if raw is not None else b""
+        if line == b"" or b"\n" in line:
+            # A body that spans several lines can not be one JSON Lines record.
+            line = encode_json(resolve_data(detail))
+        if self.file is None:
+            self.file = self.open()
+        self.file.write(line + b"\n")
+        # A sync flush ends the compressed block, so everything written so far
+        # can be decompressed even if the stream is never closed.
+        self.file.flush()
+        self.count += 1
+
+    def close(self) -> None:
+        """Closes the detailed stream, if it was opened."""
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def __enter__(self) -> "RawDumpWriter":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+
+def encode_json(data: dict) -> bytes:
+    """Encodes data as compact JSON on a single line.
+
+    Args:
+        data (dict): The data to encode.
+
+    Returns:
+        bytes: The encoded data.
+    """
+    return json.dumps(data, separators=(",", ":")).encode("utf-8")
+
+
+def resolve_data(data: LazyData) -> dict:
+    """Gets the data of a response, decoding it if it was passed lazily.
+
+    Args:
+        data (LazyData): The data, or a function that decodes it.
+
+    Returns:
+        dict: The data.
+    """
+    if callable(data):
+        return data()
+    return data
+
+
+def unwrap_data(record: dict) -> dict:
+    """Removes the ``data`` wrapper of a GraphQL response, if there is one.
+
+    Responses saved straight from SplatNet 3 keep the wrapper, while older
+    saves only hold the data itself.
+
+    Args:
+        record (dict): The saved response.
+
+    Returns:
+        dict: The data of the response.
+    """
+    if len(record) == 1 and "data" in record:
+        return record["data"]
+    return record
+
+
+def iter_json_line_bytes(path: str) -> Iterator[bytes]:
+    """Iterates over the records of a JSON Lines file, gzipped or not, without
+    decoding them.
+
+    The file may have been cut short by an import that did not finish, in
+    which case every complete record is yielded and the rest is ignored.
+
+    Args:
+        path (str): The path to the file. Files ending in ``.gz`` are read as
+            gzip.
+
+    Yields:
+        bytes: Each complete record in the file, as encoded in the file.
+    """
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rb") as f:
+        try:
+            for line in f:
+                if not line.endswith(b"\n"):
+                    # The last record was only partly written.
+                    return
+                yield line
+        except (EOFError, zlib.error, gzip.BadGzipFile):
+            # The compressed stream ends without its trailer.
+            return
+
+
+def iter_json_lines(path: str) -> Iterator[dict]:
+    """Iterates over the records of a JSON Lines file, gzipped or not.
+
+    Args:
+        path (str): The path to the file. See ``iter_json_line_bytes``.
+
+    Yields:
+        dict: Each complete record in the file.
+    """
+    for line in iter_json_line_bytes(path):
+        yield json.loads(line)
+
+
+class JsonArrayReader:
+    def __init__(self, file: IO[str], chunk_size: int = CHUNK_SIZE) -> None:
+        """Reads the items of a JSON array one at a time.
+
+        The file is read in chunks, and each item is decoded with
+        ``JSONDecoder.raw_decode`` as soon as it is complete, so only one item
+        and one chunk are held in memory at a time, however large the array
+        is.
+
+        Args:
+            file (IO[str]): The file to read, positioned at the start of the
+                array.
+            chunk_size (int): The number of characters to read at a time.
+                Defaults to ``CHUNK_SIZE``.
+        """
+        self.file = file
+        self.chunk_size = chunk_size
+        self.decoder = json.JSONDecoder()
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+
+    def read_more(self) -> bool:
+        """Reads the next chunk, dropping everything already decoded.
+
+        Returns:
+            bool: False if the end of the file was reached.
+        """
+        if self.eof:
+            return False
+        chunk = self.file.read(self.chunk_size)
+        if chunk == "":
+            self.eof = True
+            return False
+        self.buffer = self.buffer[self.pos :] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        """Skips whitespace and gets the next character without consuming it.
+
+        Returns:
+            str: The next character, or an empty string at the end of the
+                file.
+        """
+        while True:
+            match = WHITESPACE.match(self.buffer, self.pos)
+            assert match is not None
+            self.pos = match.end()
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self.read_more():
+                return ""
+
+    def expect(self, chars: str) -> str:
+        """Consumes the next character, which must be one of the given ones.
+
+        Args:
+            chars (str): The characters that are allowed.
+
+        Raises:
+            ValueError: If the next character is not one of them.
+
+        Returns:
+            str: The character.
+        """
+        char = self.peek()
+        if char == "" or char not in chars:
+            raise ValueError(
+                f"Expected one of {chars!r} in the JSON array, got {char!r}."
+            )
+        self.pos += 1
+        return char
+
+    def decode_item(self) -> Any:
+        """Decodes the next item, reading more chunks until it is complete.
+
+        Returns:
+            Any: The item.
+        """
+        self.peek()
+        while True:
+            try:
+                item, end = self.decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                if self.read_more():
+                    continue
+                raise
+            # A number that runs up to the end of the buffer, or stops at a
+            # character that could continue it, may not be complete yet.
+            if (
+                end == len(self.buffer) or self.buffer[end] in NUMBER_CHARS
+            ) and self.read_more():
+                continue
+            self.pos = end
+            return item
+
+    def __iter__(self) -> Iterator[Any]:
+        self.expect("[")
+        if self.peek() == "]":
+            self.pos += 1
+            return
+        while True:
+            yield self.decode_item()
+            if self.expect(",]") == "]":
+                return
+
+
+def iter_json_array(path: str) -> Iterator[Any]:
+    """Iterates over the items of a JSON array file, gzipped or not, without
+    loading the whole array into memory.
+
+    Args:
+        path (str): The path to the file. Files ending in ``.gz`` are read as
+            gzip.
+
+    Raises:
+        ValueError: If the file does not hold a valid JSON array.
+
+    Yields:
+        Any: Each item in the array.
+    """
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt", encoding="utf-8") as f:
+        yield from JsonArrayReader(f)
+
+
+def read_dump_overview(path: str) -> bytes:
+    """Reads the overview response saved in a dump directory, without
+    decoding it.
+
+    Args:
+        path (str): The path to the dump directory.
+
+    Returns:
+        bytes: The overview response as saved, which may still be inside the
+            ``data`` wrapper.
+    """
+    with open(os.path.join(path, OVERVIEW_FILENAME), "rb") as f:
+        return f.read()
+
+
+def load_dump_overview(path: str) -> dict:
+    """Loads the overview response saved in a dump directory.
+
+    Args:
+        path (str): The path to the dump directory.
+
+    Returns:
+        dict: The data of the overview response.
+    """
+    with open(os.path.join(path, OVERVIEW_FILENAME), "rb") as f:
+        return unwrap_data(json.load(f))
+
+
+def iter_dump_details(path: str) -> Iterator[dict]:
+    """Iterates over the detailed responses saved in a dump directory, in
+    either the streamed or the older single file format.
+
+    Args:
+        path (str): The path to the dump directory.
+
+    Yields:
+        dict: The data of each detailed response.
+    """
+    stream_path = os.path.join(path, DETAILED_STREAM_FILENAME)
+    if os.path.exists(stream_path):
+        records = iter_json_lines(stream_path)
+    else:
+        records = iter_json_array(os.path.join(path, DETAILED_FILENAME))
+    for record in records:
+        yield unwrap_data(record)
+
+
+def iter_dump_detail_records(path: str) -> Iterator[bytes | dict]:
+    """Iterates over the detailed responses saved in a dump directory, kept
+    encoded where the format allows it.
+
+    Responses in the streamed format are yielded as the bytes of their line,
+    which may still be inside the ``data`` wrapper, so they can be validated
+    straight from JSON. The older single file format has to be decoded to be
+    split up, so its responses are yielded as the decoded data.
+
+    Args:
+        path (str): The path to the dump directory.
+
+    Yields:
+        bytes | dict: Each detailed response.
+    """
+    stream_path = os.path.join(path, DETAILED_STREAM_FILENAME)
+    if os.path.exists(stream_path):
+        yield from iter_json_line_bytes(stream_path)
+        return
+    for record in iter_json_array(os.path.join(path, DETAILED_FILENAME)):
+        yield unwrap_data(record)
+
+
+def is_dump(path: str) -> bool:
+    """Checks if a directory is a dump directory.
+
+    Args:
+        path (str): The path to the directory.
+
+    Returns:
+        bool: True if the directory holds an overview and detailed responses.
+    """
+    return os.path.exists(os.path.join(path, OVERVIEW_FILENAME)) and (
+        os.path.exists(os.path.join(path, DETAILED_STREAM_FILENAME))
+        or os.path.exists(os.path.join(path, DETAILED_FILENAME))
+    )
@@ -147,16 +147,16 @@ def convert_duration(duration: int) -> dt.timedelta:
 
 
 def get_teams_data(
-    vs_detail: splatnet.VsDetail,
-) -> list[splatnet.Team]:
+    vs_detail: splatnet.AnyVsDetail,
+) -> list[splatnet.AnyTeam]:
     """Gets the teams data from the vs detail. This is a helper method that
     gets the teams data from the vs detail to reduce code duplication.
 
     Args:
-        vs_detail (splatnet.VsDetail): The full vs detail model.
+        vs_detail (splatnet.AnyVsDetail): The vs detail model, full or lean.
 
     Returns:
-        list[splatnet.Team]: The teams data from the vs detail.
+        list[splatnet.AnyTeam]: The teams data from the vs detail.
     """
     return [
         vs_detail.vsHistoryDetail.myTeam,
@@ -191,12 +191,12 @@ def convert_tricolor_role(
     return remap[role]
 
 
-def convert_team_data(vs_detail: splatnet.VsDetail) -> list[main.Team]:
+def convert_team_data(vs_detail: splatnet.AnyVsDetail) -> list[main.Team]:
     """Extracts the team data from the vs detail and converts it to a list of
     the main team model.
 
     Args:
-        vs_detail (splatnet.VsDetail): The full vs detail model.
+        vs_detail (splatnet.AnyVsDetail): The vs detail model, full or lean.
 
     Returns:
         list[main.Team]: The team data from the vs detail.
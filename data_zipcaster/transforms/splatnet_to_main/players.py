@@ -6,7 +6,7 @@ from data_zipcaster.models import main, splatnet
 from data_zipcaster.utils import base64_decode, color_from_percent_to_str
 
 
-def convert_weapon_id(player: splatnet.Player) -> int:
+def convert_weapon_id(player: splatnet.AnyPlayer) -> int:
     """Given a player, extracts and converts the weapon ID.
 
     This function extracts the weapon ID from the player's weapon ID, which is
@@ -15,7 +15,7 @@ def convert_weapon_id(player: splatnet.Player) -> int:
     returned.
 
     Args:
-        player (splatnet.Player): The player whose weapon ID to convert.
+        player (splatnet.AnyPlayer): The player whose weapon ID to convert.
 
     Returns:
         int: The weapon ID.
@@ -24,7 +24,7 @@ def convert_weapon_id(player: splatnet.Player) -> int:
     return int(weapon_id)
 
 
-def convert_gear_stats(gear: splatnet.Gear) -> main.GearItem:
+def convert_gear_stats(gear: splatnet.AnyGear) -> main.GearItem:
     """Converts a ``Gear`` object to a ``GearItem`` object.
 
     This function converts a ``Gear`` object from the SplatNet 3 API to a
@@ -32,7 +32,7 @@ def convert_gear_stats(gear: splatnet.Gear) -> main.GearItem:
     importers convert to and exporters convert from.
 
     Args:
-        gear (splatnet.Gear): The ``Gear`` object to convert.
+        gear (splatnet.AnyGear): The ``Gear`` object to convert.
 
     Returns:
         main.GearItem: The converted ``GearItem`` object.
@@ -59,11 +59,11 @@ def convert_gear_stats(gear: splatnet.Gear) -> main.GearItem:
     )
 
 
-def convert_gear(player: splatnet.Player) -> main.Gear:
+def convert_gear(player: splatnet.AnyPlayer) -> main.Gear:
     """Converts all of a player's gear to a ``Gear`` object.
 
     Args:
-        player (splatnet.Player): The player whose gear to convert.
+        player (splatnet.AnyPlayer): The player whose gear to convert.
 
     Returns:
         main.Gear: The converted ``Gear`` object.
@@ -98,11 +98,11 @@ def convert_species(species: splatnet.SpeciesType) -> main.SpeciesType:
     return species_remap[species]
 
 
-def convert_nameplate(player: splatnet.Player) -> main.Nameplate:
+def convert_nameplate(player: splatnet.AnyPlayer) -> main.Nameplate:
     """Converts a player's nameplate to a ``Nameplate`` object.
 
     Args:
-        player (splatnet.Player): The player whose nameplate to convert.
+        player (splatnet.AnyPlayer): The player whose nameplate to convert.
 
     Returns:
         main.Nameplate: The converted ``Nameplate`` object.
@@ -145,7 +145,7 @@ def convert_crown_type(crown_type: splatnet.CrownType) -> main.CrownType | None:
 
 
 def convert_player(
-    player: splatnet.Player, scoreboard_position: int
+    player: splatnet.AnyPlayer, scoreboard_position: int
 ) -> main.Player:
     """Converts a player to a ``Player`` object.
 
@@ -154,7 +154,7 @@ def convert_player(
     importers convert to and exporters convert from.
 
     Args:
-        player (splatnet.Player): The ``Player`` object to convert.
+        player (splatnet.AnyPlayer): The ``Player`` object to convert.
         scoreboard_position (int): The position of the player on the scoreboard.
 
     Returns:
@@ -18,7 +18,7 @@ from data_zipcaster.utils import base64_decode
 SeriesMetadata: TypeAlias = main.XMetadata | main.AnarchyMetadata
 
 
-def convert_vs_data(vs_detail: splatnet.VsDetail) -> main.VsExtract:
+def convert_vs_data(vs_detail: splatnet.AnyVsDetail) -> main.VsExtract:
     """Converts a ``VsDetail`` object to a ``VsExtract`` object.
 
     This function converts a ``VsDetail`` object from the SplatNet 3 API to a
@@ -26,7 +26,7 @@ def convert_vs_data(vs_detail: splatnet.VsDetail) -> main.VsExtract:
     that importers convert to and exporters convert from.
 
     Args:
-        vs_detail (splatnet.VsDetail): The ``VsDetail`` object to convert.
+        vs_detail (splatnet.AnyVsDetail): The ``VsDetail`` object to convert.
 
     Returns:
         main.VsExtract: The converted ``VsExtract`` object.
@@ -52,15 +52,18 @@ def convert_vs_data(vs_detail: splatnet.VsDetail) -> main.VsExtract:
 
     if mode == "bankara_open":
         assert vs_detail.vsHistoryDetail.bankaraMatch is not None
-        out.match_power = vs_detail.vsHistoryDetail.bankaraMatch.bankaraPower
+        bankara_power = vs_detail.vsHistoryDetail.bankaraMatch.bankaraPower
+        if bankara_power is not None:
+            out.match_power = bankara_power.power
     elif mode == "league":
         assert vs_detail.vsHistoryDetail.leagueMatch is not None
         out.match_power = vs_detail.vsHistoryDetail.leagueMatch.myLeaguePower
         out.challenge_id = base64_decode(
             vs_detail.vsHistoryDetail.leagueMatch.leagueMatchEvent.id
         )
-    elif mode == "splatfest_challenge":
+    elif mode in ("splatfest_open", "splatfest_challenge"):
         assert vs_detail.vsHistoryDetail.festMatch is not None
+        out.match_power = vs_detail.vsHistoryDetail.festMatch.myFestPower
         out.splatfest_metadata = main.SplatfestMetadata(
             match_multiplier=convert_match_multiplier(
                 vs_detail.vsHistoryDetail.festMatch.dragonMatchType
@@ -0,0 +1,67 @@
+import click
+import pytest
+
+from data_zipcaster.cli import throttle
+from data_zipcaster.cli.exporters.splashcat.plugin import SplashcatExporter
+
+
+class FakeResponse:
+    def __init__(self, status_code: int, body: dict | None = None) -> None:
+        self.status_code = status_code
+        self.body = body or {}
+        self.text = str(self.body)
+
+    def json(self) -> dict:
+        return self.body
+
+
+class FakeSession:
+    def __init__(self, responses: list[FakeResponse]) -> None:
+        self.responses = responses
+        self.calls = 0
+
+    def get(self, url: str, headers: dict) -> FakeResponse:
+        self.calls += 1
+        return self.responses.pop(0)
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(
+        throttle, "backoff_delays", lambda retries: iter([0.0] * retries)
+    )
+
+
+def make_exporter(host: str, responses: list[FakeResponse]):
+    exporter = SplashcatExporter()
+    # Each host gets its own limiter, so tests do not share circuit breakers.
+    exporter.api_url = f"http://{host}.invalid"
+    exporter.rate_limit = 0
+    exporter.session = FakeSession(responses)  # type: ignore
+    return exporter
+
+
+def test_existing_ids_retries_server_errors(cli_context):
+    exporter = make_exporter(
+        "retry",
+        [
+            FakeResponse(503),
+            FakeResponse(502),
+            FakeResponse(200, {"battle_ids": ["a", "b"]}),
+        ],
+    )
+    assert exporter.get_existing_battle_ids() == ["a", "b"]
+    assert exporter.session.calls == 3  # type: ignore
+
+
+def test_existing_ids_gives_up_without_aborting(cli_context):
+    exporter = make_exporter("down", [FakeResponse(503) for _ in range(5)])
+    assert exporter.get_existing_battle_ids() == []
+    assert exporter.session.calls == 5  # type: ignore
+
+
+def test_existing_ids_rejects_other_errors(cli_context):
+    exporter = make_exporter("unauthorized", [FakeResponse(401)])
+    with pytest.raises(click.ClickException):
+        exporter.get_existing_battle_ids()
+    assert exporter.session.calls == 1  # type: ignore
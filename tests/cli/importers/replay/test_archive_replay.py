@@ -0,0 +1,110 @@
+import copy
+
+import click
+import pytest
+
+from data_zipcaster.bench.synthetic import BattleFactory
+from data_zipcaster.cli.importers.replay import dumps
+from data_zipcaster.cli.importers.replay.plugin import ReplayImporter
+from data_zipcaster.raw import ArchiveRunWriter, RawArchive
+from data_zipcaster.utils import base64_decode
+
+OLD_RUN = "2023-06-01 12:00:00"
+NEW_RUN = "2023-06-02 12:00:00"
+
+
+@pytest.fixture
+def archive_path(tmp_path) -> tuple[str, list[str]]:
+    """An archive of two runs of the same X Battle series. Only the newer run
+    was taken once the series was over, so only it knows the X Power after
+    it."""
+    factory = BattleFactory("xbattle", seed=3)
+    groups = list(factory.groups(12))
+    for group in groups:
+        group["group"]["xMatchMeasurement"]["xPowerAfter"] = 2500.0
+    old_groups = copy.deepcopy(groups)
+    for group in old_groups:
+        group["group"]["xMatchMeasurement"]["xPowerAfter"] = None
+
+    root = str(tmp_path / "archive")
+    archive = RawArchive(root)
+    for run, run_groups in ((OLD_RUN, old_groups), (NEW_RUN, groups)):
+        with ArchiveRunWriter(archive, run, "xbattle") as writer:
+            writer.write_overview(factory.overview(run_groups))
+            for group in run_groups:
+                for detail in group["details"]:
+                    writer.write_detail(detail)
+    archive.close()
+    battle_ids = [
+        detail["vsHistoryDetail"]["id"]
+        for group in groups
+        for detail in group["details"]
+    ]
+    return root, battle_ids
+
+
+def test_decode_battle_id(archive_path):
+    _, battle_ids = archive_path
+    decoded = base64_decode(battle_ids[0])
+    assert ReplayImporter.decode_battle_id(battle_ids[0]) == decoded
+    assert ReplayImporter.decode_battle_id(decoded) == decoded
+    for invalid in ("not base64!", "QmF0dGxlLTE="):
+        with pytest.raises(click.ClickException):
+            ReplayImporter.decode_battle_id(invalid)
+
+
+def test_find(archive_path):
+    root, battle_ids = archive_path
+    archive = RawArchive(root)
+    decoded = base64_decode(battle_ids[2])
+    records = archive.find(decoded)
+    assert len(records) == 1
+    assert records[0]["battle_id"] == decoded
+    assert records[0]["mode"] == "xbattle"
+    assert archive.find("VsHistoryDetail-missing") == []
+    archive.close()
+
+
+def test_plan_archive_for_one_battle(archive_path):
+    root, battle_ids = archive_path
+    decoded = base64_decode(battle_ids[2])
+    plan = dumps.plan_archive(root, [decoded])
+    assert len(plan) == 1
+    assert plan[0]["run"] == NEW_RUN
+    archive = RawArchive(root)
+    assert plan[0]["details"] == [archive.find(decoded)[0]["location"]]
+    archive.close()
+
+
+def test_plan_archive_for_every_battle(archive_path):
+    root, battle_ids = archive_path
+    plan = dumps.plan_archive(root)
+    assert [run["run"] for run in plan] == [NEW_RUN]
+    assert len(plan[0]["details"]) == len(battle_ids)
+
+
+@pytest.mark.parametrize("decode", [False, True])
+def test_replay_one_battle(cli_context, archive_path, monkeypatch, decode):
+    root, battle_ids = archive_path
+    battle_id = battle_ids[0]
+    if decode:
+        battle_id = base64_decode(battle_id)
+
+    read: list[dict] = []
+    read_record_bytes = dumps.read_record_bytes
+
+    def spy(root: str, location: dict) -> bytes:
+        read.append(location)
+        return read_record_bytes(root, location)
+
+    monkeypatch.setattr(dumps, "read_record_bytes", spy)
+    importer = ReplayImporter()
+    battles = importer.do_run(
+        archive=(root,), battle_id=(battle_id,), workers=1
+    )
+    assert [battle.id for battle in battles] == [base64_decode(battle_ids[0])]
+    # The newest battle of the series gets the X Power after it, which only
+    # the latest run knows.
+    assert battles[0].series_metadata.x_power_after == 2500.0
+    # Only the overview and the battle's own record were read.
+    assert len(read) == 2
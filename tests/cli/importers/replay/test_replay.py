@@ -0,0 +1,72 @@
+import copy
+import os
+
+import pytest
+
+from data_zipcaster.bench.synthetic import BattleFactory
+from data_zipcaster.cli.importers.replay.plugin import ReplayImporter
+from data_zipcaster.raw import RawDumpWriter
+from data_zipcaster.utils import base64_decode
+
+OLD_RUN = "2023-06-01 12:00:00"
+NEW_RUN = "2023-06-02 12:00:00"
+
+
+def write_dump(path: str, overview: dict, details: list[dict]) -> str:
+    with RawDumpWriter(path) as writer:
+        writer.write_overview(overview)
+        for detail in details:
+            writer.write_detail(detail)
+    return path
+
+
+@pytest.fixture
+def snapshots(tmp_path) -> tuple[list[str], str]:
+    """Two dumps of the same X Battle series. Only the newer one was taken
+    once the series was over, so only it knows the X Power after it."""
+    factory = BattleFactory("xbattle", seed=3)
+    group = next(factory.groups(5))
+    details = group["details"]
+    measurement = group["group"]["xMatchMeasurement"]
+    measurement["xPowerAfter"] = 2500.0
+
+    old_group = copy.deepcopy(group)
+    old_group["group"]["xMatchMeasurement"]["xPowerAfter"] = None
+    old = write_dump(
+        os.path.join(tmp_path, OLD_RUN, "xbattle"),
+        factory.overview([old_group]),
+        details,
+    )
+    new = write_dump(
+        os.path.join(tmp_path, NEW_RUN, "xbattle"),
+        factory.overview([group]),
+        details,
+    )
+    newest_id = base64_decode(details[0]["vsHistoryDetail"]["id"])
+    return [old, new], newest_id
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+@pytest.mark.parametrize("reverse", [False, True])
+def test_latest_snapshot_wins(cli_context, snapshots, workers, reverse):
+    dumps, newest_id = snapshots
+    importer = ReplayImporter()
+    importer.workers = workers
+    sources: list = list(reversed(dumps)) if reverse else list(dumps)
+    battles = importer.deduplicate(importer.replay_sources(sources))
+    assert len({battle.id for battle in battles}) == len(battles)
+    newest = next(battle for battle in battles if battle.id == newest_id)
+    assert newest.series_metadata is not None
+    assert newest.series_metadata.x_power_after == 2500.0
+
+
+def test_each_copy_is_replayed(cli_context, snapshots):
+    dumps, newest_id = snapshots
+    importer = ReplayImporter()
+    replayed = importer.replay_sources(list(dumps))
+    powers = {
+        key[0]: battle.series_metadata.x_power_after
+        for key, battle in replayed
+        if battle.id == newest_id
+    }
+    assert powers == {OLD_RUN: None, NEW_RUN: 2500.0}
@@ -0,0 +1,209 @@
+import threading
+import time
+
+import pytest
+from splatnet3_scraper.query import QueryResponse
+
+from data_zipcaster.cli.importers.splatnet.fetch import (
+    DETAIL_VARIABLE,
+    DetailFetcher,
+    HighWaterMark,
+    PendingMark,
+    collect_battle_ids,
+    is_past_mark,
+    iter_overview_nodes,
+    newest_mark,
+    settle_mark,
+)
+
+
+def make_overview(*groups: list[str]) -> QueryResponse:
+    """Builds an overview response whose groups hold the given battle IDs,
+    newest first, one minute apart."""
+    nodes_left = sum(len(group) for group in groups)
+    history_groups = []
+    for group in groups:
+        nodes = []
+        for battle_id in group:
+            nodes_left -= 1
+            nodes.append(
+                {
+                    "id": battle_id,
+                    "playedTime": f"2023-06-01T12:{nodes_left:02d}:00Z",
+                }
+            )
+        history_groups.append({"historyDetails": {"nodes": nodes}})
+    return QueryResponse(
+        data={"battleHistories": {"historyGroups": {"nodes": history_groups}}}
+    )
+
+
+def test_iter_overview_nodes_flattens_groups():
+    overview = make_overview(["a", "b"], ["c"], [])
+    nodes = list(iter_overview_nodes(overview))
+    assert [node["id"] for node in nodes] == ["a", "b", "c"]
+
+
+def test_collect_battle_ids_walks_every_battle():
+    overview = make_overview(["a", "b"], ["c"])
+    assert collect_battle_ids(overview) == ["a", "b", "c"]
+    assert collect_battle_ids(overview, limit=-1) == ["a", "b", "c"]
+
+
+def test_collect_battle_ids_limit_counts_walked_battles():
+    overview = make_overview(["a", "b"], ["c", "d"])
+    assert collect_battle_ids(overview, limit=3) == ["a", "b", "c"]
+    # Known battles still count towards the limit.
+    assert collect_battle_ids(overview, limit=3, existing_ids={"b"}) == [
+        "a",
+        "c",
+    ]
+
+
+def test_collect_battle_ids_skips_existing():
+    overview = make_overview(["a", "b"], ["c"])
+    assert collect_battle_ids(overview, existing_ids=["a", "c"]) == ["b"]
+
+
+def test_collect_battle_ids_empty_overview():
+    assert collect_battle_ids(make_overview()) == []
+
+
+class FakeHandler:
+    """Answers detail queries after a delay that depends on the battle, so
+    that they finish out of order."""
+
+    def __init__(
+        self, delays: dict[str, float], failing: str | None = None
+    ) -> None:
+        self.delays = delays
+        self.failing = failing
+        self.lock = threading.Lock()
+        self.started: list[str] = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    def query(self, query_name: str, variables: dict) -> QueryResponse:
+        battle_id = variables[DETAIL_VARIABLE]
+        with self.lock:
+            self.started.append(battle_id)
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            time.sleep(self.delays.get(battle_id, 0.0))
+            if battle_id == self.failing:
+                raise ValueError(f"Failed to fetch {battle_id}.")
+            return QueryResponse(data={"id": battle_id})
+        finally:
+            with self.lock:
+                self.in_flight -= 1
+
+
+def test_fetch_keeps_order():
+    battle_ids = ["a", "b", "c", "d"]
+    handler = FakeHandler({"a": 0.3, "b": 0.0, "c": 0.2, "d": 0.1})
+    fetcher = DetailFetcher(handler, max_concurrency=4)  # type: ignore
+    arrived: list[int] = []
+    progress: list[tuple[int, int]] = []
+    responses = fetcher.fetch(
+        battle_ids,
+        progress_callback=lambda done, total: progress.append((done, total)),
+        on_response=lambda idx, _: arrived.append(idx),
+    )
+    assert [response.data["id"] for response in responses] == battle_ids
+    # Responses are handed over as they arrive, fastest first.
+    assert arrived == [1, 3, 2, 0]
+    assert progress == [(0, 4), (1, 4), (2, 4), (3, 4), (4, 4)]
+
+
+def test_fetch_bounds_concurrency():
+    battle_ids = [str(idx) for idx in range(12)]
+    handler = FakeHandler({battle_id: 0.01 for battle_id in battle_ids})
+    fetcher = DetailFetcher(handler, max_concurrency=3)  # type: ignore
+    responses = fetcher.fetch(battle_ids)
+    assert [response.data["id"] for response in responses] == battle_ids
+    assert handler.max_in_flight == 3
+
+
+def test_fetch_one_at_a_time():
+    handler = FakeHandler({})
+    fetcher = DetailFetcher(handler, max_concurrency=0)  # type: ignore
+    assert fetcher.max_concurrency == 1
+    responses = fetcher.fetch(["a", "b", "c"])
+    assert [response.data["id"] for response in responses] == ["a", "b", "c"]
+    assert handler.max_in_flight == 1
+
+
+def test_fetch_failure_cancels_pending_queries():
+    battle_ids = [str(idx) for idx in range(20)]
+    delays = {battle_id: 0.02 for battle_id in battle_ids}
+    delays["1"] = 0.0
+    handler = FakeHandler(delays, failing="1")
+    fetcher = DetailFetcher(handler, max_concurrency=2)  # type: ignore
+    arrived: list[int] = []
+    with pytest.raises(ValueError, match="Failed to fetch 1"):
+        fetcher.fetch(
+            battle_ids, on_response=lambda idx, _: arrived.append(idx)
+        )
+    # The queries that had not started yet were cancelled, and the ones in
+    # flight were waited for.
+    assert len(handler.started) < len(battle_ids)
+    assert handler.in_flight == 0
+    assert 1 not in arrived
+
+
+def test_newest_mark():
+    overview = make_overview(["a", "b"], ["c"])
+    assert newest_mark(overview) == HighWaterMark(
+        battle_id="a", played_time="2023-06-01T12:02:00Z"
+    )
+    assert newest_mark(make_overview()) is None
+
+
+def test_is_past_mark():
+    mark = HighWaterMark(battle_id="m", played_time="2023-06-01T12:00:00Z")
+    assert is_past_mark({"id": "m"}, mark)
+    assert is_past_mark({"id": "x", "playedTime": "2023-06-01T12:00:00Z"}, mark)
+    assert is_past_mark({"id": "x", "playedTime": "2023-06-01T11:59:00Z"}, mark)
+    assert not is_past_mark(
+        {"id": "x", "playedTime": "2023-06-01T12:01:00Z"}, mark
+    )
+    # Without played times, only the mark itself is past it.
+    assert not is_past_mark({"id": "x"}, mark)
+    untimed = HighWaterMark(battle_id="m", played_time=None)
+    assert not is_past_mark(
+        {"id": "x", "playedTime": "2023-06-01T11:59:00Z"}, untimed
+    )
+
+
+def test_collect_battle_ids_stops_at_mark():
+    overview = make_overview(["a", "b"], ["c", "d"])
+    mark = HighWaterMark(battle_id="c", played_time=None)
+    assert collect_battle_ids(overview, mark=mark) == ["a", "b"]
+
+
+def test_collect_battle_ids_stops_at_older_battle_than_mark():
+    # The mark itself has rotated out of the overview.
+    overview = make_overview(["a", "b"], ["c", "d"])
+    mark = HighWaterMark(battle_id="gone", played_time="2023-06-01T12:02:30Z")
+    assert collect_battle_ids(overview, mark=mark) == ["a"]
+
+
+def test_settle_mark_without_ledger():
+    mark = HighWaterMark(battle_id="a", played_time=None)
+    pending = PendingMark(mark=mark, battle_ids=["a", "b"])
+    assert settle_mark(pending, None) == mark
+
+
+def test_settle_mark_once_every_battle_is_known():
+    mark = HighWaterMark(battle_id="a", played_time=None)
+    pending = PendingMark(mark=mark, battle_ids=["a", "b"])
+    assert settle_mark(pending, {"a", "b", "z"}) == mark
+    assert settle_mark(PendingMark(mark=mark, battle_ids=[]), set()) == mark
+
+
+def test_settle_mark_keeps_old_mark_if_a_battle_was_not_handled():
+    mark = HighWaterMark(battle_id="a", played_time=None)
+    pending = PendingMark(mark=mark, battle_ids=["a", "b"])
+    assert settle_mark(pending, {"a"}) is None
+    assert settle_mark(pending, []) is None
@@ -0,0 +1,116 @@
+import datetime as dt
+
+from splatnet3_scraper.query import QueryResponse
+
+from data_zipcaster.cli.importers.splatnet.fetch import collect_battle_ids
+from data_zipcaster.cli.importers.splatnet.filters import OverviewFilter
+from data_zipcaster.utils import base64_encode
+
+
+def make_node(
+    battle_id: str = "a",
+    rule: str | None = "AREA",
+    stage_id: int = 1,
+    stage_name: str = "Scorch Gorge",
+    judgement: str = "WIN",
+    played_time: str | None = "2023-06-01T12:00:00Z",
+) -> dict:
+    node = {
+        "id": battle_id,
+        "vsRule": {"rule": rule},
+        "vsStage": {
+            "id": base64_encode(f"VsStage-{stage_id}"),
+            "name": stage_name,
+        },
+        "judgement": judgement,
+    }
+    if played_time is not None:
+        node["playedTime"] = played_time
+    return node
+
+
+def test_empty_filter_matches_everything():
+    overview_filter = OverviewFilter()
+    assert overview_filter.is_empty
+    assert overview_filter.matches(make_node())
+    assert not overview_filter.is_too_old(make_node())
+
+
+def test_rules():
+    overview_filter = OverviewFilter(rules=["splat_zones", "rainmaker"])
+    assert not overview_filter.is_empty
+    assert overview_filter.matches(make_node(rule="AREA"))
+    assert overview_filter.matches(make_node(rule="GOAL"))
+    assert not overview_filter.matches(make_node(rule="TURF_WAR"))
+    # Some overviews do not say which rule a battle was played under.
+    assert not overview_filter.matches(make_node(rule=None))
+
+
+def test_stages_by_name_or_id():
+    by_name = OverviewFilter(stages=["scorch GORGE"])
+    assert by_name.matches(make_node())
+    assert not by_name.matches(make_node(stage_id=2, stage_name="Eeltail"))
+    by_id = OverviewFilter(stages=["2"])
+    assert by_id.matches(make_node(stage_id=2, stage_name="Eeltail"))
+    assert not by_id.matches(make_node())
+
+
+def test_results():
+    overview_filter = OverviewFilter(results=["lose", "deemed_lose"])
+    assert overview_filter.matches(make_node(judgement="LOSE"))
+    assert overview_filter.matches(make_node(judgement="DEEMED_LOSE"))
+    assert not overview_filter.matches(make_node(judgement="WIN"))
+
+
+def test_criteria_are_combined():
+    overview_filter = OverviewFilter(rules=["splat_zones"], results=["win"])
+    assert overview_filter.matches(make_node())
+    assert not overview_filter.matches(make_node(judgement="LOSE"))
+    assert not overview_filter.matches(make_node(rule="LOFT"))
+
+
+def test_since():
+    since = dt.datetime(2023, 6, 1, 12, 0, tzinfo=dt.timezone.utc)
+    overview_filter = OverviewFilter(since=since)
+    assert not overview_filter.is_empty
+    assert not overview_filter.is_too_old(make_node())
+    assert overview_filter.is_too_old(
+        make_node(played_time="2023-06-01T11:59:59Z")
+    )
+    assert not overview_filter.is_too_old(make_node(played_time=None))
+
+
+def test_since_is_converted_to_utc():
+    tz = dt.timezone(dt.timedelta(hours=9))
+    since = dt.datetime(2023, 6, 1, 21, 0, tzinfo=tz)
+    overview_filter = OverviewFilter(since=since)
+    assert overview_filter.since == dt.datetime(2023, 6, 1, 12, 0)
+
+
+def test_collect_battle_ids_with_filter():
+    nodes = [
+        make_node("a", played_time="2023-06-01T12:03:00Z"),
+        make_node("b", judgement="LOSE", played_time="2023-06-01T12:02:00Z"),
+        make_node("c", played_time="2023-06-01T12:01:00Z"),
+        make_node("d", played_time="2023-06-01T11:00:00Z"),
+        make_node("e", played_time="2023-06-01T12:30:00Z"),
+    ]
+    overview = QueryResponse(
+        data={
+            "battleHistories": {
+                "historyGroups": {
+                    "nodes": [{"historyDetails": {"nodes": nodes}}]
+                }
+            }
+        }
+    )
+    overview_filter = OverviewFilter(
+        results=["win"],
+        since=dt.datetime(2023, 6, 1, 12, 0, tzinfo=dt.timezone.utc),
+    )
+    # The walk stops at the first battle that is too old, so "e" is never
+    # reached.
+    assert collect_battle_ids(overview, overview_filter=overview_filter) == [
+        "a",
+        "c",
+    ]
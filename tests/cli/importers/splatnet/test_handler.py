@@ -0,0 +1,139 @@
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from splatnet3_scraper.auth import TokenManager
+from splatnet3_scraper.auth.exceptions import SplatNetException
+from splatnet3_scraper.auth.graph_ql_queries import queries
+from splatnet3_scraper.constants import TOKENS
+
+from data_zipcaster.cli.importers.splatnet.handler import (
+    RawQueryResponse,
+    SharedQueryHandler,
+)
+
+WORKERS = 8
+
+
+class FakeResponse:
+    def __init__(self, status_code: int, content: bytes = b"") -> None:
+        self.status_code = status_code
+        self.content = content
+
+
+class FakeConfig:
+    def __init__(self, token_manager: TokenManager) -> None:
+        self.token_manager = token_manager
+
+    def get_data(self, key: str) -> str:
+        return "en-US"
+
+    def get(self, key: str) -> str:
+        return "test"
+
+
+class FakeQueryHandler:
+    def __init__(self) -> None:
+        token_manager = TokenManager()
+        token_manager.add_token("gtoken", TOKENS.GTOKEN)
+        token_manager.add_token("bullet-0", TOKENS.BULLET_TOKEN)
+        self.config = FakeConfig(token_manager)
+
+
+class FakeSplatNet:
+    """Stands in for the SplatNet 3 session, rejecting any bullet token but
+    the latest one."""
+
+    def __init__(self, token_manager: TokenManager, parties: int = 1) -> None:
+        self.token_manager = token_manager
+        self.valid_token = "bullet-0"
+        self.refreshes = 0
+        self.sent: list[str] = []
+        self.lock = threading.Lock()
+        # Holds back the first queries until all of them were sent with the
+        # same tokens, as if they had been in flight together.
+        self.barrier = threading.Barrier(parties)
+
+    def expire(self) -> None:
+        self.valid_token = "expired"
+
+    def generate_all_tokens(self) -> None:
+        # Slow enough for every waiting query to pile up behind the refresh.
+        time.sleep(0.05)
+        with self.lock:
+            self.refreshes += 1
+            self.valid_token = f"bullet-{self.refreshes}"
+        self.token_manager.add_token(self.valid_token, TOKENS.BULLET_TOKEN)
+
+    def query(self, query_name, bullet_token, gtoken, *args, **kwargs):
+        with self.lock:
+            self.sent.append(bullet_token)
+        if bullet_token != self.valid_token:
+            self.barrier.wait(timeout=5)
+            return FakeResponse(401)
+        body = {"data": {"token": bullet_token}}
+        return FakeResponse(200, json.dumps(body).encode())
+
+
+@pytest.fixture
+def splatnet(monkeypatch):
+    def make(parties: int = 1) -> tuple[SharedQueryHandler, FakeSplatNet]:
+        query_handler = FakeQueryHandler()
+        token_manager = query_handler.config.token_manager
+        fake = FakeSplatNet(token_manager, parties)
+        monkeypatch.setattr(
+            token_manager, "generate_all_tokens", fake.generate_all_tokens
+        )
+        monkeypatch.setattr(queries, "query", fake.query)
+        return SharedQueryHandler(query_handler), fake  # type: ignore
+
+    return make
+
+
+def test_query_keeps_raw_body(splatnet):
+    handler, _ = splatnet()
+    response = handler.query("Test")
+    assert isinstance(response, RawQueryResponse)
+    assert response.raw == json.dumps({"data": {"token": "bullet-0"}}).encode()
+    assert response.data == {"token": "bullet-0"}
+
+
+def test_concurrent_expiry_refreshes_once(splatnet):
+    handler, fake = splatnet(WORKERS)
+    refreshes: list[int] = []
+    handler.on_refresh = lambda: refreshes.append(handler.generation)
+    fake.expire()
+
+    with ThreadPoolExecutor(max_workers=WORKERS) as executor:
+        responses = list(
+            executor.map(lambda _: handler.query("Test"), range(WORKERS))
+        )
+
+    assert fake.refreshes == 1
+    assert refreshes == [1]
+    assert handler.generation == 1
+    # Every query was sent once with the expired token, then retried once
+    # with the new one.
+    assert sorted(fake.sent) == ["bullet-0"] * WORKERS + ["bullet-1"] * WORKERS
+    assert all(r.data == {"token": "bullet-1"} for r in responses)
+
+
+def test_refresh_of_old_generation_is_skipped(splatnet):
+    handler, fake = splatnet()
+    handler.refresh(0)
+    handler.refresh(0)
+    assert fake.refreshes == 1
+    handler.refresh()
+    assert fake.refreshes == 2
+
+
+def test_query_still_failing_after_refresh(splatnet, monkeypatch):
+    handler, fake = splatnet()
+    monkeypatch.setattr(
+        queries, "query", lambda *args, **kwargs: FakeResponse(401)
+    )
+    with pytest.raises(SplatNetException):
+        handler.query("Test")
+    assert fake.refreshes == 1
@@ -0,0 +1,82 @@
+import json
+import os
+import time
+
+import pytest
+from splatnet3_scraper.auth import TokenManager
+from splatnet3_scraper.constants import TOKEN_EXPIRATIONS, TOKENS
+
+from data_zipcaster.cli.importers.splatnet.tokens import TokenCache
+
+
+def make_manager(
+    gtoken: str, bullet_token: str, issued_at: float
+) -> TokenManager:
+    manager = TokenManager()
+    manager.add_token(gtoken, TOKENS.GTOKEN, issued_at)
+    manager.add_token(bullet_token, TOKENS.BULLET_TOKEN, issued_at)
+    return manager
+
+
+def test_update_records_generated_tokens(tmp_path):
+    path = str(tmp_path / "token_cache.json")
+    cache = TokenCache(path)
+    issued_at = time.time() - 60
+    cache.update(make_manager("g1", "b1", issued_at))
+
+    loaded = TokenCache(path)
+    assert loaded.tokens[TOKENS.GTOKEN]["issued_at"] == issued_at
+    time_left = loaded.time_left(TOKENS.GTOKEN, "g1")
+    assert time_left is not None
+    assert 0 < time_left <= TOKEN_EXPIRATIONS[TOKENS.GTOKEN] - 60
+    # The age of a token that is not the cached one is unknown.
+    assert loaded.time_left(TOKENS.GTOKEN, "g2") is None
+    assert loaded.time_left(TOKENS.GTOKEN, None) is None
+
+
+def test_update_keeps_original_issue_time(tmp_path):
+    cache = TokenCache(str(tmp_path / "token_cache.json"))
+    cache.update(make_manager("g1", "b1", 100.0))
+    cache.update(make_manager("g1", "b2", 200.0))
+    assert cache.tokens[TOKENS.GTOKEN]["issued_at"] == 100.0
+    assert cache.tokens[TOKENS.BULLET_TOKEN]["token"] == "b2"
+    assert cache.tokens[TOKENS.BULLET_TOKEN]["issued_at"] == 200.0
+
+
+def test_update_skips_ignored_tokens(tmp_path):
+    path = str(tmp_path / "token_cache.json")
+    cache = TokenCache(path)
+    # Tokens loaded from the config were issued at an unknown time.
+    cache.ignore(["g1", "b1", None])
+    cache.update(make_manager("g1", "b1", time.time()))
+    assert cache.tokens == {}
+    assert TokenCache(path).tokens == {}
+
+    # Once a token is regenerated, the new one is cached.
+    cache.update(make_manager("g1", "b2", time.time()))
+    assert TOKENS.GTOKEN not in cache.tokens
+    assert cache.tokens[TOKENS.BULLET_TOKEN]["token"] == "b2"
+
+
+def test_corrupt_cache_is_empty(tmp_path):
+    path = tmp_path / "token_cache.json"
+    path.write_text("{not json")
+    assert TokenCache(str(path)).tokens == {}
+
+
+def test_save_replaces_file_atomically(tmp_path, monkeypatch):
+    path = tmp_path / "token_cache.json"
+    cache = TokenCache(str(path))
+    cache.update(make_manager("g1", "b1", 100.0))
+    before = path.read_text()
+
+    def fail(*args, **kwargs):
+        raise OSError("disk full")
+
+    # A write that fails part way leaves the old cache untouched.
+    monkeypatch.setattr(json, "dump", fail)
+    cache.tokens[TOKENS.GTOKEN]["token"] = "g2"
+    with pytest.raises(OSError):
+        cache.save()
+    assert path.read_text() == before
+    assert os.listdir(tmp_path) == ["token_cache.json"]
@@ -0,0 +1,45 @@
+from data_zipcaster.cli.ledger import BattleLedger
+
+
+def test_known_ids_without_exporters():
+    ledger = BattleLedger(":memory:")
+    ledger.record_import(["a", "b"], "splatnet")
+    ledger.record_import(["c"], "replay")
+    assert ledger.known_ids("splatnet", []) == {"a", "b"}
+    assert ledger.known_ids("replay", []) == {"c"}
+    assert ledger.known_ids("other", []) == set()
+    ledger.close()
+
+
+def test_known_ids_need_every_exporter():
+    ledger = BattleLedger(":memory:")
+    ledger.record_import(["a", "b", "c"], "splatnet")
+    ledger.record_export(["a", "b"], "json")
+    ledger.record_export(["b", "c"], "splashcat")
+    # A battle that was imported but not exported is fetched again.
+    assert ledger.known_ids("splatnet", ["json"]) == {"a", "b"}
+    assert ledger.known_ids("splatnet", ["json", "splashcat"]) == {"b"}
+    assert ledger.known_ids("splatnet", ["other"]) == set()
+    ledger.close()
+
+
+def test_first_importer_is_kept():
+    ledger = BattleLedger(":memory:")
+    ledger.record_import(["a"], "splatnet")
+    ledger.record_import(["a", "b"], "replay")
+    assert ledger.imported_ids("splatnet") == {"a"}
+    assert ledger.imported_ids("replay") == {"b"}
+    ledger.close()
+
+
+def test_ledger_persists(tmp_path):
+    path = str(tmp_path / "ledger.sqlite3")
+    ledger = BattleLedger(path)
+    ledger.record_import(["a"], "splatnet")
+    ledger.record_export(["a", "a"], "json")
+    ledger.close()
+
+    ledger = BattleLedger(path)
+    assert ledger.imported_ids("splatnet") == {"a"}
+    assert ledger.exported_ids("json") == {"a"}
+    ledger.close()
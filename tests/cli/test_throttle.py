@@ -0,0 +1,187 @@
+import pytest
+import requests
+
+from data_zipcaster.cli import throttle
+from data_zipcaster.cli.throttle import (
+    CircuitBreaker,
+    CircuitOpenError,
+    HostLimiter,
+    RetryableError,
+    TokenBucket,
+    backoff_delays,
+)
+
+
+class FakeClock:
+    """Stands in for the ``time`` module, with a clock that only moves when
+    something sleeps."""
+
+    def __init__(self) -> None:
+        self.now = 1000.0
+        self.sleeps: list[float] = []
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch) -> FakeClock:
+    fake = FakeClock()
+    monkeypatch.setattr(throttle, "time", fake)
+    return fake
+
+
+def test_bucket_allows_burst_then_limits(clock):
+    bucket = TokenBucket(rate=2.0, burst=3)
+    for _ in range(3):
+        bucket.acquire()
+    assert clock.sleeps == []
+    bucket.acquire()
+    assert clock.sleeps == [pytest.approx(0.5)]
+    bucket.acquire()
+    assert clock.now == pytest.approx(1001.0)
+
+
+def test_bucket_refills_up_to_burst(clock):
+    bucket = TokenBucket(rate=1.0, burst=2)
+    bucket.acquire()
+    bucket.acquire()
+    clock.now += 60
+    # Only ``burst`` tokens build up, however long the bucket sat idle.
+    bucket.acquire()
+    bucket.acquire()
+    assert clock.sleeps == []
+    bucket.acquire()
+    assert clock.sleeps == [pytest.approx(1.0)]
+
+
+def test_bucket_without_rate_never_waits(clock):
+    bucket = TokenBucket(rate=0)
+    for _ in range(100):
+        bucket.acquire()
+    assert clock.sleeps == []
+
+
+def test_breaker_opens_after_threshold(clock):
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=10.0)
+    for _ in range(2):
+        breaker.record_failure()
+        breaker.before_call()
+    breaker.record_failure()
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+
+def test_breaker_success_resets_count(clock):
+    breaker = CircuitBreaker(failure_threshold=2)
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    breaker.before_call()
+
+
+def test_breaker_half_open_then_closed(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10.0)
+    breaker.record_failure()
+    clock.now += 10
+    # One trial request is let through, the rest are kept out.
+    breaker.before_call()
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    breaker.record_success()
+    breaker.before_call()
+    breaker.before_call()
+
+
+def test_breaker_half_open_then_open_again(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10.0)
+    breaker.record_failure()
+    clock.now += 10
+    breaker.before_call()
+    breaker.record_failure()
+    clock.now += 5
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    clock.now += 5
+    breaker.before_call()
+
+
+def test_backoff_delays_are_bounded():
+    for _ in range(200):
+        delays = list(backoff_delays(8, base=0.5, cap=4.0))
+        assert len(delays) == 8
+        for attempt, delay in enumerate(delays):
+            assert 0 <= delay <= min(4.0, 0.5 * 2**attempt)
+
+
+def test_backoff_delays_are_jittered():
+    assert len({next(backoff_delays(1)) for _ in range(20)}) > 1
+
+
+def failing(errors: list[BaseException], result: str = "ok"):
+    calls: list[int] = []
+
+    def fxn() -> str:
+        calls.append(1)
+        if errors:
+            raise errors.pop(0)
+        return result
+
+    return fxn, calls
+
+
+@pytest.mark.parametrize(
+    "error",
+    [
+        RetryableError("503"),
+        ConnectionError("reset"),
+        requests.ConnectionError("reset"),
+        requests.Timeout("slow"),
+    ],
+)
+def test_call_retries_transient_errors(clock, error):
+    limiter = HostLimiter(rate=0, retries=4)
+    fxn, calls = failing([error, error])
+    assert limiter.call(fxn) == "ok"
+    assert len(calls) == 3
+    assert len(clock.sleeps) == 2
+    assert limiter.breaker.failures == 0
+
+
+def test_call_raises_after_last_retry(clock):
+    limiter = HostLimiter(rate=0, retries=2, failure_threshold=10)
+    fxn, calls = failing([RetryableError(str(idx)) for idx in range(5)])
+    with pytest.raises(RetryableError, match="2"):
+        limiter.call(fxn)
+    assert len(calls) == 3
+    assert limiter.breaker.failures == 3
+
+
+def test_call_reraises_other_errors(clock):
+    limiter = HostLimiter(rate=0, retries=4)
+    fxn, calls = failing([ValueError("bad request")])
+    with pytest.raises(ValueError):
+        limiter.call(fxn)
+    assert len(calls) == 1
+    assert clock.sleeps == []
+    assert limiter.breaker.failures == 0
+
+
+def test_call_refused_while_circuit_open(clock):
+    limiter = HostLimiter(rate=0, retries=10, failure_threshold=2)
+    fxn, calls = failing([RetryableError("503") for _ in range(10)])
+    with pytest.raises(CircuitOpenError):
+        limiter.call(fxn)
+    assert len(calls) == 2
+
+
+def test_get_limiter_keeps_settings():
+    first = throttle.get_limiter("http://limiter-test.invalid/a", 5.0, 2)
+    second = throttle.get_limiter("http://limiter-test.invalid/b", 1.0, 1)
+    assert first is second
+    assert first.bucket.rate == 5.0
+    assert first.bucket.burst == 2
@@ -0,0 +1,11 @@
+import click
+import pytest
+
+
+@pytest.fixture
+def cli_context():
+    """An active click context with the options every plugin reads."""
+    ctx = click.Context(click.Command("data_zipcaster"), obj={})
+    ctx.params = {"silent": True, "verbose": 0, "no_ledger": True}
+    with ctx:
+        yield ctx
@@ -0,0 +1,51 @@
+import pytest
+
+from data_zipcaster.bench.synthetic import FLAGS, BattleFactory
+from data_zipcaster.models import splatnet
+
+# The keys SplatNet 3 sends with a leading "__", by the name of their field.
+ALIASES = {
+    "__typename": "typename",
+    "__isGear": "isGear",
+    "__isPlayer": "isPlayer",
+}
+
+
+def make_detail(flag: str) -> dict:
+    factory = BattleFactory(flag, seed=1)
+    return next(iter(factory.groups(1)))["details"][0]
+
+
+def rename_aliases(value):
+    if isinstance(value, dict):
+        return {
+            ALIASES.get(key, key): rename_aliases(item)
+            for key, item in value.items()
+        }
+    if isinstance(value, list):
+        return [rename_aliases(item) for item in value]
+    return value
+
+
+@pytest.mark.parametrize("flag", FLAGS)
+def test_aliases_parse_by_alias_and_name(flag):
+    detail = make_detail(flag)
+    vs_detail = detail["vsHistoryDetail"]
+    assert "__typename" in vs_detail
+    assert "__isPlayer" in vs_detail["player"]
+    assert "__isGear" in vs_detail["player"]["headGear"]
+
+    by_alias = splatnet.VsDetail.model_validate(detail)
+    by_name = splatnet.VsDetail.model_validate(rename_aliases(detail))
+    assert by_alias == by_name
+
+    history = by_alias.vsHistoryDetail
+    assert history.typename == vs_detail["__typename"]
+    assert history.player.isPlayer == vs_detail["player"]["__isPlayer"]
+    assert history.player.headGear.isGear == (
+        vs_detail["player"]["headGear"]["__isGear"]
+    )
+
+    dumped = by_alias.model_dump(by_alias=True)["vsHistoryDetail"]
+    assert dumped["__typename"] == vs_detail["__typename"]
+    assert dumped["player"]["__isPlayer"] == vs_detail["player"]["__isPlayer"]
@@ -0,0 +1,85 @@
+import copy
+
+import pytest
+
+from data_zipcaster.bench.synthetic import BattleFactory
+from data_zipcaster.models import splatnet
+from data_zipcaster.raw import encode_json
+
+# Spans several chunks, so that the errors of later chunks are offset.
+COUNT = splatnet.BATCH_SIZE * 2 + 8
+BROKEN = {3, 7, splatnet.BATCH_SIZE + 2, COUNT - 1}
+
+
+def make_details(flag: str) -> list[dict]:
+    factory = BattleFactory(flag, seed=1, splatfest=True)
+    details = [d for group in factory.groups(COUNT) for d in group["details"]]
+    return details[:COUNT]
+
+
+def break_details(details: list[dict]) -> list[dict]:
+    broken = copy.deepcopy(details)
+    for idx in BROKEN:
+        del broken[idx]["vsHistoryDetail"]["judgement"]
+    return broken
+
+
+@pytest.fixture(params=["anarchy", "turf"])
+def details(request) -> list[dict]:
+    return make_details(request.param)
+
+
+@pytest.mark.parametrize("strict", [False, True])
+def test_batch_matches_single(details, strict):
+    expected = [splatnet.generate_vs_detail(d, strict=strict) for d in details]
+    batch = splatnet.generate_vs_details(details, strict)
+    assert batch["errors"] == {}
+    assert batch["details"] == expected
+
+
+@pytest.mark.parametrize("strict", [False, True])
+def test_batch_json_matches_single(details, strict):
+    expected = [splatnet.generate_vs_detail(d, strict=strict) for d in details]
+    # Bodies with and without the data wrapper can be mixed.
+    bodies = [
+        encode_json({"data": d}) if idx % 2 else encode_json(d)
+        for idx, d in enumerate(details)
+    ]
+    batch = splatnet.generate_vs_details_json(bodies, strict)
+    assert batch["errors"] == {}
+    assert batch["details"] == expected
+
+
+@pytest.mark.parametrize("strict", [False, True])
+def test_batch_isolates_errors(details, strict):
+    expected = [splatnet.generate_vs_detail(d, strict=strict) for d in details]
+    batch = splatnet.generate_vs_details(break_details(details), strict)
+    assert set(batch["errors"]) == BROKEN
+    for idx, detail in enumerate(batch["details"]):
+        if idx in BROKEN:
+            assert detail is None
+        else:
+            assert detail == expected[idx]
+
+
+def test_batch_json_isolates_errors(details):
+    expected = [splatnet.generate_vs_detail(d) for d in details]
+    bodies = [encode_json({"data": d}) for d in break_details(details)]
+    # Invalid JSON fails the whole array, not just its own item.
+    bodies[10] = b'{"data": {"vsHistoryDetail": '
+    bodies[11] = encode_json(details[11])
+    batch = splatnet.generate_vs_details_json(bodies)
+    assert set(batch["errors"]) == BROKEN | {10}
+    for idx, detail in enumerate(batch["details"]):
+        if idx in BROKEN | {10}:
+            assert detail is None
+        else:
+            assert detail == expected[idx]
+
+
+def test_batch_empty():
+    assert splatnet.generate_vs_details([]) == {"details": [], "errors": {}}
+    assert splatnet.generate_vs_details_json([]) == {
+        "details": [],
+        "errors": {},
+    }
@@ -0,0 +1,53 @@
+import pytest
+from pydantic import ValidationError
+
+from data_zipcaster.bench.synthetic import FLAGS, BattleFactory
+from data_zipcaster.models import splatnet
+
+EXPECTED_MODELS = {
+    "anarchy": splatnet.AnarchyMetadata,
+    "xbattle": splatnet.XMetadata,
+    "turf": splatnet.TurfMetadata,
+    "challenge": splatnet.ChallengeMetadata,
+    "private": splatnet.PrivateMetadata,
+}
+
+
+def make_overview(flag: str) -> dict:
+    factory = BattleFactory(flag, seed=1)
+    return factory.overview(list(factory.groups(4)))
+
+
+def test_every_flag_has_a_model():
+    assert set(FLAGS) == set(splatnet.METADATA_MODELS)
+
+
+@pytest.mark.parametrize("flag", FLAGS)
+def test_metadata_picks_model(flag):
+    overview = make_overview(flag)
+    expected = EXPECTED_MODELS[flag]
+    assert type(splatnet.MetadataAdapter.validate_python(overview)) is expected
+    assert type(splatnet.generate_metadata(overview)) is expected
+    assert splatnet.generate_metadata(overview, flag) == (
+        splatnet.generate_metadata(overview)
+    )
+
+
+@pytest.mark.parametrize("flag", FLAGS)
+def test_metadata_json_picks_model(flag):
+    overview = make_overview(flag)
+    raw = splatnet.MetadataAdapter.dump_json(
+        splatnet.MetadataAdapter.validate_python(overview)
+    )
+    expected = EXPECTED_MODELS[flag]
+    assert type(splatnet.generate_metadata_json(raw)) is expected
+
+
+def test_metadata_unknown_flag():
+    with pytest.raises(ValueError):
+        splatnet.generate_metadata(make_overview("turf"), "salmon")
+
+
+def test_metadata_unknown_key():
+    with pytest.raises(ValidationError):
+        splatnet.generate_metadata({"coopResult": {}})
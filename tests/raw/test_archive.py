@@ -0,0 +1,191 @@
+import os
+
+import pytest
+
+from data_zipcaster.bench.synthetic import BattleFactory
+from data_zipcaster.raw import archive as archive_module
+from data_zipcaster.raw.archive import (
+    SEGMENTS_DIRNAME,
+    ArchiveRunWriter,
+    RawArchive,
+    content_hash,
+    read_record,
+)
+from data_zipcaster.raw.stream import encode_json
+from data_zipcaster.utils import base64_decode
+
+
+def make_details(count: int, seed: int = 1) -> list[dict]:
+    factory = BattleFactory("turf", seed=seed)
+    details = [d for group in factory.groups(count) for d in group["details"]]
+    return details[:count]
+
+
+def battle_id(detail: dict) -> str:
+    return base64_decode(detail["vsHistoryDetail"]["id"])
+
+
+def sign_urls(data, signature: str):
+    """Adds a query string to every image URL, as SplatNet 3 signs them
+    differently on every fetch."""
+    if isinstance(data, dict):
+        return {
+            key: (
+                f"{value}?Expires={signature}"
+                if key == "url" and isinstance(value, str)
+                else sign_urls(value, signature)
+            )
+            for key, value in data.items()
+        }
+    if isinstance(data, list):
+        return [sign_urls(item, signature) for item in data]
+    return data
+
+
+def segments(root: str) -> list[str]:
+    return sorted(os.listdir(os.path.join(root, SEGMENTS_DIRNAME)))
+
+
+@pytest.fixture
+def archive(tmp_path):
+    archive = RawArchive(str(tmp_path / "archive"))
+    yield archive
+    archive.close()
+
+
+def test_put_get_round_trip(archive):
+    data = {"data": {"a": [1, 2, "three"]}}
+    digest = archive.put(data)
+    assert digest == content_hash(encode_json(data))
+    assert archive.get(digest) == {"a": [1, 2, "three"]}
+    with pytest.raises(KeyError):
+        archive.get("missing")
+
+
+def test_put_raw_body_as_is(archive):
+    raw = b'{"data": {"a": 1}}'
+    digest = archive.put(lambda: {"b": 2}, raw=raw)
+    assert digest == content_hash(raw)
+    assert archive.get(digest) == {"a": 1}
+
+
+def test_put_deduplicates_identical_responses(archive):
+    first = archive.put({"a": 1})
+    size = sum(
+        os.path.getsize(os.path.join(archive.segments_path, segment))
+        for segment in segments(archive.root)
+    )
+    assert archive.put({"a": 1}) == first
+    assert archive.put(lambda: {"a": 1}, raw=encode_json({"a": 1})) == first
+    assert size == sum(
+        os.path.getsize(os.path.join(archive.segments_path, segment))
+        for segment in segments(archive.root)
+    )
+
+
+def test_put_detail_deduplicates_by_battle(archive):
+    detail = make_details(1)[0]
+    first = sign_urls(detail, "1")
+    second = sign_urls(detail, "2")
+    battle, digest = archive.put_detail(first, "turf")
+    assert battle == battle_id(detail)
+    # A later fetch of the same battle is not byte identical, but is still
+    # not stored again.
+    assert archive.put_detail(
+        lambda: second, "turf", raw=encode_json({"data": second})
+    ) == (battle, digest)
+    records = archive.find(battle)
+    assert len(records) == 1
+    assert read_record(archive.root, records[0]["location"]) == first
+
+
+def test_put_detail_with_key_does_not_decode(archive):
+    detail = make_details(1)[0]
+
+    def fail() -> dict:
+        raise AssertionError("The body should not be decoded.")
+
+    key = (battle_id(detail), detail["vsHistoryDetail"]["playedTime"])
+    raw = encode_json({"data": detail})
+    assert archive.put_detail(fail, "turf", raw=raw, key=key)[0] == key[0]
+    assert archive.find(key[0])[0]["played_time"] == key[1]
+
+
+def test_segment_rollover(archive, monkeypatch):
+    monkeypatch.setattr(archive_module, "SEGMENT_SIZE", 100)
+    # Random payloads, so that each record is larger than a segment even
+    # once compressed.
+    payloads = [{"payload": os.urandom(100).hex()} for _ in range(3)]
+    digests = [archive.put(payload) for payload in payloads]
+    assert len(segments(archive.root)) == 3
+    for payload, digest in zip(payloads, digests):
+        assert archive.get(digest) == payload
+
+
+def test_writers_append_to_their_own_segments(tmp_path):
+    root = str(tmp_path / "archive")
+    first = RawArchive(root)
+    second = RawArchive(root)
+    digests = []
+    for n in range(4):
+        writer = first if n % 2 == 0 else second
+        digests.append(writer.put({"n": n}))
+    assert len(segments(root)) == 2
+    first.close()
+    second.close()
+
+    archive = RawArchive(root)
+    for n, digest in enumerate(digests):
+        assert archive.get(digest) == {"n": n}
+    # Reopening never appends to a segment another writer may own.
+    archive.put({"n": 4})
+    assert len(segments(root)) == 3
+    archive.close()
+
+
+def write_run(
+    archive: RawArchive, run: str, details: list[dict], overview: dict
+) -> None:
+    with ArchiveRunWriter(archive, run, "turf") as writer:
+        writer.write_overview(overview)
+        for detail in details:
+            writer.write_detail(detail)
+
+
+def test_run_without_details_is_not_recorded(archive):
+    write_run(archive, "2023-06-01 12:00:00", [], {"overview": 1})
+    assert list(archive.iter_manifests()) == []
+
+
+def test_manifests(archive):
+    details = make_details(3)
+    write_run(archive, "2023-06-01 12:00:00", details[1:], {"overview": 1})
+    write_run(archive, "2023-06-02 12:00:00", details[:2], {"overview": 2})
+    manifests = list(archive.iter_manifests())
+    assert [manifest["run"] for manifest in manifests] == [
+        "2023-06-01 12:00:00",
+        "2023-06-02 12:00:00",
+    ]
+    assert [battle for battle, _ in manifests[1]["details"]] == [
+        battle_id(detail) for detail in details[:2]
+    ]
+    assert archive.get(manifests[1]["overview"]) == {"overview": 2}
+    assert archive.battle_ids() == {battle_id(d) for d in details}
+
+
+def test_latest_runs(archive):
+    details = make_details(3)
+    write_run(archive, "2023-06-01 12:00:00", details[1:], {"overview": 1})
+    write_run(archive, "2023-06-02 12:00:00", details[:2], {"overview": 2})
+    latest = archive.latest_runs()
+    runs = {row[3]: row[0] for row in latest}
+    assert len(latest) == 3
+    by_battle = {
+        battle_id(detail): archive.find(battle_id(detail))[0]["content_hash"]
+        for detail in details
+    }
+    # The battle seen by both runs is replayed from the newer one.
+    assert runs[by_battle[battle_id(details[1])]] == "2023-06-02 12:00:00"
+    assert runs[by_battle[battle_id(details[2])]] == "2023-06-01 12:00:00"
+    # Oldest run first.
+    assert [row[0] for row in latest] == sorted(row[0] for row in latest)
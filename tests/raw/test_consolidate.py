@@ -0,0 +1,146 @@
+import pytest
+
+from data_zipcaster.raw.consolidate import (
+    consolidate_dumps,
+    merge_details,
+    merge_nodes,
+    reconcile_overviews,
+)
+from data_zipcaster.raw.stream import (
+    RawDumpWriter,
+    iter_dump_details,
+    load_dump_overview,
+)
+
+
+def make_detail(battle_id: str, minute: int, snapshot: str = "") -> dict:
+    return {
+        "vsHistoryDetail": {
+            "id": battle_id,
+            "playedTime": f"2023-06-01T12:{minute:02d}:00Z",
+            "snapshot": snapshot,
+        }
+    }
+
+
+def make_group(battle_ids: list[str], series: dict | None = None) -> dict:
+    group: dict = {
+        "historyDetails": {"nodes": [{"id": i} for i in battle_ids]}
+    }
+    if series is not None:
+        group["bankaraMatchChallenge"] = series
+    return group
+
+
+def make_overview(*groups: dict, summary: str = "") -> dict:
+    return {
+        "bankaraBattleHistories": {
+            "summary": summary,
+            "historyGroups": {"nodes": list(groups)},
+        }
+    }
+
+
+def overview_groups(overview: dict) -> list[list[str]]:
+    groups = overview["bankaraBattleHistories"]["historyGroups"]["nodes"]
+    return [
+        [node["id"] for node in group["historyDetails"]["nodes"]]
+        for group in groups
+    ]
+
+
+def write_dump(path: str, overview: dict, details: list[dict]) -> str:
+    with RawDumpWriter(path) as writer:
+        writer.write_overview(overview)
+        for detail in details:
+            writer.write_detail(detail)
+    return path
+
+
+def battle_ids(details) -> list[str]:
+    return [detail["vsHistoryDetail"]["id"] for detail in details]
+
+
+def test_merge_details_keeps_latest_copy(tmp_path):
+    old = write_dump(
+        str(tmp_path / "1" / "anarchy"),
+        make_overview(),
+        [make_detail("c", 3, "old"), make_detail("a", 1, "old")],
+    )
+    new = write_dump(
+        str(tmp_path / "2" / "anarchy"),
+        make_overview(),
+        [make_detail("d", 4, "new"), make_detail("c", 3, "new")],
+    )
+    tmp = tmp_path / "tmp"
+    tmp.mkdir()
+    merged = list(merge_details([old, new], str(tmp)))
+    assert battle_ids(merged) == ["a", "c", "d"]
+    snapshots = [detail["vsHistoryDetail"]["snapshot"] for detail in merged]
+    assert snapshots == ["old", "new", "new"]
+
+
+def test_reconcile_keeps_most_complete_series():
+    going = {"udemaeAfter": None}
+    over = {"udemaeAfter": "S+"}
+    newest = make_overview(
+        make_group(["e"]), make_group(["c", "b"], going), summary="newest"
+    )
+    oldest = make_overview(make_group(["c", "b", "a"], over))
+    out = reconcile_overviews([(1, newest), (0, oldest)])
+    assert overview_groups(out) == [["e"], ["c", "b", "a"]]
+    groups = out["bankaraBattleHistories"]["historyGroups"]["nodes"]
+    assert groups[1]["bankaraMatchChallenge"] == over
+    assert out["bankaraBattleHistories"]["summary"] == "newest"
+
+
+def test_reconcile_prefers_finished_series_over_longer_one():
+    newest = make_overview(make_group(["c", "b", "a"], {"udemaeAfter": None}))
+    oldest = make_overview(make_group(["b", "a"], {"udemaeAfter": "A"}))
+    out = reconcile_overviews([(1, newest), (0, oldest)])
+    assert overview_groups(out) == [["b", "a"]]
+
+
+def test_reconcile_merges_groups_that_are_not_series():
+    newest = make_overview(make_group(["d", "c"]))
+    oldest = make_overview(make_group(["c", "b"]))
+    out = reconcile_overviews([(1, newest), (0, oldest)])
+    assert overview_groups(out) == [["d", "c", "b"]]
+
+
+def test_reconcile_folds_bridged_groups():
+    newest = make_overview(make_group(["d"]), make_group(["b"]))
+    oldest = make_overview(make_group(["d", "c", "b"]))
+    out = reconcile_overviews([(1, newest), (0, oldest)])
+    assert overview_groups(out) == [["d", "c", "b"]]
+
+
+def test_merge_nodes_keeps_order():
+    nodes = [{"id": i} for i in ["e", "c", "a"]]
+    merge_nodes(nodes, [{"id": i} for i in ["f", "e", "d", "c", "b"]])
+    assert [node["id"] for node in nodes] == ["f", "e", "d", "c", "b", "a"]
+
+
+def test_reconcile_without_overviews():
+    with pytest.raises(ValueError):
+        reconcile_overviews([])
+
+
+def test_consolidate_dumps(tmp_path):
+    # Passed newest first, but ordered by the name of the run directory.
+    new = write_dump(
+        str(tmp_path / "20230602T000000" / "anarchy"),
+        make_overview(make_group(["c", "b"], {"udemaeAfter": "S"})),
+        [make_detail("c", 3, "new"), make_detail("b", 2, "new")],
+    )
+    old = write_dump(
+        str(tmp_path / "20230601T000000" / "anarchy"),
+        make_overview(make_group(["b", "a"], {"udemaeAfter": None})),
+        [make_detail("b", 2, "old"), make_detail("a", 1, "old")],
+    )
+    out = str(tmp_path / "out" / "anarchy")
+    assert consolidate_dumps([new, old], out) == 3
+    details = list(iter_dump_details(out))
+    assert battle_ids(details) == ["a", "b", "c"]
+    assert details[1]["vsHistoryDetail"]["snapshot"] == "new"
+    assert overview_groups(load_dump_overview(out)) == [["c", "b"]]
@@ -0,0 +1,166 @@
+import gzip
+import io
+import json
+import os
+
+import pytest
+
+from data_zipcaster.raw.stream import (
+    DETAILED_FILENAME,
+    DETAILED_STREAM_FILENAME,
+    OVERVIEW_FILENAME,
+    JsonArrayReader,
+    RawDumpWriter,
+    is_dump,
+    iter_dump_details,
+    iter_json_array,
+    iter_json_lines,
+    load_dump_overview,
+    unwrap_data,
+)
+
+DETAILS = [{"vsHistoryDetail": {"id": f"battle-{idx}"}} for idx in range(3)]
+
+
+def test_writer_round_trip(tmp_path):
+    path = str(tmp_path / "anarchy")
+    with RawDumpWriter(path) as writer:
+        writer.write_overview({"battles": []})
+        for detail in DETAILS:
+            writer.write_detail(detail)
+    assert writer.count == 3
+    assert is_dump(path)
+    assert load_dump_overview(path) == {"battles": []}
+    assert list(iter_dump_details(path)) == DETAILS
+
+
+def test_writer_writes_raw_body_as_is(tmp_path):
+    path = str(tmp_path / "anarchy")
+    raw = b'{"data": {"vsHistoryDetail": {"id": "raw"}}}'
+
+    def fail() -> dict:
+        raise AssertionError("The body should not be decoded.")
+
+    with RawDumpWriter(path) as writer:
+        writer.write_overview(fail, raw=b'{"data": {"battles": []}}')
+        writer.write_detail(fail, raw=raw + b"\n")
+    stream_path = os.path.join(path, DETAILED_STREAM_FILENAME)
+    with gzip.open(stream_path, "rb") as f:
+        assert f.read() == raw + b"\n"
+    assert load_dump_overview(path) == {"battles": []}
+    assert list(iter_dump_details(path)) == [{"vsHistoryDetail": {"id": "raw"}}]
+
+
+def test_writer_encodes_multiline_body(tmp_path):
+    path = str(tmp_path / "anarchy")
+    raw = json.dumps(DETAILS[0], indent=2).encode()
+    with RawDumpWriter(path) as writer:
+        writer.write_detail(lambda: DETAILS[0], raw=raw)
+    assert list(iter_dump_details(path)) == DETAILS[:1]
+
+
+def test_writer_without_details_writes_nothing(tmp_path):
+    path = str(tmp_path / "anarchy")
+    with RawDumpWriter(path) as writer:
+        writer.write_overview({"battles": []})
+    assert not os.path.exists(path)
+
+
+def test_unwrap_data():
+    assert unwrap_data({"data": {"a": 1}}) == {"a": 1}
+    assert unwrap_data({"data": 1, "other": 2}) == {"data": 1, "other": 2}
+    assert unwrap_data({"a": 1}) == {"a": 1}
+
+
+def test_unclosed_stream_can_be_read(tmp_path):
+    path = str(tmp_path / "anarchy")
+    writer = RawDumpWriter(path)
+    for detail in DETAILS:
+        writer.write_detail(detail)
+    # The stream has no gzip trailer until it is closed.
+    stream_path = os.path.join(path, DETAILED_STREAM_FILENAME)
+    assert list(iter_json_lines(stream_path)) == DETAILS
+    writer.close()
+
+
+def test_truncated_gzip_tail_is_ignored(tmp_path):
+    path = str(tmp_path / "anarchy")
+    with RawDumpWriter(path) as writer:
+        for detail in DETAILS:
+            writer.write_detail(detail)
+    stream_path = os.path.join(path, DETAILED_STREAM_FILENAME)
+    with open(stream_path, "rb") as f:
+        data = f.read()
+    for cut in range(1, len(data)):
+        with open(stream_path, "wb") as f:
+            f.write(data[:-cut])
+        records = list(iter_json_lines(stream_path))
+        assert records == DETAILS[: len(records)]
+        if cut <= 8:
+            # Only the trailer is missing, every record was flushed.
+            assert records == DETAILS
+
+
+def test_partial_last_line_is_ignored(tmp_path):
+    stream_path = str(tmp_path / "detailed.jsonl")
+    with open(stream_path, "w") as f:
+        f.write(json.dumps(DETAILS[0]) + "\n")
+        f.write(json.dumps(DETAILS[1])[:10])
+    assert list(iter_json_lines(stream_path)) == DETAILS[:1]
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 7, 1024])
+def test_json_array_reader(chunk_size):
+    items = [
+        {"a": [1, 2, {"b": "c, ]"}]},
+        12345,
+        -1.5e10,
+        "x",
+        None,
+        [],
+        {},
+        True,
+    ]
+    text = " [\n " + " ,\n ".join(json.dumps(item) for item in items) + " ] "
+    reader = JsonArrayReader(io.StringIO(text), chunk_size=chunk_size)
+    assert list(reader) == items
+
+
+@pytest.mark.parametrize("text", ["[]", " [ ] ", "[\n]"])
+def test_json_array_reader_empty(text):
+    assert list(JsonArrayReader(io.StringIO(text), chunk_size=1)) == []
+
+
+@pytest.mark.parametrize("number", ["1", "1234567", "-12.5e-3"])
+def test_json_array_reader_number_across_chunks(number):
+    # A number cut off by the end of a chunk must not be decoded early.
+    for chunk_size in range(1, len(number) + 3):
+        reader = JsonArrayReader(
+            io.StringIO(f"[{number}]"), chunk_size=chunk_size
+        )
+        assert list(reader) == [json.loads(number)]
+
+
+@pytest.mark.parametrize(
+    "text", ["", "{}", "[1 2]", "[1,", "[1", '[{"a": 1}']
+)
+def test_json_array_reader_invalid(text):
+    with pytest.raises(ValueError):
+        list(JsonArrayReader(io.StringIO(text), chunk_size=2))
+
+
+def test_iter_json_array_gzip(tmp_path):
+    path = str(tmp_path / "detailed.json.gz")
+    with gzip.open(path, "wt", encoding="utf-8") as f:
+        json.dump(DETAILS, f)
+    assert list(iter_json_array(path)) == DETAILS
+
+
+def test_legacy_dump(tmp_path):
+    path = tmp_path / "anarchy"
+    path.mkdir()
+    (path / OVERVIEW_FILENAME).write_text(json.dumps({"battles": []}))
+    wrapped = [{"data": detail} for detail in DETAILS]
+    (path / DETAILED_FILENAME).write_text(json.dumps(wrapped))
+    assert is_dump(str(path))
+    assert list(iter_dump_details(str(path))) == DETAILS
@@ -0,0 +1,69 @@
+import pytest
+
+from data_zipcaster.bench.synthetic import BattleFactory
+from data_zipcaster.models import main, splatnet
+from data_zipcaster.transforms.splatnet_to_main import convert_vs_data
+
+
+def convert_mode(
+    flag: str, mode: str, strict: bool = False
+) -> list[tuple[dict, main.VsExtract]]:
+    """Converts synthetic battles of a mode, with their raw details."""
+    factory = BattleFactory(flag, seed=7, splatfest=True)
+    out = []
+    for group in factory.groups(200):
+        for detail in group["details"]:
+            battle = convert_vs_data(
+                splatnet.generate_vs_detail(detail, strict=strict)
+            )
+            if battle.mode == mode:
+                out.append((detail["vsHistoryDetail"], battle))
+    assert len(out) > 0, f"No {mode} battles were generated."
+    return out
+
+
+@pytest.mark.parametrize("strict", [False, True])
+def test_anarchy_open_power(strict):
+    powers = set()
+    for raw, battle in convert_mode("anarchy", "bankara_open", strict):
+        bankara_power = raw["bankaraMatch"]["bankaraPower"]
+        if bankara_power is None:
+            assert battle.match_power is None
+        else:
+            assert battle.match_power == bankara_power["power"]
+        powers.add(battle.match_power is None)
+    # Both battles with and without a power were converted.
+    assert powers == {True, False}
+
+
+def test_anarchy_series_has_no_power():
+    for _, battle in convert_mode("anarchy", "bankara_challenge"):
+        assert battle.match_power is None
+
+
+@pytest.mark.parametrize("mode", ["splatfest_open", "splatfest_challenge"])
+@pytest.mark.parametrize("strict", [False, True])
+def test_splatfest(mode, strict):
+    for raw, battle in convert_mode("turf", mode, strict):
+        fest_match = raw["festMatch"]
+        assert battle.match_power == fest_match["myFestPower"]
+        assert battle.splatfest_metadata is not None
+        assert battle.splatfest_metadata.clout == fest_match["contribution"]
+        assert battle.splatfest_metadata.jewel == fest_match["jewel"]
+
+
+def test_xbattle_power():
+    for raw, battle in convert_mode("xbattle", "xbattle"):
+        assert battle.match_power == raw["xMatch"]["lastXPower"]
+
+
+def test_league_power():
+    for raw, battle in convert_mode("challenge", "league"):
+        assert battle.match_power == raw["leagueMatch"]["myLeaguePower"]
+        assert battle.challenge_id is not None
+
+
+def test_turf_war_has_no_power():
+    for _, battle in convert_mode("turf", "regular"):
+        assert battle.match_power is None
+        assert battle.splatfest_metadata is None